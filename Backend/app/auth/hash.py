@@ -1,15 +1,94 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
 import bcrypt
+from fastapi import HTTPException
+
+from app.config import settings
+
 
-def hash_password(password: str) -> str:
-    salt = bcrypt.gensalt()
+def _hash_password_sync(password: str, rounds: int) -> str:
+    salt = bcrypt.gensalt(rounds=rounds)
     hashed = bcrypt.hashpw(password.encode("utf-8"), salt)
     return hashed.decode("utf-8")
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+def _verify_password_sync(plain_password: str, hashed_password: str) -> bool:
     try:
         return bcrypt.checkpw(
             plain_password.encode("utf-8"), hashed_password.encode("utf-8")
         )
     except Exception:
         return False
+
+
+def hash_cost(hashed_password: str) -> int | None:
+    # "$2b$12$<salt+hash>" -> 12
+    try:
+        return int(hashed_password.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    return hash_cost(hashed_password) != settings.BCRYPT_ROUNDS
+
+
+class PasswordHasherPool:
+    """
+    Runs bcrypt on a dedicated, bounded thread pool so hashing never blocks
+    the event loop (bcrypt releases the GIL while it works).
+    Calls beyond workers + max_queue are rejected with 503 instead of piling up.
+    """
+
+    def __init__(self, workers: int, max_queue: int) -> None:
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def run(self, fn, *args):
+        if self.in_flight >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise HTTPException(status_code=503, detail="Server busy, please retry")
+
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "maxQueue": self.max_queue,
+            "inFlight": self.in_flight,
+            "queued": max(0, self.in_flight - self.workers),
+            "peakInFlight": self.peak_in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "rounds": settings.BCRYPT_ROUNDS,
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasherPool(
+    workers=settings.BCRYPT_WORKERS,
+    max_queue=settings.BCRYPT_MAX_QUEUE,
+)
+
+
+async def hash_password(password: str) -> str:
+    return await password_hasher.run(_hash_password_sync, password, settings.BCRYPT_ROUNDS)
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.run(_verify_password_sync, plain_password, hashed_password)
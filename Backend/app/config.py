@@ -24,6 +24,18 @@ class Settings(BaseSettings):
         os.getenv("JWT_REFRESH_TOKEN_EXPIRE_TIME", "6")
     )
     URL_EXPIRY_DAYS: int = int(os.getenv("URL_EXPIRY_DAYS", "150"))
+    URL_CACHE_TTL_SECONDS: int = int(os.getenv("URL_CACHE_TTL_SECONDS", "3600"))
+    URL_CACHE_LOCAL_SIZE: int = int(os.getenv("URL_CACHE_LOCAL_SIZE", "10000"))
+    URL_CACHE_LOCAL_TTL_SECONDS: int = int(os.getenv("URL_CACHE_LOCAL_TTL_SECONDS", "30"))
+    URL_BULK_MAX_ITEMS: int = int(os.getenv("URL_BULK_MAX_ITEMS", "10000"))
+    USER_CACHE_TTL_SECONDS: int = int(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+    USER_CACHE_LOCAL_SIZE: int = int(os.getenv("USER_CACHE_LOCAL_SIZE", "5000"))
+    USER_CACHE_LOCAL_TTL_SECONDS: int = int(os.getenv("USER_CACHE_LOCAL_TTL_SECONDS", "10"))
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    BCRYPT_WORKERS: int = int(os.getenv("BCRYPT_WORKERS", "4"))
+    BCRYPT_MAX_QUEUE: int = int(os.getenv("BCRYPT_MAX_QUEUE", "64"))
+    SHORT_ID_KEY: str | None = os.getenv("SHORT_ID_KEY")
+    CLICK_FLUSH_INTERVAL_SECONDS: float = float(os.getenv("CLICK_FLUSH_INTERVAL_SECONDS", "5"))
     GOOGLE_CLIENT_ID: str | None = os.getenv("GOOGLE_CLIENT_ID")
     GOOGLE_CLIENT_SECRET: str | None = os.getenv("GOOGLE_CLIENT_SECRET")
     GOOGLE_REDIRECT_URI: str | None = os.getenv("GOOGLE_REDIRECT_URI")
@@ -34,19 +46,61 @@ class Settings(BaseSettings):
     OPENAI_CHAT_URL: str | None = os.getenv("OPENAI_CHAT_URL")
     OPENAI_EMBED_URL: str | None = os.getenv("OPENAI_EMBED_URL")
     EMBED_DIM: int = 1536
+    EMBED_STORAGE_DTYPE: str = os.getenv("EMBED_STORAGE_DTYPE", "float32")
     AI_PROVIDER: str = os.getenv("AI_PROVIDER", "gemini")
     GEMINI_API_KEY: str | None = os.getenv("GEMINI_API_KEY")
     GEMINI_MODEL: str = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+    GEMINI_EMBED_MODEL: str = os.getenv("GEMINI_EMBED_MODEL", "models/embedding-001")
+    GEMINI_API_BASE_URL: str = os.getenv("GEMINI_API_BASE_URL", "https://generativelanguage.googleapis.com/v1beta")
+    GEMINI_EMBED_BATCH_SIZE: int = int(os.getenv("GEMINI_EMBED_BATCH_SIZE", "100"))
+    GEMINI_MAX_CONCURRENCY: int = int(os.getenv("GEMINI_MAX_CONCURRENCY", "4"))
+    AI_CHAT_PROVIDERS: str = os.getenv("AI_CHAT_PROVIDERS", "openai,gemini")
+    AI_EMBED_PROVIDER: str = os.getenv("AI_EMBED_PROVIDER", "openai")
+    AI_ROUTES: str = os.getenv("AI_ROUTES", "")
+    EMBED_CACHE_REDIS_TTL_SECONDS: int = int(os.getenv("EMBED_CACHE_REDIS_TTL_SECONDS", "86400"))
+    EMBED_CACHE_TTL_DAYS: int = int(os.getenv("EMBED_CACHE_TTL_DAYS", "90"))
+    VECTOR_SEARCH_BACKEND: str = os.getenv("VECTOR_SEARCH_BACKEND", "auto")
+    VECTOR_INDEX_DTYPE: str = os.getenv("VECTOR_INDEX_DTYPE", "float32")
+    VECTOR_INDEX_MAX_MB: int = int(os.getenv("VECTOR_INDEX_MAX_MB", "512"))
+    VECTOR_ATLAS_REPROBE_SECONDS: float = float(os.getenv("VECTOR_ATLAS_REPROBE_SECONDS", "300"))
+    COPILOT_CACHE_TTL_SECONDS: int = int(os.getenv("COPILOT_CACHE_TTL_SECONDS", "86400"))
+    COPILOT_CACHE_SIMILARITY: float = float(os.getenv("COPILOT_CACHE_SIMILARITY", "0.95"))
+    NOTE_CHUNK_MAX_TOKENS: int = int(os.getenv("NOTE_CHUNK_MAX_TOKENS", "300"))
+    NOTE_CHUNK_MIN_TOKENS: int = int(os.getenv("NOTE_CHUNK_MIN_TOKENS", "80"))
+    NOTES_SEARCH_BACKEND: str = os.getenv("NOTES_SEARCH_BACKEND", "index")
+    NOTES_SEARCH_MAX_USERS: int = int(os.getenv("NOTES_SEARCH_MAX_USERS", "32"))
+    COPILOT_RETRIEVAL: str = os.getenv("COPILOT_RETRIEVAL", "hybrid")
+    HYBRID_RRF_K: int = int(os.getenv("HYBRID_RRF_K", "60"))
+    HYBRID_MAX_CANDIDATES: int = int(os.getenv("HYBRID_MAX_CANDIDATES", "1000"))
+    COPILOT_CHUNKS_PER_NOTE: int = int(os.getenv("COPILOT_CHUNKS_PER_NOTE", "2"))
+    COPILOT_CONTEXT_MAX_TOKENS: int = int(os.getenv("COPILOT_CONTEXT_MAX_TOKENS", "2000"))
+    NOTE_ACTION_MAX_TOKENS: int = int(os.getenv("NOTE_ACTION_MAX_TOKENS", "3000"))
+    NOTE_INDEX_WORKERS: int = int(os.getenv("NOTE_INDEX_WORKERS", "2"))
+    NOTE_INDEX_DEBOUNCE_SECONDS: float = float(os.getenv("NOTE_INDEX_DEBOUNCE_SECONDS", "3"))
+    NOTE_INDEX_MAX_DELAY_SECONDS: float = float(os.getenv("NOTE_INDEX_MAX_DELAY_SECONDS", "30"))
+    NOTE_INDEX_DRAIN_SECONDS: float = float(os.getenv("NOTE_INDEX_DRAIN_SECONDS", "10"))
+    AI_HEDGE_AFTER_MS: float = float(os.getenv("AI_HEDGE_AFTER_MS", "2500"))
+    AI_BREAKER_FAILURES: int = int(os.getenv("AI_BREAKER_FAILURES", "5"))
+    AI_BREAKER_RESET_SECONDS: float = float(os.getenv("AI_BREAKER_RESET_SECONDS", "30"))
+    AI_HTTP_TIMEOUT_SECONDS: float = float(os.getenv("AI_HTTP_TIMEOUT_SECONDS", "30"))
+    AI_HTTP_MAX_CONNECTIONS: int = int(os.getenv("AI_HTTP_MAX_CONNECTIONS", "100"))
+    AI_HTTP_MAX_KEEPALIVE: int = int(os.getenv("AI_HTTP_MAX_KEEPALIVE", "20"))
+    AI_HTTP_MAX_RETRIES: int = int(os.getenv("AI_HTTP_MAX_RETRIES", "2"))
+    AI_HTTP_BACKOFF_BASE_SECONDS: float = float(os.getenv("AI_HTTP_BACKOFF_BASE_SECONDS", "0.5"))
+    AI_HTTP_BACKOFF_MAX_SECONDS: float = float(os.getenv("AI_HTTP_BACKOFF_MAX_SECONDS", "8"))
     REDIS_URL: str | None = os.getenv("REDIS_URL")
     TWILIO_ACCOUNT_SID: str | None = os.getenv("TWILIO_ACCOUNT_SID")
     TWILIO_AUTH_TOKEN: str | None = os.getenv("TWILIO_AUTH_TOKEN")
     TWILIO_VERIFY_SERVICE_SID: str | None = os.getenv("TWILIO_VERIFY_SERVICE_SID")
+    TWILIO_VERIFY_BASE_URL: str = os.getenv("TWILIO_VERIFY_BASE_URL", "https://verify.twilio.com")
+    TWILIO_TIMEOUT_SECONDS: float = float(os.getenv("TWILIO_TIMEOUT_SECONDS", "8"))
+    TWILIO_BREAKER_FAILURES: int = int(os.getenv("TWILIO_BREAKER_FAILURES", "5"))
+    TWILIO_BREAKER_RESET_SECONDS: float = float(os.getenv("TWILIO_BREAKER_RESET_SECONDS", "30"))
     TOTP_ENCRYPTION_KEY: str | None = os.getenv("TOTP_ENCRYPTION_KEY")
     TOTP_ISSUER_NAME: str | None = os.getenv("TOTP_ISSUER_NAME")
     WORDLE_WORD_LENGTH: int = 5
     WORDLE_MAX_ATTEMPTS: int = 6
     MAX_QUERY_CHARS: int = 500
-    MAX_NOTE_CHARS: int = 12000
     COPILOT_TOP_K: int = 6
     COPILOT_TOP_K_MAX: int = 10
     WORDLE_TIMEZONE: str = "Asia/Kolkata"
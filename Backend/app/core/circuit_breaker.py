@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import time
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure breaker.
+      closed    -> calls pass; `failure_threshold` failures in a row opens it
+      open      -> calls are refused until `reset_timeout` seconds pass
+      half-open -> one trial call; success closes, failure re-opens
+    Callers check `allow()` before the call and report the outcome with
+    `record_success()` / `record_failure()`, or `release()` if it was cancelled.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def release(self) -> None:
+        # the call was abandoned without an outcome; let another trial through
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        return {"name": self.name, "state": self.state, "consecutiveFailures": self.failures}
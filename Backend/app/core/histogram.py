@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import bisect
+from typing import Optional, Sequence
+
+DEFAULT_BUCKETS_MS: tuple[float, ...] = (
+    25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000,
+)
+
+
+class LatencyHistogram:
+    """
+    Fixed-bucket latency histogram (milliseconds), cheap enough to update on
+    every call. Quantiles are estimated by linear interpolation inside the
+    bucket that contains the rank; the last bucket is open-ended and reports
+    the largest observed value.
+    """
+
+    def __init__(self, buckets_ms: Sequence[float] = DEFAULT_BUCKETS_MS) -> None:
+        self.bounds = tuple(buckets_ms)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                upper = self.bounds[i] if i < len(self.bounds) else self.max_ms
+                upper = min(upper, self.max_ms)
+                return lower + (upper - lower) * ((rank - seen) / n)
+            seen += n
+        return self.max_ms
+
+    def stats(self) -> dict:
+        def _round(v: Optional[float]) -> Optional[float]:
+            return round(v, 1) if v is not None else None
+
+        return {
+            "count": self.count,
+            "meanMs": _round(self.total_ms / self.count) if self.count else None,
+            "p50Ms": _round(self.quantile(0.5)),
+            "p95Ms": _round(self.quantile(0.95)),
+            "p99Ms": _round(self.quantile(0.99)),
+            "maxMs": _round(self.max_ms) if self.count else None,
+            "buckets": {
+                **{f"le{int(b)}": n for b, n in zip(self.bounds, self.counts)},
+                "inf": self.counts[-1],
+            },
+        }
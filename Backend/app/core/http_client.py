@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import random
+from typing import Any, AsyncIterator, Optional
+
+import httpx
+
+from app.config import settings
+from app.core.logger import logger
+
+try:
+    import h2  # noqa: F401  (enables httpx HTTP/2 support)
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def _retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+class PooledHttpClient:
+    """
+    One long-lived httpx.AsyncClient shared by all outbound calls of a kind
+    (keep-alive pool, HTTP/2 when `h2` is installed). Started and closed by
+    the app lifespan; created lazily for scripts that run outside it.
+
+    request() retries 429/5xx and transport errors with full-jitter
+    exponential backoff, honouring Retry-After when the server sends it.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._client: Optional[httpx.AsyncClient] = None
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.status_counts: dict[str, int] = {}
+
+    def start(self) -> None:
+        if self._client is not None:
+            return
+        self._client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=httpx.Timeout(settings.AI_HTTP_TIMEOUT_SECONDS, connect=5.0),
+            limits=httpx.Limits(
+                max_connections=settings.AI_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.AI_HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=30.0,
+            ),
+        )
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self.start()
+        return self._client
+
+    async def _backoff(self, attempt: int, response: Optional[httpx.Response]) -> None:
+        delay = _retry_after_seconds(response) if response is not None else None
+        if delay is None:
+            cap = settings.AI_HTTP_BACKOFF_BASE_SECONDS * (2 ** (attempt - 1))
+            delay = random.uniform(0, min(cap, settings.AI_HTTP_BACKOFF_MAX_SECONDS))
+        await asyncio.sleep(min(delay, settings.AI_HTTP_BACKOFF_MAX_SECONDS))
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        """
+        Returns the final response (which may still be an error status);
+        raises httpx.HTTPError only when every attempt failed at transport level.
+        """
+        retries = settings.AI_HTTP_MAX_RETRIES if max_retries is None else max_retries
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+
+        attempt = 0
+        self.in_flight += 1
+        try:
+            while True:
+                attempt += 1
+                self.requests += 1
+                response = None
+                try:
+                    response = await self.client.request(method, url, **kwargs)
+                except (httpx.TimeoutException, httpx.TransportError) as e:
+                    if attempt > retries:
+                        self.failures += 1
+                        raise
+                    logger.warning(f"[HTTP][{self.name}] {method} {url} attempt={attempt} error={e!r}")
+                else:
+                    key = str(response.status_code)
+                    self.status_counts[key] = self.status_counts.get(key, 0) + 1
+                    if response.status_code not in RETRY_STATUS_CODES or attempt > retries:
+                        if response.status_code >= 400:
+                            self.failures += 1
+                        return response
+                    logger.warning(
+                        f"[HTTP][{self.name}] {method} {url} attempt={attempt} status={response.status_code}"
+                    )
+
+                self.retries += 1
+                await self._backoff(attempt, response)
+        finally:
+            self.in_flight -= 1
+
+    async def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    @contextlib.asynccontextmanager
+    async def stream(
+        self,
+        method: str,
+        url: str,
+        *,
+        timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[httpx.Response]:
+        """
+        Streaming variant of request(). Retries only cover failures before the
+        body starts; the response is closed when the block exits.
+        """
+        retries = settings.AI_HTTP_MAX_RETRIES if max_retries is None else max_retries
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+
+        attempt = 0
+        self.in_flight += 1
+        try:
+            while True:
+                attempt += 1
+                self.requests += 1
+                response = None
+                try:
+                    request = self.client.build_request(method, url, **kwargs)
+                    response = await self.client.send(request, stream=True)
+                except (httpx.TimeoutException, httpx.TransportError) as e:
+                    if attempt > retries:
+                        self.failures += 1
+                        raise
+                    logger.warning(f"[HTTP][{self.name}] stream {method} {url} attempt={attempt} error={e!r}")
+                else:
+                    key = str(response.status_code)
+                    self.status_counts[key] = self.status_counts.get(key, 0) + 1
+                    if response.status_code not in RETRY_STATUS_CODES or attempt > retries:
+                        if response.status_code >= 400:
+                            self.failures += 1
+                        break
+                    await response.aclose()
+                    logger.warning(
+                        f"[HTTP][{self.name}] stream {method} {url} attempt={attempt} status={response.status_code}"
+                    )
+
+                self.retries += 1
+                await self._backoff(attempt, response)
+
+            try:
+                yield response
+            finally:
+                await response.aclose()
+        finally:
+            self.in_flight -= 1
+
+    def _pool_connections(self) -> Optional[int]:
+        # httpx has no public pool API; best effort via the transport's pool
+        pool = getattr(getattr(self._client, "_transport", None), "_pool", None)
+        connections = getattr(pool, "connections", None)
+        return len(connections) if connections is not None else None
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "started": self._client is not None,
+            "http2": HTTP2_AVAILABLE,
+            "inFlight": self.in_flight,
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "statusCounts": dict(self.status_counts),
+            "poolConnections": self._pool_connections(),
+            "maxConnections": settings.AI_HTTP_MAX_CONNECTIONS,
+        }
+
+
+async def iter_sse_data(response: httpx.Response) -> AsyncIterator[str]:
+    """Yields the `data:` payload of each server-sent event."""
+    async for line in response.aiter_lines():
+        if line.startswith("data:"):
+            yield line[5:].strip()
+
+
+ai_http = PooledHttpClient("ai")
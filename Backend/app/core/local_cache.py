@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class LocalTTLCache:
+    """
+    Small in-process LRU with per-entry expiry.
+    Each worker has its own copy, so keep TTLs short and treat it as a
+    front for Redis/Mongo, never as the source of truth.
+    maxsize <= 0 disables the cache.
+    """
+
+    def __init__(self, maxsize: int, default_ttl: float) -> None:
+        self.maxsize = maxsize
+        self.default_ttl = default_ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            return None
+
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            self._data.pop(key, None)
+            return None
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        if self.maxsize <= 0:
+            return
+
+        ttl = self.default_ttl if ttl is None else min(ttl, self.default_ttl)
+        if ttl <= 0:
+            self._data.pop(key, None)
+            return
+
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
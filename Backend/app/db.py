@@ -1,9 +1,11 @@
 from datetime import timezone
 
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import OperationFailure
 
 from app.config import settings
 from app.scripts.seed_wordle import seed_wordle_if_empty
+from app.scripts.migrations import start_background_migrations
 
 
 async def connect_to_mongo(app):
@@ -35,21 +37,44 @@ async def connect_to_mongo(app):
     await app.state.db.urls.create_index("expiresAt", expireAfterSeconds=0)
     await app.state.db.urls.create_index("shortId", unique=True)
     await app.state.db.urls.create_index("longUrl")
+    await app.state.db.urls.create_index([("userId", 1), ("createdAt", -1), ("_id", -1)])
+    await app.state.db.urls.create_index([("userId", 1), ("searchTerms", 1), ("createdAt", -1), ("_id", -1)])
+    try:
+        # superseded by the index above, which also covers the _id tiebreak
+        await app.state.db.urls.drop_index("userId_1_searchTerms_1_createdAt_-1")
+    except OperationFailure:
+        pass
+    await app.state.db.url_click_buckets.create_index(
+        [("shortId", 1), ("granularity", 1), ("bucket", 1)],
+        unique=True,
+    )
+    await app.state.db.url_click_buckets.create_index("expiresAt", expireAfterSeconds=0)
 
     # Notes Indexes
     await app.state.db.notes.create_index([("userId", 1), ("updatedAt", -1)])
     await app.state.db.notes.create_index([("userId", 1), ("pinned", -1), ("updatedAt", -1)])
+    await app.state.db.notes.create_index([("userId", 1), ("pinned", -1), ("updatedAt", -1), ("_id", -1)])
     await app.state.db.notes.create_index([("userId", 1), ("tags", 1)])
     
     # AI Note Chunk Indexes
     await app.state.db.note_chunks.create_index([("userId", 1), ("noteId", 1)])
     await app.state.db.note_chunks.create_index([("userId", 1), ("noteId", 1), ("contentHash", 1)])
+    await app.state.db.embedding_cache.create_index(
+        "createdAt", expireAfterSeconds=settings.EMBED_CACHE_TTL_DAYS * 86400
+    )
+
+    await app.state.db.copilot_answer_cache.create_index(
+        [("userId", 1), ("sourcesKey", 1), ("createdAt", -1)]
+    )
+    await app.state.db.copilot_answer_cache.create_index([("userId", 1), ("noteIds", 1)])
+    await app.state.db.copilot_answer_cache.create_index("expiresAt", expireAfterSeconds=0)
     
     # AI Logs Indexes
     await app.state.db.ai_logs.create_index([("userId", 1), ("createdAt", -1)])
 
     # Tasks Indexes (Kanban)
     await app.state.db.tasks.create_index([("userId", 1), ("updatedAt", -1)])
+    await app.state.db.tasks.create_index([("userId", 1), ("updatedAt", -1), ("_id", -1)])
     await app.state.db.tasks.create_index([("userId", 1), ("status", 1), ("updatedAt", -1)])
     await app.state.db.tasks.create_index([("userId", 1), ("dueAt", 1)])
 
@@ -92,6 +117,7 @@ async def connect_to_mongo(app):
     await app.state.db.finance_transactions.create_index([("userEmail", 1), ("merchant", 1)])
     await app.state.db.finance_transactions.create_index([("userEmail", 1), ("paymentMethod", 1)])
     await app.state.db.finance_transactions.create_index([("userEmail", 1), ("createdAt", -1)])
+    await app.state.db.finance_transactions.create_index([("userId", 1), ("transactionDate", -1), ("_id", -1)])
 
     await app.state.db.finance_budgets.create_index([("userEmail", 1), ("createdAt", -1)])
     await app.state.db.finance_budgets.create_index([("userEmail", 1), ("categoryId", 1), ("isActive", 1)])
@@ -99,10 +125,14 @@ async def connect_to_mongo(app):
 
     #Notification Indexes
     await app.state.db.notifications.create_index([("userId", 1), ("createdAt", -1)])
+    await app.state.db.notifications.create_index([("userId", 1), ("createdAt", -1), ("_id", -1)])
     await app.state.db.notifications.create_index([("userId", 1), ("read", 1), ("createdAt", -1)])
     await app.state.db.notification_delivery_markers.create_index([("userId", 1), ("dayId", 1), ("type", 1)],unique=True,)
     await app.state.db.notification_delivery_markers.create_index([("createdAt", 1)],expireAfterSeconds=60 * 60 * 24 * 90,)
 
+    start_background_migrations(app.state.db)
+
+
 async def close_mongo_connection(app):
     client = getattr(app.state, "mongo_client", None)
     if client:
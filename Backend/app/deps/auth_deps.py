@@ -2,6 +2,8 @@ from bson import ObjectId
 from fastapi import Request, HTTPException, status
 
 from app.auth.jwt_handler import verify_token
+from app.services.user_cache_service import get_user_principal
+from app.services.avatar_service import avatar_url
 
 def _extract_user_id_from_request(request: Request) -> str:
     access = request.cookies.get("access_token")
@@ -59,7 +61,7 @@ async def get_current_user(request: Request) -> dict:
             detail="Invalid user id in token",
         )
 
-    user = await db.users.find_one({"_id": oid})
+    user = await get_user_principal(db, oid)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -84,6 +86,11 @@ def make_avatar_url(user: dict | None) -> str | None:
     if not user:
         return None
 
+    content_hash = user.get("avatarHash")
+    if content_hash:
+        return avatar_url(content_hash)
+
+    # legacy inline avatars not yet moved to the blob store
     data = user.get("avatarData")
     mime = user.get("avatarMime")
     if not data or not mime:
@@ -6,6 +6,7 @@ from app.config import settings
 from app.core.redis import init_redis, close_redis
 
 from app.db import connect_to_mongo, close_mongo_connection
+from app.scripts.migrations import stop_background_migrations
 from app.routes.url import router as urls_router, redirect_router
 from app.routes.auth import router as auth_router
 from app.routes.oauth_google import router as oauth_google_router
@@ -19,9 +20,15 @@ from app.routes.wordle import router as wordle_router
 from app.routes.pomodoro_audio import router as pomodoro_audio_router
 from app.routes.finance_manager import router as finance_manager_router
 from app.routes.notifications import router as notifications_router
+from app.routes.avatars import router as avatars_router
 
 from app.realtime.pubsub import realtime_pubsub
 from app.realtime.routes import router as realtime_router
+from app.services.click_counter_service import click_counter
+from app.services.note_index_service import note_indexer
+from app.auth.hash import password_hasher
+from app.services.twilio_verify_service import twilio_verify_client
+from app.core.http_client import ai_http
 
 from app.middleware.logging import log_requests
 from fastapi.middleware.gzip import GZipMiddleware
@@ -39,13 +46,23 @@ async def lifespan(app: FastAPI):
     await realtime_pubsub.start()
     print(">> realtime pubsub")
 
+    await click_counter.start(app.state.db)
+    await note_indexer.start(app.state.db)
+    ai_http.start()
+
     try:
         yield
     finally:
         # shutdown
+        await click_counter.stop()
+        await note_indexer.stop()
+        await stop_background_migrations()
         await close_redis()
         await realtime_pubsub.stop()
         await close_mongo_connection(app)
+        await twilio_verify_client.close()
+        await ai_http.close()
+        password_hasher.shutdown()
 
 
 app = FastAPI(title="Mini ToolBox", lifespan=lifespan)
@@ -63,6 +80,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Search-Ranked"],
 )
 
 app.add_middleware(
@@ -91,4 +109,5 @@ app.include_router(pomodoro_audio_router)
 app.include_router(finance_manager_router)
 app.include_router(realtime_router)
 app.include_router(notifications_router)
+app.include_router(avatars_router)
 
@@ -1,24 +1,75 @@
 from __future__ import annotations
 
-from typing import Any, Dict
+import asyncio
+import contextlib
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
 
-import httpx
 from bson import ObjectId
 from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 
 from app.config import settings
+from app.core.logger import logger
 from app.deps.ai_deps import rl_dep, log_ai_event, Timer
 from app.deps.auth_deps import get_current_user
-from app.services.ai_notes import vector_search_chunks, build_prompt_context
+from app.services.ai.router import ai_router
+from app.services.ai_notes import embed_query, search_chunks
+from app.services.copilot_cache_service import copilot_cache
 from app.schemas.ai_notes_schema import (
     NotesCopilotRequest,
     NotesCopilotResponse,
     NoteActionResponse,
 )
-from app.config import settings
+from app.util.context_packer import pack_context
+from app.util.sse import SSE_HEADERS, SSE_MEDIA_TYPE, sse_event
+from app.util.tokens import count_tokens, truncate_tokens
 
 router = APIRouter(prefix="/api/ai", tags=["AI"])
 
+COPILOT_SYSTEM = (
+    "You are Notes Copilot.\n"
+    "Use ONLY the provided context.\n"
+    "If the answer isn't in the context, say you don't know.\n"
+    "Keep the answer concise and practical.\n"
+)
+
+COPILOT_SYSTEM_TOKENS = count_tokens(COPILOT_SYSTEM)
+
+# action -> (system prompt, user prompt template)
+NOTE_ACTION_PROMPTS: Dict[str, Tuple[str, str]] = {
+    "summarize": (
+        "You summarize user notes.\n"
+        "Return a clean summary with:\n"
+        "1) 3-6 bullet key points\n"
+        "2) a 1-paragraph short summary\n"
+        "Do not invent facts that aren't in the note.\n",
+        "TITLE:\n{title}\n\nNOTE:\n{text}\n\nMake it concise.",
+    ),
+    "shorten": (
+        "You rewrite notes to be shorter while preserving meaning.\n"
+        "Rules:\n"
+        "- Keep all important details\n"
+        "- Remove repetition\n"
+        "- Keep headings if present\n"
+        "- Output ONLY the rewritten note text (no extra commentary)\n",
+        "TITLE:\n{title}\n\nNOTE:\n{text}\n\nRewrite this note to be ~40-60% shorter.",
+    ),
+    "highlights": (
+        "You extract highlights from notes.\n"
+        "Return:\n"
+        "- Action items (checkbox bullets)\n"
+        "- Decisions\n"
+        "- Dates/Deadlines (if any)\n"
+        "- Key terms\n"
+        "If a section is not applicable, write 'None'.\n"
+        "Do not invent anything.\n",
+        "TITLE:\n{title}\n\nNOTE:\n{text}",
+    ),
+}
+
+# strong refs for log writes scheduled from streams
+_pending_logs: set[asyncio.Task] = set()
+
 
 def get_db(request: Request):
     db = getattr(request.app.state, "db", None)
@@ -27,32 +78,12 @@ def get_db(request: Request):
     return db
 
 
-def clamp_text(s: str, max_chars: int) -> str:
+def clamp_tokens(s: str, max_tokens: int) -> Tuple[str, bool]:
     s = (s or "").strip()
-    if len(s) <= max_chars:
-        return s
-    return s[:max_chars] + "\n\n[TRUNCATED]"
-
-
-async def openai_chat(*, system: str, user: str) -> str:
-    url = settings.OPENAI_CHAT_URL
-    headers = {"Authorization": f"Bearer {settings.OPENAI_API_KEY}"}
-    body = {
-        "model": settings.OPENAI_CHAT_MODEL,
-        "messages": [
-            {"role": "system", "content": system},
-            {"role": "user", "content": user},
-        ],
-        "temperature": 0.2,
-    }
-
-    async with httpx.AsyncClient(timeout=30) as client:
-        r = await client.post(url, headers=headers, json=body)
-        if r.status_code >= 400:
-            raise HTTPException(status_code=502, detail=f"OpenAI chat failed: {r.text}")
-        data = r.json()
-
-    return data["choices"][0]["message"]["content"]
+    cut = truncate_tokens(s, max_tokens)
+    if len(cut) == len(s):
+        return s, False
+    return cut + "\n\n[TRUNCATED]", True
 
 
 async def get_note_or_404(db, *, user_id: ObjectId, note_id: str) -> Dict[str, Any]:
@@ -71,6 +102,146 @@ async def get_note_or_404(db, *, user_id: ObjectId, note_id: str) -> Dict[str, A
     return doc
 
 
+def note_action_prompt(action: str, note: Dict[str, Any]) -> Tuple[str, str, Dict[str, Any]]:
+    title = (note.get("title") or "").strip()
+    raw_text = note.get("contentText") or ""
+    text, truncated = clamp_tokens(raw_text, settings.NOTE_ACTION_MAX_TOKENS)
+
+    system, template = NOTE_ACTION_PROMPTS[action]
+    user = template.format(title=title, text=text)
+    return system, user, {
+        "noteChars": len(raw_text),
+        "noteTruncated": truncated,
+        "promptTokens": count_tokens(system) + count_tokens(user),
+    }
+
+
+def copilot_query(payload: NotesCopilotRequest) -> Tuple[str, int]:
+    q = (payload.query or "").strip()
+
+    if not q:
+        raise HTTPException(status_code=400, detail="Query required")
+
+    if len(q) > settings.MAX_QUERY_CHARS:
+        raise HTTPException(status_code=400, detail="Query too long")
+
+    top_k = min(max(int(payload.top_k or settings.COPILOT_TOP_K), 1), settings.COPILOT_TOP_K_MAX)
+    return q, top_k
+
+
+async def copilot_retrieve(db, *, user_id: ObjectId, q: str, top_k: int):
+    qvec = await embed_query(db, q)
+    chunks = await search_chunks(
+        db,
+        user_id=user_id,
+        query=q,
+        top_k=top_k,
+        query_vector=qvec,
+    )
+    cached = await copilot_cache.lookup(
+        db, owner_id=user_id, query_vector=qvec, sources=chunks, top_k=top_k
+    )
+    return qvec, chunks, cached
+
+
+def copilot_prompt(q: str, chunks: List[Dict[str, Any]]) -> Tuple[str, Dict[str, Any]]:
+    """User prompt with the chunks packed into COPILOT_CONTEXT_MAX_TOKENS, plus log meta."""
+    context = pack_context(chunks, max_tokens=settings.COPILOT_CONTEXT_MAX_TOKENS)
+    prompt = f"QUESTION:\n{q}\n\nCONTEXT:\n{context.text}"
+    return prompt, {**context.meta(), "promptTokens": COPILOT_SYSTEM_TOKENS + count_tokens(prompt)}
+
+
+def _log_in_background(db, **kwargs) -> None:
+    # a client disconnect cancels the stream; the log write must survive it
+    task = asyncio.create_task(log_ai_event(db, **kwargs))
+    _pending_logs.add(task)
+    task.add_done_callback(_pending_logs.discard)
+
+
+async def _single(text: str) -> AsyncIterator[str]:
+    yield text
+
+
+async def _sse_stream(
+    db,
+    *,
+    t: Timer,
+    user_id: ObjectId,
+    action: str,
+    system: str,
+    user: str,
+    meta: Dict[str, Any],
+    done: Callable[[str], Dict[str, Any]],
+    note_id: Optional[str] = None,
+    prelude: Tuple[str, ...] = (),
+    answer: Optional[str] = None,
+    on_complete: Optional[Callable[[str], Any]] = None,
+) -> AsyncIterator[str]:
+    """
+    Relays provider tokens as `token` events, then one `done` event with the
+    full result, or an `error` event. A precomputed `answer` (cache hit) is
+    sent as a single token. The ai_logs entry is written when the stream
+    ends and records time to first token.
+    """
+    pieces: List[str] = []
+    ttft_ms: Optional[float] = None
+    ok = False
+    error: Optional[str] = None
+
+    try:
+        for event in prelude:
+            yield event
+
+        if answer is not None:
+            tokens = _single(answer)
+        else:
+            tokens = ai_router.stream_chat(action, system=system, user=user)
+
+        # close the provider stream (and its pooled response) on disconnect
+        async with contextlib.aclosing(tokens):
+            async for piece in tokens:
+                if ttft_ms is None:
+                    ttft_ms = t.ms()
+                pieces.append(piece)
+                yield sse_event("token", {"text": piece})
+
+        result = "".join(pieces)
+        if on_complete is not None:
+            await on_complete(result)
+        ok = True
+        yield sse_event("done", done(result))
+
+    except HTTPException as e:
+        error = str(e.detail)
+        yield sse_event("error", {"detail": error})
+    except Exception as e:
+        error = str(e)
+        logger.exception(f"[AI] stream failed action={action} userId={str(user_id)}: {e}")
+        yield sse_event("error", {"detail": f"AI request failed for {action}"})
+    finally:
+        if not ok and error is None:
+            error = "client disconnected"
+        _log_in_background(
+            db,
+            user_id=str(user_id),
+            action=action,
+            note_id=note_id,
+            ok=ok,
+            latency_ms=t.ms(),
+            meta={
+                **meta,
+                "stream": True,
+                "ttftMs": round(ttft_ms, 2) if ttft_ms is not None else None,
+                "resultChars": sum(len(p) for p in pieces),
+            },
+            error=error,
+        )
+
+
+def _sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(events, media_type=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
+
+
 @router.post(
     "/notes",
     response_model=NotesCopilotResponse,
@@ -83,45 +254,49 @@ async def notes_copilot(
 ):
     t = Timer()
     user_id = current_user["_id"]
-    q = (payload.query or "").strip()
-
-    if not q:
-        raise HTTPException(status_code=400, detail="Query required")
-
-    if len(q) > settings.MAX_QUERY_CHARS:
-        raise HTTPException(status_code=400, detail="Query too long")
-
-    top_k = min(max(int(payload.top_k or settings.COPILOT_TOP_K), 1), settings.COPILOT_TOP_K_MAX)
+    q, top_k = copilot_query(payload)
 
     try:
-        chunks = await vector_search_chunks(
+        qvec, chunks, cached = await copilot_retrieve(db, user_id=user_id, q=q, top_k=top_k)
+
+        if cached:
+            await log_ai_event(
+                db,
+                user_id=str(user_id),
+                action="copilot",
+                ok=True,
+                latency_ms=t.ms(),
+                meta={
+                    "queryChars": len(q),
+                    "topK": top_k,
+                    "sources": len(chunks),
+                    "cacheHit": True,
+                    "similarity": round(cached["similarity"], 4),
+                    "promptTokens": 0,
+                },
+            )
+            return {"answer": cached["answer"], "sources": chunks}
+
+        prompt, prompt_meta = copilot_prompt(q, chunks)
+        answer = await ai_router.chat("copilot", system=COPILOT_SYSTEM, user=prompt)
+
+        await copilot_cache.store(
             db,
-            user_id=user_id,
+            owner_id=user_id,
             query=q,
-            api_key=settings.OPENAI_API_KEY,
-            embed_model=settings.OPENAI_EMBED_MODEL,
+            query_vector=qvec,
+            sources=chunks,
             top_k=top_k,
+            answer=answer,
         )
 
-        context = build_prompt_context(chunks)
-
-        system = (
-            "You are Notes Copilot.\n"
-            "Use ONLY the provided context.\n"
-            "If the answer isn't in the context, say you don't know.\n"
-            "Keep the answer concise and practical.\n"
-        )
-        user = f"QUESTION:\n{q}\n\nCONTEXT:\n{context}"
-
-        answer = await openai_chat(system=system, user=user)
-
         await log_ai_event(
             db,
             user_id=str(user_id),
             action="copilot",
             ok=True,
             latency_ms=t.ms(),
-            meta={"queryChars": len(q), "topK": top_k, "sources": len(chunks)},
+            meta={"queryChars": len(q), "topK": top_k, "sources": len(chunks), "cacheHit": False, **prompt_meta},
         )
         return {"answer": answer, "sources": chunks}
 
@@ -150,107 +325,95 @@ async def notes_copilot(
 
 
 @router.post(
-    "/notes/{note_id}/summarize",
-    response_model=NoteActionResponse,
-    dependencies=[Depends(rl_dep("summarize", 30, 60))],
+    "/notes/stream",
+    dependencies=[Depends(rl_dep("copilot", 20, 60))],
 )
-async def summarize_note(
-    note_id: str,
+async def notes_copilot_stream(
+    payload: NotesCopilotRequest,
     db=Depends(get_db),
     current_user: dict = Depends(get_current_user),
 ):
+    """
+    Server-sent events version of POST /notes:
+      sources -> token* -> done {answer}   (or error)
+    """
     t = Timer()
     user_id = current_user["_id"]
+    q, top_k = copilot_query(payload)
 
     try:
-        note = await get_note_or_404(db, user_id=user_id, note_id=note_id)
-        title = (note.get("title") or "").strip()
-        raw_text = note.get("contentText") or ""
-        text = clamp_text(raw_text, settings.MAX_NOTE_CHARS)
-
-        system = (
-            "You summarize user notes.\n"
-            "Return a clean summary with:\n"
-            "1) 3-6 bullet key points\n"
-            "2) a 1-paragraph short summary\n"
-            "Do not invent facts that aren't in the note.\n"
-        )
-        user = f"TITLE:\n{title}\n\nNOTE:\n{text}\n\nMake it concise."
-        result = await openai_chat(system=system, user=user)
-
+        qvec, chunks, cached = await copilot_retrieve(db, user_id=user_id, q=q, top_k=top_k)
+    except Exception as e:
         await log_ai_event(
             db,
             user_id=str(user_id),
-            action="summarize",
-            note_id=note_id,
-            ok=True,
+            action="copilot",
+            ok=False,
             latency_ms=t.ms(),
-            meta={"noteChars": len(raw_text), "sentChars": len(text)},
+            meta={"queryChars": len(q), "topK": top_k, "stream": True},
+            error=str(e.detail) if isinstance(e, HTTPException) else str(e),
         )
-        return {"noteId": note_id, "result": result}
+        raise
 
-    except HTTPException as e:
-        await log_ai_event(
+    meta: Dict[str, Any] = {
+        "queryChars": len(q),
+        "topK": top_k,
+        "sources": len(chunks),
+        "cacheHit": bool(cached),
+    }
+    if cached:
+        prompt = ""
+        meta["similarity"] = round(cached["similarity"], 4)
+        meta["promptTokens"] = 0
+    else:
+        prompt, prompt_meta = copilot_prompt(q, chunks)
+        meta.update(prompt_meta)
+
+    async def remember(answer: str) -> None:
+        await copilot_cache.store(
             db,
-            user_id=str(user_id),
-            action="summarize",
-            note_id=note_id,
-            ok=False,
-            latency_ms=t.ms(),
-            error=str(e.detail),
+            owner_id=user_id,
+            query=q,
+            query_vector=qvec,
+            sources=chunks,
+            top_k=top_k,
+            answer=answer,
         )
-        raise
-    except Exception as e:
-        await log_ai_event(
+
+    return _sse_response(
+        _sse_stream(
             db,
-            user_id=str(user_id),
-            action="summarize",
-            note_id=note_id,
-            ok=False,
-            latency_ms=t.ms(),
-            error=str(e),
+            t=t,
+            user_id=user_id,
+            action="copilot",
+            system=COPILOT_SYSTEM,
+            user=prompt,
+            meta=meta,
+            done=lambda answer: {"answer": answer},
+            prelude=(sse_event("sources", chunks),),
+            answer=cached["answer"] if cached else None,
+            on_complete=None if cached else remember,
         )
-        raise
+    )
 
 
-@router.post(
-    "/notes/{note_id}/shorten",
-    response_model=NoteActionResponse,
-    dependencies=[Depends(rl_dep("shorten", 30, 60))],
-)
-async def shorten_note(
-    note_id: str,
-    db=Depends(get_db),
-    current_user: dict = Depends(get_current_user),
-):
+async def run_note_action(action: str, *, note_id: str, db, current_user: dict):
     t = Timer()
     user_id = current_user["_id"]
 
     try:
         note = await get_note_or_404(db, user_id=user_id, note_id=note_id)
-        title = (note.get("title") or "").strip()
-        raw_text = note.get("contentText") or ""
-        text = clamp_text(raw_text, settings.MAX_NOTE_CHARS)
-
-        system = (
-            "You rewrite notes to be shorter while preserving meaning.\n"
-            "Rules:\n"
-            "- Keep all important details\n"
-            "- Remove repetition\n"
-            "- Keep headings if present\n"
-            "- Output ONLY the rewritten note text (no extra commentary)\n"
-        )
-        user = f"TITLE:\n{title}\n\nNOTE:\n{text}\n\nRewrite this note to be ~40-60% shorter."
-        result = await openai_chat(system=system, user=user)
+        system, user, meta = note_action_prompt(action, note)
+        result = await ai_router.chat(action, system=system, user=user)
 
         await log_ai_event(
             db,
             user_id=str(user_id),
-            action="shorten",
+            action=action,
             note_id=note_id,
             ok=True,
             latency_ms=t.ms(),
-            meta={"noteChars": len(raw_text), "sentChars": len(text)},
+            meta=meta,
         )
         return {"noteId": note_id, "result": result}
 
@@ -258,7 +421,7 @@ async def shorten_note(
         await log_ai_event(
             db,
             user_id=str(user_id),
-            action="shorten",
+            action=action,
             note_id=note_id,
             ok=False,
             latency_ms=t.ms(),
@@ -269,7 +432,7 @@ async def shorten_note(
         await log_ai_event(
             db,
             user_id=str(user_id),
-            action="shorten",
+            action=action,
             note_id=note_id,
             ok=False,
             latency_ms=t.ms(),
@@ -278,68 +441,111 @@ async def shorten_note(
         raise
 
 
-@router.post(
-    "/notes/{note_id}/highlights",
-    response_model=NoteActionResponse,
-    dependencies=[Depends(rl_dep("highlights", 30, 60))],
-)
-async def highlight_note(
-    note_id: str,
-    db=Depends(get_db),
-    current_user: dict = Depends(get_current_user),
-):
+async def stream_note_action(action: str, *, note_id: str, db, current_user: dict) -> StreamingResponse:
     t = Timer()
     user_id = current_user["_id"]
 
     try:
         note = await get_note_or_404(db, user_id=user_id, note_id=note_id)
-        title = (note.get("title") or "").strip()
-        raw_text = note.get("contentText") or ""
-        text = clamp_text(raw_text, settings.MAX_NOTE_CHARS)
-
-        system = (
-            "You extract highlights from notes.\n"
-            "Return:\n"
-            "- Action items (checkbox bullets)\n"
-            "- Decisions\n"
-            "- Dates/Deadlines (if any)\n"
-            "- Key terms\n"
-            "If a section is not applicable, write 'None'.\n"
-            "Do not invent anything.\n"
-        )
-        user = f"TITLE:\n{title}\n\nNOTE:\n{text}"
-        result = await openai_chat(system=system, user=user)
-
-        await log_ai_event(
-            db,
-            user_id=str(user_id),
-            action="highlights",
-            note_id=note_id,
-            ok=True,
-            latency_ms=t.ms(),
-            meta={"noteChars": len(raw_text), "sentChars": len(text)},
-        )
-        return {"noteId": note_id, "result": result}
-
     except HTTPException as e:
         await log_ai_event(
             db,
             user_id=str(user_id),
-            action="highlights",
+            action=action,
             note_id=note_id,
             ok=False,
             latency_ms=t.ms(),
+            meta={"stream": True},
             error=str(e.detail),
         )
         raise
-    except Exception as e:
-        await log_ai_event(
+
+    system, user, meta = note_action_prompt(action, note)
+    return _sse_response(
+        _sse_stream(
             db,
-            user_id=str(user_id),
-            action="highlights",
+            t=t,
+            user_id=user_id,
+            action=action,
             note_id=note_id,
-            ok=False,
-            latency_ms=t.ms(),
-            error=str(e),
+            system=system,
+            user=user,
+            meta=meta,
+            done=lambda result: {"noteId": note_id, "result": result},
         )
-        raise
\ No newline at end of file
+    )
+
+
+@router.post(
+    "/notes/{note_id}/summarize",
+    response_model=NoteActionResponse,
+    dependencies=[Depends(rl_dep("summarize", 30, 60))],
+)
+async def summarize_note(
+    note_id: str,
+    db=Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    return await run_note_action("summarize", note_id=note_id, db=db, current_user=current_user)
+
+
+@router.post(
+    "/notes/{note_id}/summarize/stream",
+    dependencies=[Depends(rl_dep("summarize", 30, 60))],
+)
+async def summarize_note_stream(
+    note_id: str,
+    db=Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    return await stream_note_action("summarize", note_id=note_id, db=db, current_user=current_user)
+
+
+@router.post(
+    "/notes/{note_id}/shorten",
+    response_model=NoteActionResponse,
+    dependencies=[Depends(rl_dep("shorten", 30, 60))],
+)
+async def shorten_note(
+    note_id: str,
+    db=Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    return await run_note_action("shorten", note_id=note_id, db=db, current_user=current_user)
+
+
+@router.post(
+    "/notes/{note_id}/shorten/stream",
+    dependencies=[Depends(rl_dep("shorten", 30, 60))],
+)
+async def shorten_note_stream(
+    note_id: str,
+    db=Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    return await stream_note_action("shorten", note_id=note_id, db=db, current_user=current_user)
+
+
+@router.post(
+    "/notes/{note_id}/highlights",
+    response_model=NoteActionResponse,
+    dependencies=[Depends(rl_dep("highlights", 30, 60))],
+)
+async def highlight_note(
+    note_id: str,
+    db=Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    return await run_note_action("highlights", note_id=note_id, db=db, current_user=current_user)
+
+
+@router.post(
+    "/notes/{note_id}/highlights/stream",
+    dependencies=[Depends(rl_dep("highlights", 30, 60))],
+)
+async def highlight_note_stream(
+    note_id: str,
+    db=Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    return await stream_note_action("highlights", note_id=note_id, db=db, current_user=current_user)
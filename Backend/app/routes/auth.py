@@ -1,10 +1,9 @@
-import base64
 from datetime import datetime, timezone
 
 from bson import ObjectId
 from fastapi import APIRouter, Depends, HTTPException, Request, Response, UploadFile, File
 
-from app.auth.hash import hash_password, verify_password
+from app.auth.hash import hash_password, needs_rehash, verify_password
 from app.auth.jwt_handler import (
     create_access_token,
     create_refresh_token,
@@ -41,6 +40,8 @@ from app.services.totp_service import (
     decrypt_totp_secret,
 )
 from app.services.notifications_service import emit_daily_welcome_if_needed
+from app.services.user_cache_service import invalidate_user_principal
+from app.services.avatar_service import AVATAR_MAX_BYTES, avatar_url, sniff_image_type, store_avatar
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
@@ -150,7 +151,7 @@ async def signup(user: UserSignup, db=Depends(get_db)):
         raise HTTPException(status_code=400, detail="User already exists")
 
     now = datetime.now(timezone.utc)
-    hashed = hash_password(user.password)
+    hashed = await hash_password(user.password)
 
     doc = {
         "name": user.name.strip(),
@@ -170,7 +171,7 @@ async def signup(user: UserSignup, db=Depends(get_db)):
         "createdAt": now,
         "updatedAt": now,
         "lastLoginAt": None,
-        "avatarData": None,
+        "avatarHash": None,
         "avatarMime": None,
     }
 
@@ -209,23 +210,30 @@ async def login(user: UserLogin, response: Response, db=Depends(get_db)):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     stored_hash = existing.get("passwordHash") or existing.get("password")
-    if not stored_hash or not verify_password(user.password, stored_hash):
+    if not stored_hash or not await verify_password(user.password, stored_hash):
         logger.warning(f"[AUTH] login failed (wrong password) email={email_lower}")
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     user_id = str(existing["_id"])
 
-    if existing.get("passwordHash") is None and existing.get("password"):
+    legacy_field = existing.get("passwordHash") is None and existing.get("password")
+    rehash = needs_rehash(stored_hash)
+
+    if legacy_field or rehash:
+        # transparent upgrade: the plaintext is only available right now
+        new_hash = await hash_password(user.password) if rehash else stored_hash
         await db.users.update_one(
             {"_id": existing["_id"]},
             {
                 "$set": {
-                    "passwordHash": existing["password"],
+                    "passwordHash": new_hash,
                     "updatedAt": datetime.now(timezone.utc),
                 },
                 "$unset": {"password": ""},
             },
         )
+        if rehash:
+            logger.info(f"[AUTH] password rehashed userId={user_id}")
 
     if existing.get("mfaEnabled"):
 
@@ -434,6 +442,7 @@ async def verify_link_mobile_otp(
             }
         },
     )
+    await invalidate_user_principal(current_user["_id"])
 
     updated = await db.users.find_one({"_id": current_user["_id"]})
 
@@ -488,6 +497,7 @@ async def verify_totp_setup(
             }
         },
     )
+    await invalidate_user_principal(current_user["_id"])
 
     return {"message": "TOTP MFA enabled"}
 
@@ -549,32 +559,35 @@ async def upload_avatar(
 ):
     db = request.app.state.db
 
-    if not avatar.content_type or not avatar.content_type.startswith("image/"):
-        raise HTTPException(status_code=400, detail="Only image files are allowed")
-
     data = await avatar.read()
 
-    if len(data) > 2 * 1024 * 1024:
+    if len(data) > AVATAR_MAX_BYTES:
         raise HTTPException(status_code=400, detail="Image too large (max 2MB)")
 
-    encoded = base64.b64encode(data).decode("utf-8")
+    mime = sniff_image_type(data)
+    if mime is None:
+        raise HTTPException(status_code=400, detail="Only PNG, JPEG, WebP or GIF images are allowed")
+
+    content_hash = await store_avatar(db, data, mime)
 
     await db.users.update_one(
         {"_id": current_user["_id"]},
         {
             "$set": {
-                "avatarData": encoded,
-                "avatarMime": avatar.content_type,
+                "avatarHash": content_hash,
+                "avatarMime": mime,
                 "updatedAt": datetime.now(timezone.utc),
-            }
+            },
+            "$unset": {"avatarData": ""},
         },
     )
+    await invalidate_user_principal(current_user["_id"])
 
-    avatar_url = f"data:{avatar.content_type};base64,{encoded}"
     logger.info(
-        f"[AUTH] avatar uploaded userId={str(current_user['_id'])} mime={avatar.content_type} bytes={len(data)}"
+        f"[AUTH] avatar uploaded userId={str(current_user['_id'])} mime={mime} "
+        f"bytes={len(data)} hash={content_hash}"
     )
-    return {"message": "Avatar updated", "avatarUrl": avatar_url}
+    return {"message": "Avatar updated", "avatarUrl": avatar_url(content_hash)}
 
 
 # Update profile
@@ -612,14 +625,14 @@ async def patch_me(
             update_doc["emailLower"] = new_email
             update_doc["isEmailVerified"] = False
 
-    if len(update_doc) == 1:
-        return _serialize_user(current_user)
-
-    await db.users.update_one(
-        {"_id": current_user["_id"]},
-        {"$set": update_doc},
-    )
+    if len(update_doc) > 1:
+        await db.users.update_one(
+            {"_id": current_user["_id"]},
+            {"$set": update_doc},
+        )
+        await invalidate_user_principal(current_user["_id"])
 
+    # the cached principal lacks avatarData, which legacy avatar URLs need
     updated = await db.users.find_one({"_id": current_user["_id"]})
     return _serialize_user(updated)
 
@@ -631,17 +644,22 @@ async def patch_me_password(
     current_user: dict = Depends(get_current_user),
     db=Depends(get_db),
 ):
-    stored_hash = current_user.get("passwordHash") or current_user.get("password")
+    # the cached principal never carries password hashes
+    creds = await db.users.find_one(
+        {"_id": current_user["_id"]},
+        {"passwordHash": 1, "password": 1},
+    ) or {}
+    stored_hash = creds.get("passwordHash") or creds.get("password")
     if not stored_hash:
         raise HTTPException(status_code=400, detail="Password not set for this account")
 
-    if not verify_password(payload.currentPassword, stored_hash):
+    if not await verify_password(payload.currentPassword, stored_hash):
         raise HTTPException(status_code=400, detail="Current password is incorrect")
 
     if payload.currentPassword == payload.newPassword:
         raise HTTPException(status_code=400, detail="New password must be different")
 
-    new_hash = hash_password(payload.newPassword)
+    new_hash = await hash_password(payload.newPassword)
 
     await db.users.update_one(
         {"_id": current_user["_id"]},
@@ -653,6 +671,7 @@ async def patch_me_password(
             "$unset": {"password": ""},
         },
     )
+    await invalidate_user_principal(current_user["_id"])
 
     logger.info(f"[AUTH] password updated userId={str(current_user['_id'])}")
     return {"message": "Password updated successfully"}
\ No newline at end of file
@@ -0,0 +1,63 @@
+import re
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+
+from app.core.logger import logger
+from app.services.avatar_service import (
+    ALLOWED_AVATAR_TYPES,
+    AVATAR_ROUTE_PREFIX,
+    THUMBNAIL_SIZES,
+    load_avatar,
+)
+
+router = APIRouter(prefix=AVATAR_ROUTE_PREFIX, tags=["Avatars"])
+
+HASH_RE = re.compile(r"^[0-9a-f]{64}$")
+
+# Content-addressed: a given URL never changes, so browsers and CDNs can keep it forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Served from the API origin: never sniff, never run anything
+AVATAR_SECURITY_HEADERS = {
+    "X-Content-Type-Options": "nosniff",
+    "Content-Security-Policy": "default-src 'none'; sandbox",
+}
+
+
+def get_db(request: Request):
+    db = getattr(request.app.state, "db", None)
+    if db is None:
+        raise HTTPException(status_code=503, detail="DB not ready")
+    return db
+
+
+@router.get("/{content_hash}")
+async def get_avatar(
+    content_hash: str,
+    request: Request,
+    size: Optional[int] = Query(None, description=f"Thumbnail size: one of {THUMBNAIL_SIZES}"),
+):
+    if not HASH_RE.fullmatch(content_hash):
+        raise HTTPException(status_code=404, detail="Avatar not found")
+
+    if size is not None and size not in THUMBNAIL_SIZES:
+        raise HTTPException(status_code=400, detail=f"size must be one of {THUMBNAIL_SIZES}")
+
+    etag = f'"{content_hash}@{size}"' if size else f'"{content_hash}"'
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL, **AVATAR_SECURITY_HEADERS}
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    found = await load_avatar(get_db(request), content_hash, size)
+    if not found:
+        logger.warning(f"[AVATAR] not found hash={content_hash}")
+        raise HTTPException(status_code=404, detail="Avatar not found")
+
+    data, mime = found
+    if mime not in ALLOWED_AVATAR_TYPES:
+        # stored before uploads were checked
+        logger.warning(f"[AVATAR] refusing to serve mime={mime} hash={content_hash}")
+        raise HTTPException(status_code=404, detail="Avatar not found")
+    return Response(content=data, media_type=mime, headers=headers)
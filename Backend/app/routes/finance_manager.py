@@ -3,7 +3,7 @@ from __future__ import annotations
 from datetime import datetime, timezone
 from typing import Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 
 from app.deps.auth_deps import get_current_user
 from app.schemas.finance_manager_schema import (
@@ -23,6 +23,7 @@ from app.schemas.finance_manager_schema import (
     FinanceTransactionUpdate,
     MessageResponse,
 )
+from app.util.pagination import NEXT_CURSOR_HEADER
 from app.services.finance_manager_service import (
     create_finance_account,
     create_finance_budget,
@@ -173,15 +174,18 @@ async def create_transaction_route(
 
 @router.get("/transactions", response_model=list[FinanceTransactionOut])
 async def list_transactions_route(
+    response: Response,
     start_date: Optional[datetime] = Query(default=None, alias="startDate"),
     end_date: Optional[datetime] = Query(default=None, alias="endDate"),
     type_filter: Optional[Literal["income", "expense", "transfer"]] = Query(default=None, alias="type"),
     category_id: Optional[str] = Query(default=None, alias="categoryId"),
     account_id: Optional[str] = Query(default=None, alias="accountId"),
+    limit: int = Query(default=1000, ge=1, le=1000),
+    cursor: Optional[str] = Query(default=None),
     db=Depends(get_db),
     user_id: str = Depends(get_user_id),
 ):
-    return await list_finance_transactions(
+    items, nxt = await list_finance_transactions(
         db=db,
         user_id=user_id,
         start_date=start_date,
@@ -189,7 +193,12 @@ async def list_transactions_route(
         type_filter=type_filter,
         category_id=category_id,
         account_id=account_id,
+        limit=limit,
+        cursor=cursor,
     )
+    if nxt:
+        response.headers[NEXT_CURSOR_HEADER] = nxt
+    return items
 
 
 @router.patch("/transactions/{transaction_id}", response_model=FinanceTransactionOut)
@@ -1,5 +1,16 @@
 from fastapi import APIRouter, Request
+from app.auth.hash import password_hasher
+from app.core.http_client import ai_http
 from app.core.redis import get_redis
+from app.services.ai.router import ai_router
+from app.services.copilot_cache_service import copilot_cache
+from app.services.embedding_cache_service import embedding_cache
+from app.services.note_index_service import note_indexer
+from app.services.vector_search_service import vector_search
+from app.services.notes_search_service import notes_search
+from app.services.hybrid_retrieval_service import hybrid_retriever
+from app.services.url_cache_service import hot_link_cache
+from app.services.click_counter_service import click_counter
 
 router = APIRouter(prefix="/health", tags=["Health"])
 
@@ -12,4 +23,44 @@ async def db_health(request: Request):
 async def redis_health():
     r = get_redis()
     pong = await r.ping()
-    return {"redis": "ok" if pong else "down"}
\ No newline at end of file
+    return {"redis": "ok" if pong else "down"}
+
+@router.get("/url-cache")
+async def url_cache_metrics():
+    return {**hot_link_cache.stats(), "clicks": click_counter.stats()}
+
+@router.get("/password-hasher")
+async def password_hasher_metrics():
+    return password_hasher.stats()
+
+@router.get("/ai-http")
+async def ai_http_metrics():
+    return ai_http.stats()
+
+@router.get("/ai-router")
+async def ai_router_metrics():
+    return ai_router.stats()
+
+@router.get("/embedding-cache")
+async def embedding_cache_metrics():
+    return embedding_cache.stats()
+
+@router.get("/note-indexer")
+async def note_indexer_metrics():
+    return note_indexer.stats()
+
+@router.get("/vector-search")
+async def vector_search_metrics():
+    return vector_search.stats()
+
+@router.get("/notes-search")
+async def notes_search_metrics():
+    return notes_search.stats()
+
+@router.get("/hybrid-retrieval")
+async def hybrid_retrieval_metrics():
+    return hybrid_retriever.stats()
+
+@router.get("/copilot-cache")
+async def copilot_cache_metrics():
+    return copilot_cache.stats()
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, Query
 from datetime import datetime, timezone
 from typing import List, Optional
 from bson import ObjectId
@@ -7,13 +7,18 @@ from pymongo import ReturnDocument
 from app.schemas.notes_schema import NoteCreate, NoteUpdate, NoteOut
 from app.deps.auth_deps import get_current_user
 from app.core.logger import logger
-from app.util.html_text import html_to_text
+from app.util.html_text import note_content_fields
 from app.config import settings
+from app.util.pagination import NEXT_CURSOR_HEADER, apply_keyset, next_cursor
 
-from app.services.ai_notes import upsert_note_chunks
+from app.services.ai_notes import delete_note_chunks
+from app.services.note_index_service import note_indexer
+from app.services.notes_search_service import SEARCH_RANKED_HEADER, is_search_cursor, notes_search
 
 router = APIRouter(prefix="/api/notes", tags=["Notes"])
 
+NOTES_SORT = [("pinned", -1), ("updatedAt", -1), ("_id", -1)]
+
 
 def get_db(request: Request):
     db = getattr(request.app.state, "db", None)
@@ -34,6 +39,7 @@ def to_note_out(doc) -> NoteOut:
         isTrashed=doc.get("isTrashed", False),
         createdAt=doc["createdAt"],
         updatedAt=doc["updatedAt"],
+        snippet=doc.get("snippet"),
     )
 
 # Create Note
@@ -49,7 +55,6 @@ async def create_note(
 
     title = (payload.title or "").strip()
     content_html = payload.contentHtml or ""
-    content_text = html_to_text(content_html)
 
     logger.info(
         f"[NOTES] create_note userId={str(user_id)} title_len={len(title)} "
@@ -59,8 +64,7 @@ async def create_note(
     doc = {
         "userId": user_id,
         "title": title,
-        "contentHtml": content_html,
-        "contentText": content_text,
+        **note_content_fields(content_html),
         "tags": [t.strip() for t in (payload.tags or []) if t.strip()],
         "pinned": payload.pinned,
         "createdAt": now,
@@ -72,20 +76,8 @@ async def create_note(
     res = await db.notes.insert_one(doc)
     doc["_id"] = res.inserted_id
 
-    try:
-        await upsert_note_chunks(
-            db,
-            user_id=str(user_id),
-            note_id=str(doc["_id"]),
-            title=doc["title"],
-            content=doc.get("contentText", "") or "",
-            api_key=settings.OPENAI_API_KEY,
-            embed_model=settings.OPENAI_EMBED_MODEL,
-        )
-    except Exception as e:
-        logger.exception(
-            f"[AI] upsert_note_chunks failed on create note_id={doc['_id']} userId={str(user_id)}: {e}"
-        )
+    await notes_search.note_changed(owner_id=user_id, note_id=str(doc["_id"]), doc=doc)
+    note_indexer.schedule(str(user_id), str(doc["_id"]))
 
     logger.info(f"[NOTES] created note_id={doc['_id']} userId={str(user_id)}")
     return to_note_out(doc)
@@ -93,11 +85,19 @@ async def create_note(
 # List Notes
 @router.get("", response_model=List[NoteOut])
 async def list_notes(
+    response: Response,
     db=Depends(get_db),
     current_user: dict = Depends(get_current_user),
     limit: int = Query(50, ge=1, le=200),
-    skip: int = Query(0, ge=0),
-    q: Optional[str] = Query(None, description="Search in title/contentHtml/tags"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from X-Next-Cursor"),
+    skip: int = Query(0, ge=0, deprecated=True),
+    q: Optional[str] = Query(
+        None,
+        description=(
+            "Full-text search over title/content/tags, ranked by relevance. While the search index "
+            "loads, results are unranked substring matches and X-Search-Ranked is false"
+        ),
+    ),
     pinned: Optional[bool] = Query(None),
     tag: Optional[str] = Query(None, description="Filter by single tag"),
     trashed: Optional[bool] = Query(False),
@@ -120,22 +120,57 @@ async def list_notes(
     if trashed is not None:
         filt["isTrashed"] = trashed
 
+    q = (q or "").strip()
+
+    found = None
+    if q and notes_search.enabled and (not cursor or is_search_cursor(cursor)):
+        # a later page continues in the mode its first page was served in
+        found = await notes_search.search(
+            db,
+            owner_id=user_id,
+            q=q,
+            limit=limit,
+            cursor=cursor,
+            offset=skip if not cursor else 0,
+            pinned=pinned,
+            trashed=trashed,
+            tag=tag.strip() if tag else None,
+            wait=bool(cursor),
+        )
+        if found is None and cursor:
+            # the index this cursor came from could not be loaded
+            logger.warning(f"[NOTES] list_notes search index unavailable userId={str(user_id)}")
+            raise HTTPException(status_code=503, detail="Search temporarily unavailable")
+
+    # None while the index is loading: the regex scan below answers meanwhile
+    if found is not None:
+        items, nxt = found
+        response.headers[SEARCH_RANKED_HEADER] = "true"
+        if nxt:
+            response.headers[NEXT_CURSOR_HEADER] = nxt
+
+        logger.info(f"[NOTES] list_notes search userId={str(user_id)} returned={len(items)}")
+        return [to_note_out(d) for d in items]
+
     if q:
-        q = q.strip()
+        if notes_search.enabled:
+            response.headers[SEARCH_RANKED_HEADER] = "false"
         filt["$or"] = [
             {"title": {"$regex": q, "$options": "i"}},
             {"contentText": {"$regex": q, "$options": "i"}},
             {"tags": {"$elemMatch": {"$regex": q, "$options": "i"}}},
         ]
 
-    cursor = (
-        db.notes.find(filt)
-        .sort([("pinned", -1), ("updatedAt", -1)])
-        .skip(skip)
-        .limit(limit)
-    )
+    query = db.notes.find(apply_keyset(filt, NOTES_SORT, cursor)).sort(NOTES_SORT)
+    if skip and not cursor:
+        query = query.skip(skip)
+
+    items = await query.limit(limit).to_list(length=limit)
+
+    nxt = next_cursor(items, NOTES_SORT, limit)
+    if nxt:
+        response.headers[NEXT_CURSOR_HEADER] = nxt
 
-    items = await cursor.to_list(length=limit)
     logger.info(f"[NOTES] list_notes userId={str(user_id)} returned={len(items)}")
     return [to_note_out(d) for d in items]
 
@@ -185,8 +220,7 @@ async def update_note(
         update["title"] = payload.title.strip()
 
     if payload.contentHtml is not None:
-        update["contentHtml"] = payload.contentHtml
-        update["contentText"] = html_to_text(payload.contentHtml or "")
+        update.update(note_content_fields(payload.contentHtml or ""))
 
     if payload.tags is not None:
         update["tags"] = [t.strip() for t in payload.tags if t.strip()]
@@ -218,24 +252,20 @@ async def update_note(
         logger.warning(f"[NOTES] update_note not found userId={str(user_id)} note_id={note_id}")
         raise HTTPException(status_code=404, detail="Note not found")
 
-    try:
-        is_trashed = bool(res.get("isTrashed", False))
-        if is_trashed:
-            await db.note_chunks.delete_many({"userId": user_id, "noteId": str(res["_id"])})
-        else:
-            await upsert_note_chunks(
-                db,
-                user_id=str(user_id),
-                note_id=str(res["_id"]),
-                title=res.get("title", "") or "",
-                content=res.get("contentText", "") or "",
-                api_key=settings.OPENAI_API_KEY,
-                embed_model=settings.OPENAI_EMBED_MODEL,
+    await notes_search.note_changed(owner_id=user_id, note_id=str(res["_id"]), doc=res)
+
+    if res.get("isTrashed", False):
+        try:
+            await delete_note_chunks(db, user_id=user_id, note_id=str(res["_id"]))
+        except Exception as e:
+            logger.exception(
+                f"[AI] delete note_chunks failed on trash note_id={note_id} userId={str(user_id)}: {e}"
             )
-    except Exception as e:
-        logger.exception(
-            f"[AI] embedding sync failed on update note_id={note_id} userId={str(user_id)}: {e}"
-        )
+    if {"title", "contentHtml", "isTrashed"} & update.keys():
+        # pin/tag-only edits don't change the embedded text. On trash this
+        # also runs after an in-flight index job, which read the note before
+        # the trash and would otherwise leave its chunks behind.
+        note_indexer.schedule(str(user_id), str(res["_id"]))
 
     logger.info(f"[NOTES] update_note success userId={str(user_id)} note_id={note_id}")
     return to_note_out(res)
@@ -261,12 +291,16 @@ async def delete_note(
         logger.warning(f"[NOTES] delete_note not found userId={str(user_id)} note_id={note_id}")
         raise HTTPException(status_code=404, detail="Note not found")
 
+    await notes_search.note_changed(owner_id=user_id, note_id=note_id, doc=None)
+
     try:
-        await db.note_chunks.delete_many({"userId": user_id, "noteId": note_id})
+        await delete_note_chunks(db, user_id=user_id, note_id=note_id)
     except Exception as e:
         logger.exception(
             f"[AI] delete note_chunks failed note_id={note_id} userId={str(user_id)}: {e}"
         )
+    # runs after any in-flight index job for the note and removes what it wrote
+    note_indexer.schedule(str(user_id), note_id)
 
     logger.info(f"[NOTES] delete_note success userId={str(user_id)} note_id={note_id}")
     return {"ok": True}
\ No newline at end of file
@@ -31,7 +31,8 @@ def get_db(request: Request):
 async def get_notifications(
     request: Request,
     limit: int = Query(default=20, ge=1, le=100),
-    skip: int = Query(default=0, ge=0),
+    cursor: str | None = Query(default=None),
+    skip: int = Query(default=0, ge=0, deprecated=True),
     unreadOnly: bool = Query(default=False),
     current_user_id: str = Depends(get_current_user_id),
 ):
@@ -43,6 +44,7 @@ async def get_notifications(
         limit=limit,
         skip=skip,
         unread_only=unreadOnly,
+        cursor=cursor,
     )
     return data
 
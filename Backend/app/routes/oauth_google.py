@@ -7,6 +7,7 @@ from authlib.integrations.starlette_client import OAuth
 from app.auth.jwt_handler import create_access_token, create_refresh_token, create_mfa_token
 from app.config import settings
 from app.core.logger import logger
+from app.services.user_cache_service import invalidate_user_principal
 
 router = APIRouter(prefix="/auth/google", tags=["OAuth"])
 
@@ -126,6 +127,7 @@ async def google_callback(request: Request, db=Depends(get_db)):
             update_doc["isEmailVerified"] = True
 
         await db.users.update_one({"_id": user["_id"]}, {"$set": update_doc})
+        await invalidate_user_principal(user["_id"])
         user = await db.users.find_one({"_id": user["_id"]})
     else:
         doc = {
@@ -149,7 +151,7 @@ async def google_callback(request: Request, db=Depends(get_db)):
             "createdAt": now,
             "updatedAt": now,
             "lastLoginAt": now,
-            "avatarData": None,
+            "avatarHash": None,
             "avatarMime": None,
             "picture": picture,
         }
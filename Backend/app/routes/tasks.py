@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, Query
 from datetime import datetime, timezone
 from typing import List, Optional
 from bson import ObjectId
@@ -7,9 +7,12 @@ from pymongo import ReturnDocument
 from app.schemas.tasks_schema import TaskCreate, TaskUpdate, TaskOut, TaskStatus
 from app.deps.auth_deps import get_current_user
 from app.core.logger import logger
+from app.util.pagination import NEXT_CURSOR_HEADER, apply_keyset, next_cursor
 
 router = APIRouter(prefix="/api/tasks", tags=["Tasks"])
 
+TASKS_SORT = [("updatedAt", -1), ("_id", -1)]
+
 
 def get_db(request: Request):
     db = getattr(request.app.state, "db", None)
@@ -65,10 +68,12 @@ async def create_task(
 
 @router.get("", response_model=List[TaskOut])
 async def list_tasks(
+    response: Response,
     current_user: dict = Depends(get_current_user),
     db=Depends(get_db),
     limit: int = Query(200, ge=1, le=500),
-    skip: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from X-Next-Cursor"),
+    skip: int = Query(0, ge=0, deprecated=True),
     q: Optional[str] = Query(None, description="Search in title/note"),
     status: Optional[TaskStatus] = Query(None, description="Filter by status"),
 ):
@@ -92,14 +97,16 @@ async def list_tasks(
                 {"note": {"$regex": qq, "$options": "i"}},
             ]
 
-    cursor = (
-        db.tasks.find(filt)
-        .sort([("updatedAt", -1)])
-        .skip(skip)
-        .limit(limit)
-    )
+    query = db.tasks.find(apply_keyset(filt, TASKS_SORT, cursor)).sort(TASKS_SORT)
+    if skip and not cursor:
+        query = query.skip(skip)
+
+    items = await query.limit(limit).to_list(length=limit)
+
+    nxt = next_cursor(items, TASKS_SORT, limit)
+    if nxt:
+        response.headers[NEXT_CURSOR_HEADER] = nxt
 
-    items = await cursor.to_list(length=limit)
     logger.info(f"[TASKS] list_tasks userId={str(user_id)} returned={len(items)}")
     return [to_task_out(d) for d in items]
 
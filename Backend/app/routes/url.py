@@ -1,13 +1,28 @@
+import json
 from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Depends, Request, Query
+from fastapi import APIRouter, HTTPException, Depends, Request, Response, Query
 from datetime import datetime, timedelta, timezone
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, StreamingResponse
+from pymongo.errors import DuplicateKeyError
 
-from app.schemas.url_schemas import ShortenRequest, ShortenResponse, UrlInfo
-from ..utils import generate_short_id
+from app.schemas.url_schemas import ShortenRequest, ShortenResponse, UrlInfo, UrlStats
 from app.config import settings
 from app.core.logger import logger
 from app.deps.auth_deps import get_current_user
+from app.services.url_cache_service import hot_link_cache
+from app.services.short_id_service import allocate_short_ids
+from app.services.url_bulk_service import (
+    BULK_CHUNK_SIZE,
+    NDJSON_MEDIA_TYPE,
+    insert_short_url_batch,
+    item_error,
+    read_bulk_items,
+    parse_bulk_item,
+)
+from app.services.click_counter_service import click_counter
+from app.services.url_search_service import url_search_filter, url_search_terms
+from app.util.pagination import NEXT_CURSOR_HEADER, keyset_filter, next_cursor
+from app.services.url_analytics_service import DEFAULT_WINDOW, Granularity, summarize_buckets
 
 router = APIRouter(prefix="/api/url", tags=["urls"])
 redirect_router = APIRouter(tags=["redirect"])
@@ -37,47 +52,53 @@ async def create_short_url(
         f"longUrl={str(payload.longUrl)[:80]}"
     )
 
+    now = datetime.now(timezone.utc)
+    expires_at = now + timedelta(days=settings.URL_EXPIRY_DAYS)
+
+    doc = {
+        "userId": user_id,
+        "shortId": None,
+        "longUrl": str(payload.longUrl),
+        "createdAt": now,
+        "expiresAt": expires_at,
+        "clicks": 0,
+        "lastAccessed": None,
+    }
+
+    # No pre-insert probes: the unique shortId index is the arbiter.
     if payload.alias:
-        exists = await db.urls.find_one({"shortId": payload.alias})
-        if exists:
+        doc["shortId"] = payload.alias
+        doc["searchTerms"] = url_search_terms(payload.alias, doc["longUrl"])
+        try:
+            res = await db.urls.insert_one(doc)
+        except DuplicateKeyError:
             logger.warning(
                 f"[URL] shorten failed alias_in_use userId={str(user_id)} alias={payload.alias}"
             )
             raise HTTPException(status_code=409, detail="Alias already in use")
-        short_id = payload.alias
-        logger.info(f"[URL] shorten using alias userId={str(user_id)} shortId={short_id}")
+        logger.info(f"[URL] shorten using alias userId={str(user_id)} shortId={payload.alias}")
     else:
-        short_id = None
+        res = None
         for attempt in range(1, 6):
-            candidate = generate_short_id()
-            exists = await db.urls.find_one({"shortId": candidate})
-            if not exists:
-                short_id = candidate
-                logger.info(
-                    f"[URL] shorten generated userId={str(user_id)} shortId={short_id} attempt={attempt}"
-                )
-                break
+            doc["shortId"] = (await allocate_short_ids(db, 1))[0]
+            doc["searchTerms"] = url_search_terms(doc["shortId"], doc["longUrl"])
+            doc.pop("_id", None)
+            try:
+                res = await db.urls.insert_one(doc)
+            except DuplicateKeyError:
+                continue
+            logger.info(
+                f"[URL] shorten generated userId={str(user_id)} shortId={doc['shortId']} attempt={attempt}"
+            )
+            break
 
-        if not short_id:
+        if res is None:
             logger.error(
                 f"[URL] shorten failed userId={str(user_id)} could not generate unique id after 5 attempts"
             )
             raise HTTPException(status_code=500, detail="Failed to generate unique id")
 
-    now = datetime.now(timezone.utc)
-    expires_at = now + timedelta(days=settings.URL_EXPIRY_DAYS)
-
-    doc = {
-        "userId": user_id,
-        "shortId": short_id,
-        "longUrl": str(payload.longUrl),
-        "createdAt": now,
-        "expiresAt": expires_at,
-        "clicks": 0,
-        "lastAccessed": None,
-    }
-
-    res = await db.urls.insert_one(doc)
+    short_id = doc["shortId"]
 
     short_url = f"{settings.BASE_URL}{REDIRECT_PREFIX}/{short_id}"
     logger.info(
@@ -87,6 +108,62 @@ async def create_short_url(
     return ShortenResponse(shortId=short_id, shortUrl=short_url)
 
 
+@router.post("/shorten/bulk")
+async def create_short_urls_bulk(
+    request: Request,
+    current_user: dict = Depends(get_current_user),
+    db=Depends(get_db),
+):
+    """
+    Accepts a JSON list (or {"items": [...]}) or an NDJSON stream of
+    ShortenRequest items and streams back one NDJSON result per item:
+      {"index", "ok", "shortId", "shortUrl"} or {"index", "ok": false, "error"}
+    Items are inserted in chunks of BULK_CHUNK_SIZE with unordered insert_many.
+    """
+    user_id = current_user["_id"]
+    items = await read_bulk_items(request)
+
+    logger.info(f"[URL] bulk shorten request userId={str(user_id)}")
+
+    def _line(result: dict) -> str:
+        if result.get("ok"):
+            result["shortUrl"] = f"{settings.BASE_URL}{REDIRECT_PREFIX}/{result['shortId']}"
+        return json.dumps(result) + "\n"
+
+    async def _results():
+        index = 0
+        created = 0
+        batch = []
+
+        async for raw in items:
+            if index >= settings.URL_BULK_MAX_ITEMS:
+                yield _line(item_error(index, f"Too many items (max {settings.URL_BULK_MAX_ITEMS})"))
+                break
+
+            try:
+                batch.append((index, parse_bulk_item(raw)))
+            except Exception as e:
+                yield _line(item_error(index, e))
+            index += 1
+
+            if len(batch) >= BULK_CHUNK_SIZE:
+                for result in await insert_short_url_batch(db, user_id=user_id, batch=batch):
+                    created += bool(result["ok"])
+                    yield _line(result)
+                batch = []
+
+        if batch:
+            for result in await insert_short_url_batch(db, user_id=user_id, batch=batch):
+                created += bool(result["ok"])
+                yield _line(result)
+
+        logger.info(
+            f"[URL] bulk shorten success userId={str(user_id)} items={index} created={created}"
+        )
+
+    return StreamingResponse(_results(), media_type=NDJSON_MEDIA_TYPE)
+
+
 @router.get("/info/{shortId}", response_model=UrlInfo)
 async def get_info(
     shortId: str,
@@ -138,54 +215,66 @@ async def delete_short(
         logger.warning(f"[URL] delete not found userId={str(user_id)} shortId={shortId}")
         raise HTTPException(status_code=404, detail="Not found")
 
+    await hot_link_cache.invalidate(shortId)
+    await db.url_click_buckets.delete_many({"shortId": shortId})
+
     logger.info(f"[URL] delete success userId={str(user_id)} shortId={shortId}")
     return {"ok": True}
 
 
+LINKS_SORT = [("createdAt", -1), ("_id", -1)]
+
+
 @router.get("/links", response_model=List[UrlInfo])
 async def list_links(
     request: Request,
+    response: Response,
     current_user: dict = Depends(get_current_user),
     db=Depends(get_db),
     limit: int = Query(100, ge=1, le=500),
-    q: Optional[str] = Query(None, description="Search in shortId or longUrl"),
+    q: Optional[str] = Query(None, description="Search by shortId prefix or longUrl host/path terms"),
     include_expired: bool = Query(True, description="Include expired links"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from X-Next-Cursor"),
 ):
     user_id = current_user["_id"]
 
     logger.info(
         f"[URL] list_links request userId={str(user_id)} limit={limit} "
-        f"q={'yes' if q else 'no'} include_expired={include_expired}"
+        f"q={'yes' if q else 'no'} include_expired={include_expired} cursor={'yes' if cursor else 'no'}"
     )
 
     filt = {"userId": user_id}
+    clauses = []
 
     if q:
-        filt["$and"] = [
+        search = url_search_filter(q)
+        if search:
+            clauses.append(search)
+
+    if not include_expired:
+        now = datetime.now(timezone.utc)
+        clauses.append(
             {
                 "$or": [
-                    {"shortId": {"$regex": q, "$options": "i"}},
-                    {"longUrl": {"$regex": q, "$options": "i"}},
+                    {"expiresAt": {"$exists": False}},
+                    {"expiresAt": {"$gt": now}},
                 ]
             }
-        ]
+        )
 
-    if not include_expired:
-        now = datetime.now(timezone.utc)
-        not_expired = {
-            "$or": [
-                {"expiresAt": {"$exists": False}},
-                {"expiresAt": {"$gt": now}},
-            ]
-        }
+    after = keyset_filter(LINKS_SORT, cursor)
+    if after:
+        clauses.append(after)
+
+    if clauses:
+        filt["$and"] = clauses
 
-        if "$and" in filt:
-            filt["$and"].append(not_expired)
-        else:
-            filt["$and"] = [not_expired]
+    cur = db.urls.find(filt, {"searchTerms": 0}).sort(LINKS_SORT).limit(limit)
+    items = await cur.to_list(length=limit)
 
-    cursor = db.urls.find(filt, {"_id": 0}).sort("createdAt", -1).limit(limit)
-    items = await cursor.to_list(length=limit)
+    nxt = next_cursor(items, LINKS_SORT, limit)
+    if nxt:
+        response.headers[NEXT_CURSOR_HEADER] = nxt
 
     for it in items:
         it["shortUrl"] = f"{settings.BASE_URL}{REDIRECT_PREFIX}/{it['shortId']}"
@@ -194,6 +283,54 @@ async def list_links(
     return [UrlInfo(**it) for it in items]
 
 
+@router.get("/stats/{shortId}", response_model=UrlStats)
+async def get_stats(
+    shortId: str,
+    request: Request,
+    current_user: dict = Depends(get_current_user),
+    db=Depends(get_db),
+    granularity: Granularity = Query("hour"),
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+):
+    user_id = current_user["_id"]
+
+    logger.info(
+        f"[URL] stats request userId={str(user_id)} shortId={shortId} granularity={granularity}"
+    )
+
+    owned = await db.urls.find_one({"shortId": shortId, "userId": user_id}, {"_id": 1})
+    if not owned:
+        logger.warning(f"[URL] stats not found userId={str(user_id)} shortId={shortId}")
+        raise HTTPException(status_code=404, detail="Not found")
+
+    end = end or datetime.now(timezone.utc)
+    start = start or end - DEFAULT_WINDOW[granularity]
+
+    cursor = db.url_click_buckets.find(
+        {
+            "shortId": shortId,
+            "granularity": granularity,
+            "bucket": {"$gte": start, "$lte": end},
+        },
+        {"_id": 0, "bucket": 1, "clicks": 1, "referrers": 1, "agents": 1},
+    ).sort("bucket", 1)
+    docs = await cursor.to_list(length=None)
+
+    summary = summarize_buckets(docs)
+
+    logger.info(
+        f"[URL] stats success userId={str(user_id)} shortId={shortId} buckets={len(docs)}"
+    )
+    return UrlStats(
+        shortId=shortId,
+        granularity=granularity,
+        start=start,
+        end=end,
+        **summary,
+    )
+
+
 # --- REDIRECT ROUTE ---
 @redirect_router.get("/r/{shortId}", include_in_schema=False)
 async def redirect(shortId: str, request: Request):
@@ -204,23 +341,22 @@ async def redirect(shortId: str, request: Request):
 
     logger.info(f"[URL] redirect hit shortId={shortId}")
 
-    doc = await db.urls.find_one({"shortId": shortId})
-    if not doc:
+    link = await hot_link_cache.resolve(db, shortId)
+    if not link:
         logger.warning(f"[URL] redirect not found shortId={shortId}")
         raise HTTPException(status_code=404, detail="Short URL not found")
 
-    if doc.get("expiresAt") and doc["expiresAt"] <= datetime.now(timezone.utc):
+    if link.get("expiresAt") and link["expiresAt"] <= datetime.now(timezone.utc):
         logger.warning(f"[URL] redirect expired shortId={shortId}")
+        await hot_link_cache.invalidate(shortId)
         raise HTTPException(status_code=410, detail="This link has expired")
 
-    await db.urls.update_one(
-        {"_id": doc["_id"]},
-        {
-            "$inc": {"clicks": 1},
-            "$set": {"lastAccessed": datetime.now(timezone.utc)},
-        },
+    click_counter.record(
+        shortId,
+        referrer=request.headers.get("referer"),
+        user_agent=request.headers.get("user-agent"),
     )
 
-    logger.info(f"[URL] redirect success shortId={shortId} -> {doc['longUrl'][:80]}")
+    logger.info(f"[URL] redirect success shortId={shortId} -> {link['longUrl'][:80]}")
 
-    return RedirectResponse(url=doc["longUrl"], status_code=307)
\ No newline at end of file
+    return RedirectResponse(url=link["longUrl"], status_code=307)
\ No newline at end of file
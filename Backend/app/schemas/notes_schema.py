@@ -24,4 +24,5 @@ class NoteOut(BaseModel):
   pinned: bool
   isTrashed: bool
   createdAt: datetime
-  updatedAt: datetime
\ No newline at end of file
+  updatedAt: datetime
+  snippet: Optional[str] = None
@@ -41,6 +41,7 @@ class NotificationsListResponse(NotificationsBaseSchema):
     items: list[NotificationItem]
     total: int
     unreadCount: int
+    nextCursor: Optional[str] = None
 
 
 class NotificationUnreadCountResponse(NotificationsBaseSchema):
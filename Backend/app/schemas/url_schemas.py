@@ -1,5 +1,6 @@
 from pydantic import BaseModel, AnyHttpUrl, field_validator
 from datetime import datetime
+from typing import Literal
 
 ALIAS_RE = r"^[a-z0-9-_]{3,30}$"
 RESERVED = {"api", "r", "admin", "login", "logout", "static", "healthz"}
@@ -36,3 +37,19 @@ class UrlInfo(BaseModel):
     clicks: int
     lastAccessed: datetime | None = None
     shortUrl: AnyHttpUrl | None = None
+
+
+class UrlStatsBucket(BaseModel):
+    bucket: datetime
+    clicks: int
+
+
+class UrlStats(BaseModel):
+    shortId: str
+    granularity: Literal["minute", "hour", "day"]
+    start: datetime
+    end: datetime
+    totalClicks: int
+    buckets: list[UrlStatsBucket]
+    referrers: dict[str, int]
+    agents: dict[str, int]
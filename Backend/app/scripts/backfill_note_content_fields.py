@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from pymongo import UpdateOne
+
+from app.scripts.migrations import is_done, mark_done
+from app.util.html_text import note_content_fields
+
+MIGRATION_ID = "note_content_fields_v2"
+BATCH_SIZE = 500
+
+
+async def backfill_note_content_fields_if_needed(db) -> None:
+    """
+    Sanitizes stored contentHtml and recomputes contentText plus
+    wordCount/outline/links on existing notes.
+    """
+    if await is_done(db, MIGRATION_ID):
+        return
+
+    cursor = db.notes.find({}, {"_id": 1, "contentHtml": 1, "wordCount": 1})
+
+    updated = 0
+    ops = []
+    async for doc in cursor:
+        html = doc.get("contentHtml") or ""
+        fields = note_content_fields(html)
+        if fields["contentHtml"] == html and "wordCount" in doc:
+            continue
+        # match on contentHtml so a concurrent edit isn't overwritten
+        ops.append(
+            UpdateOne(
+                {"_id": doc["_id"], "contentHtml": doc.get("contentHtml")},
+                {"$set": fields},
+            )
+        )
+        if len(ops) >= BATCH_SIZE:
+            await db.notes.bulk_write(ops, ordered=False)
+            updated += len(ops)
+            ops = []
+
+    if ops:
+        await db.notes.bulk_write(ops, ordered=False)
+        updated += len(ops)
+
+    await mark_done(db, MIGRATION_ID, updated=updated)
+    print(f"[NOTES] Backfilled content fields on {updated} notes")
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from pymongo import UpdateOne
+
+from app.scripts.migrations import is_done, mark_done
+from app.services.url_search_service import url_search_terms
+
+MIGRATION_ID = "url_search_terms_v1"
+BATCH_SIZE = 1000
+
+
+async def backfill_url_search_terms_if_needed(db) -> None:
+    if await is_done(db, MIGRATION_ID):
+        return
+
+    cursor = db.urls.find(
+        {"searchTerms": {"$exists": False}},
+        {"_id": 1, "shortId": 1, "longUrl": 1},
+    )
+
+    updated = 0
+    ops = []
+    async for doc in cursor:
+        ops.append(
+            UpdateOne(
+                {"_id": doc["_id"]},
+                {"$set": {"searchTerms": url_search_terms(doc["shortId"], doc.get("longUrl", ""))}},
+            )
+        )
+        if len(ops) >= BATCH_SIZE:
+            await db.urls.bulk_write(ops, ordered=False)
+            updated += len(ops)
+            ops = []
+
+    if ops:
+        await db.urls.bulk_write(ops, ordered=False)
+        updated += len(ops)
+
+    await mark_done(db, MIGRATION_ID, updated=updated)
+    print(f"[URL] Backfilled searchTerms on {updated} links")
@@ -0,0 +1,120 @@
+"""
+Benchmark for note HTML extraction (no DB, no network).
+
+Generates TipTap-style documents (headings, marked-up paragraphs, links,
+lists, quotes, code blocks, coloured text) and compares the previous
+BeautifulSoup get_text implementation with the single-pass extractor.
+
+Run:
+    python -m app.scripts.bench_html_text --docs 200 --sizes 2000,8000,20000
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import statistics
+import time
+
+from bs4 import BeautifulSoup
+
+from app.util.html_text import extract_note_html
+
+_WORD_RE = re.compile(r"\w+")
+
+WORDS = (
+    "meeting project deadline review design api cache latency budget roadmap "
+    "customer release draft notes follow up decision owner sprint backlog "
+    "metrics retry queue index search vector token stream chunk summary"
+).split()
+
+
+def legacy_html_to_text(html: str) -> str:
+    if not html:
+        return ""
+    soup = BeautifulSoup(html, "html.parser")
+    text = soup.get_text(" ")
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _sentence(rng: random.Random) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(6, 18))]
+    i = rng.randrange(len(words))
+    mark = rng.random()
+    if mark < 0.2:
+        words[i] = f"<strong>{words[i]}</strong>"
+    elif mark < 0.3:
+        words[i] = f"<em>{words[i]}</em>"
+    elif mark < 0.4:
+        words[i] = f"<code>{words[i]}</code>"
+    elif mark < 0.5:
+        words[i] = f'<a target="_blank" rel="noopener noreferrer nofollow" href="https://example.com/{words[i]}">{words[i]}</a>'
+    elif mark < 0.55:
+        words[i] = f'<span style="color: #e03e2d">{words[i]}</span>'
+    return " ".join(words).capitalize() + "."
+
+
+def tiptap_document(size: int, rng: random.Random) -> str:
+    parts = []
+    length = 0
+    while length < size:
+        kind = rng.random()
+        if kind < 0.1:
+            level = rng.randint(1, 3)
+            block = f"<h{level}>{_sentence(rng)}</h{level}>"
+        elif kind < 0.6:
+            block = "<p>" + " ".join(_sentence(rng) for _ in range(rng.randint(1, 4))) + "</p>"
+        elif kind < 0.8:
+            tag = rng.choice(("ul", "ol"))
+            items = "".join(f"<li><p>{_sentence(rng)}</p></li>" for _ in range(rng.randint(2, 6)))
+            block = f"<{tag}>{items}</{tag}>"
+        elif kind < 0.9:
+            block = f"<blockquote><p>{_sentence(rng)}</p></blockquote>"
+        else:
+            code = "\n".join(f"  {rng.choice(WORDS)} = {rng.randint(0, 99)}" for _ in range(rng.randint(2, 8)))
+            block = f"<pre><code>{code}</code></pre>"
+        parts.append(block)
+        length += len(block)
+    return "".join(parts)[: size + 200]
+
+
+def bench(fn, docs) -> dict:
+    latencies = []
+    for doc in docs:
+        start = time.perf_counter()
+        fn(doc)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return {
+        "p50Ms": round(statistics.median(latencies), 3),
+        "p95Ms": round(latencies[int(len(latencies) * 0.95) - 1], 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--sizes", default="2000,8000,20000")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    for size in (int(s) for s in args.sizes.split(",")):
+        docs = [tiptap_document(size, rng) for _ in range(args.docs)]
+        legacy = bench(legacy_html_to_text, docs)
+        single = bench(extract_note_html, docs)
+        # legacy get_text(" ") also splits words at inline marks ("<b>x</b>." -> "x ."),
+        # so compare the word sequences rather than the raw strings
+        same_words = sum(
+            _WORD_RE.findall(legacy_html_to_text(d)) == _WORD_RE.findall(extract_note_html(d).text) for d in docs
+        )
+        print(
+            f"size={size} docs={args.docs} "
+            f"legacy={legacy} single_pass={single} "
+            f"speedup={legacy['p50Ms'] / max(single['p50Ms'], 1e-9):.1f}x "
+            f"sameWords={same_words}/{args.docs}"
+        )
+
+
+if __name__ == "__main__":
+    main()
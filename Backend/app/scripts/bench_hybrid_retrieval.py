@@ -0,0 +1,141 @@
+"""
+Offline recall/latency benchmark for Notes Copilot retrieval (no DB, no network).
+
+Builds one user's notes BM25 index and an in-memory chunk vector index over
+synthetic notes whose embeddings only capture the topic, then measures
+hit rate@k and latency for vector-only, lexical-only and hybrid (RRF)
+retrieval on two query sets:
+
+  paraphrase  a few words from one note, query vector near that note
+  exact       an invoice number; the query vector only knows "billing"
+
+Run:
+    python -m app.scripts.bench_hybrid_retrieval --notes 20000 --queries 200
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+from bson import ObjectId
+
+from app.services.hybrid_retrieval_service import (
+    EXACT_LEXICAL_WEIGHT,
+    POOL_FACTOR,
+    dedupe_per_note,
+    is_exact_query,
+    rrf_fuse,
+)
+from app.services.notes_search_service import _NotesIndex, query_tokens
+from app.services.vector_search_service import _UserIndex
+
+DIM = 256
+TOPIC_WORDS = 40
+BILLING_TOPIC = 0
+
+
+def word(prefix: str, i: int) -> str:
+    # letters only, so only the invoice numbers look like identifiers
+    return prefix + "".join("abcdefghij"[int(d)] for d in str(i))
+
+
+def synthetic_corpus(n: int, topics: int, seed: int):
+    rng = np.random.default_rng(seed)
+    centroids = rng.standard_normal((topics, DIM)).astype(np.float32)
+    common = [word("common", i) for i in range(500)]
+    notes, chunks, invoices = [], [], {}
+
+    for i in range(n):
+        topic = int(rng.integers(0, topics))
+        words = [word(f"{word('topic', topic)}w", int(j)) for j in rng.integers(0, TOPIC_WORDS, size=30)]
+        words += [common[int(j)] for j in rng.integers(0, len(common), size=30)]
+        rng.shuffle(words)
+        if topic == BILLING_TOPIC:
+            number = f"inv{100000 + i}"
+            words.insert(int(rng.integers(0, len(words))), number)
+            invoices[number] = i
+        text = " ".join(words)
+        note_id = str(ObjectId())
+        notes.append({"_id": ObjectId(note_id), "title": f"{word('topic', topic)} note", "contentText": text, "tags": []})
+        embedding = centroids[topic] + 0.8 * rng.standard_normal(DIM).astype(np.float32)
+        chunks.append({"noteId": note_id, "chunkIndex": 0, "text": text, "embedding": embedding})
+
+    return notes, chunks, centroids, invoices
+
+
+def lexical_ranked(index: _NotesIndex, chunk_of: dict, query: str, limit: int) -> list:
+    page, _ = index.search(query_tokens(query), limit=limit, trashed=False, match_all=False)
+    return [chunk_of[note_id] for note_id, _ in page]
+
+
+def run(method: str, cases: list, index, vectors, chunk_of, *, top_k: int, pool_factor: int) -> dict:
+    hits, latencies = 0, []
+    pool = top_k * pool_factor
+    for query, qvec, target in cases:
+        start = time.perf_counter()
+        if method == "vector":
+            results = dedupe_per_note(vectors.search(qvec, pool), 2, top_k)
+        elif method == "lexical":
+            results = dedupe_per_note(lexical_ranked(index, chunk_of, query, pool), 2, top_k)
+        else:
+            lexical = lexical_ranked(index, chunk_of, query, pool)
+            vector = vectors.search(qvec, pool)
+            weight = EXACT_LEXICAL_WEIGHT if is_exact_query(query_tokens(query)) else 1.0
+            results = dedupe_per_note(rrf_fuse([lexical, vector], (weight, 1.0)), 2, top_k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += any(c["noteId"] == target for c in results)
+
+    lat = np.asarray(latencies)
+    return {
+        "hitRate": round(hits / len(cases), 3),
+        "p50Ms": round(float(np.percentile(lat, 50)), 2),
+        "p95Ms": round(float(np.percentile(lat, 95)), 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=20000)
+    parser.add_argument("--topics", type=int, default=50)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    notes, chunks, centroids, invoices = synthetic_corpus(args.notes, args.topics, args.seed)
+    index = _NotesIndex.build(notes)
+    vectors = _UserIndex(DIM, "float32")
+    vectors.add(chunks)
+    chunk_of = {c["noteId"]: {k: v for k, v in c.items() if k != "embedding"} for c in chunks}
+    print(f"notes={args.notes} topics={args.topics} invoices={len(invoices)}")
+
+    rng = np.random.default_rng(args.seed + 1)
+    paraphrase = []
+    for i in rng.integers(0, len(notes), size=args.queries):
+        c = chunks[int(i)]
+        words = c["text"].split()
+        query = " ".join(words[int(j)] for j in rng.integers(0, len(words), size=3))
+        qvec = c["embedding"] + 3.0 * rng.standard_normal(DIM).astype(np.float32)
+        paraphrase.append((query, qvec, c["noteId"]))
+
+    exact = []
+    numbers = list(invoices)
+    for j in rng.integers(0, len(numbers), size=args.queries):
+        number = numbers[int(j)]
+        qvec = centroids[BILLING_TOPIC] + 0.8 * rng.standard_normal(DIM).astype(np.float32)
+        exact.append((f"invoice {number}", qvec, chunks[invoices[number]]["noteId"]))
+
+    for name, cases in (("paraphrase", paraphrase), ("exact", exact), ("mixed", paraphrase + exact)):
+        for method in ("vector", "lexical", "hybrid"):
+            print(name, method, run(method, cases, index, vectors, chunk_of, top_k=args.top_k, pool_factor=POOL_FACTOR))
+
+    for factor in (1, POOL_FACTOR, POOL_FACTOR * 4):
+        print(
+            f"mixed hybrid poolFactor={factor}",
+            run("hybrid", paraphrase + exact, index, vectors, chunk_of, top_k=args.top_k, pool_factor=factor),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark for the notes full-text index (no DB, no network).
+
+Builds one user's index from synthetic notes with a Zipf-distributed
+vocabulary and reports build time, memory and query latency for single
+words, multi-word AND queries, short prefixes and second pages.
+
+Run:
+    python -m app.scripts.bench_notes_search --notes 50000 --queries 200
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+from bson import ObjectId
+
+from app.services.notes_search_service import _NotesIndex, tokenize
+
+
+def synthetic_notes(n: int, vocab_size: int, seed: int) -> list[dict]:
+    rng = np.random.default_rng(seed)
+    vocab = [f"{w}{i}" for i, w in enumerate(("alpha", "bravo", "delta", "gamma", "sigma", "omega") * (vocab_size // 6))]
+    notes = []
+    for _ in range(n):
+        words = rng.zipf(1.3, size=int(rng.integers(40, 400))) % len(vocab)
+        title = rng.zipf(1.3, size=4) % len(vocab)
+        notes.append(
+            {
+                "_id": ObjectId(),
+                "title": " ".join(vocab[i] for i in title),
+                "contentText": " ".join(vocab[i] for i in words),
+                "tags": [vocab[int(rng.integers(0, 50))]],
+                "pinned": bool(rng.random() < 0.05),
+                "isTrashed": bool(rng.random() < 0.02),
+            }
+        )
+    return notes, vocab
+
+
+def bench(index: _NotesIndex, queries: list[str], *, second_page: bool = False) -> dict:
+    latencies = []
+    for q in queries:
+        tokens = list(dict.fromkeys(tokenize(q)))
+        cursor = None
+        if second_page:
+            _, cursor = index.search(tokens, limit=50, trashed=False)
+            if cursor is None:
+                continue
+        start = time.perf_counter()
+        index.search(tokens, limit=50, cursor=cursor, trashed=False)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    lat = np.asarray(latencies or [0.0])
+    return {
+        "queries": len(latencies),
+        "p50Ms": round(float(np.percentile(lat, 50)), 2),
+        "p95Ms": round(float(np.percentile(lat, 95)), 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=50000)
+    parser.add_argument("--vocab", type=int, default=30000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    notes, vocab = synthetic_notes(args.notes, args.vocab, args.seed)
+
+    start = time.perf_counter()
+    index = _NotesIndex.build(notes)
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"notes={args.notes} vocab={len(vocab)} buildMs={build_ms:.0f} mb={index.nbytes / 1e6:.1f}")
+
+    rng = np.random.default_rng(args.seed + 1)
+
+    def pick() -> str:
+        return vocab[int(rng.zipf(1.3)) % len(vocab)]
+
+    cases = {
+        "one word": [pick() for _ in range(args.queries)],
+        "two words": [f"{pick()} {pick()}" for _ in range(args.queries)],
+        "three words": [f"{pick()} {pick()} {pick()}" for _ in range(args.queries)],
+        "prefix": [pick()[: int(rng.integers(3, 6))] for _ in range(args.queries)],
+    }
+    for name, queries in cases.items():
+        print(name, bench(index, queries))
+    print("second page", bench(index, cases["one word"], second_page=True))
+
+    for i in range(1000):
+        index.add({**notes[i], "contentText": notes[i]["contentText"] + " edited"})
+    print("after 1000 edits (delta)", bench(index, cases["two words"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark for the local vector index (no Atlas, no network).
+
+Builds a synthetic clustered corpus, loads it into the float32 and int8
+variants of the per-user index, and reports memory, query latency and
+recall@k against exact float64 cosine search.
+
+Run:
+    python -m app.scripts.bench_vector_index --chunks 20000 --dim 1536 --queries 200 --k 6
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+
+from app.services.vector_search_service import _UserIndex
+
+
+def synthetic_corpus(n: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=n)
+    noise = rng.standard_normal((n, dim)).astype(np.float32) * 0.6
+    return centers[labels] + noise
+
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> list[set[int]]:
+    c = corpus.astype(np.float64)
+    c /= np.linalg.norm(c, axis=1, keepdims=True)
+    truth = []
+    for q in queries.astype(np.float64):
+        scores = c @ (q / np.linalg.norm(q))
+        truth.append(set(np.argsort(-scores)[:k].tolist()))
+    return truth
+
+
+def bench(dtype: str, corpus: np.ndarray, queries: np.ndarray, truth: list[set[int]], k: int) -> dict:
+    index = _UserIndex(corpus.shape[1], dtype)
+
+    start = time.perf_counter()
+    batch = 1000
+    for i in range(0, len(corpus), batch):
+        index.add(
+            [
+                {"noteId": str(j), "chunkIndex": 0, "text": "", "embedding": corpus[j]}
+                for j in range(i, min(i + batch, len(corpus)))
+            ]
+        )
+    build_ms = (time.perf_counter() - start) * 1000
+
+    latencies = []
+    hits = 0
+    for q, expected in zip(queries, truth):
+        start = time.perf_counter()
+        results = index.search(q, k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += len({int(r["noteId"]) for r in results} & expected)
+
+    lat = np.asarray(latencies)
+    return {
+        "dtype": dtype,
+        "buildMs": round(build_ms, 1),
+        "mb": round(index.nbytes / 1e6, 1),
+        "p50Ms": round(float(np.percentile(lat, 50)), 2),
+        "p95Ms": round(float(np.percentile(lat, 95)), 2),
+        f"recall@{k}": round(hits / (k * len(queries)), 4),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    corpus = synthetic_corpus(args.chunks, args.dim, args.clusters, args.seed)
+    rng = np.random.default_rng(args.seed + 1)
+    picks = rng.integers(0, args.chunks, size=args.queries)
+    queries = corpus[picks] + rng.standard_normal((args.queries, args.dim)).astype(np.float32) * 0.3
+    truth = exact_top_k(corpus, queries, args.k)
+
+    print(f"chunks={args.chunks} dim={args.dim} queries={args.queries} k={args.k}")
+    for dtype in ("float32", "int8"):
+        print(bench(dtype, corpus, queries, truth, args.k))
+
+
+if __name__ == "__main__":
+    main()
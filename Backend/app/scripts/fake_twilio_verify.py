@@ -0,0 +1,79 @@
+"""
+Local stand-in for the Twilio Verify v2 API, for load tests and dev.
+
+Run:
+    FAKE_VERIFY_LATENCY_MS=150 uvicorn app.scripts.fake_twilio_verify:app --port 8081
+
+and point the backend at it:
+    TWILIO_VERIFY_BASE_URL=http://localhost:8081
+    TWILIO_ACCOUNT_SID=ACfake TWILIO_AUTH_TOKEN=fake TWILIO_VERIFY_SERVICE_SID=VAfake
+
+Every started verification accepts FAKE_VERIFY_CODE (default 123456).
+FAKE_VERIFY_ERROR_RATE (0..1) makes that share of calls return 503, to
+exercise the circuit breaker.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+import secrets
+
+from fastapi import FastAPI, Form
+from fastapi.responses import JSONResponse
+
+LATENCY_MS = float(os.getenv("FAKE_VERIFY_LATENCY_MS", "0"))
+ERROR_RATE = float(os.getenv("FAKE_VERIFY_ERROR_RATE", "0"))
+ACCEPTED_CODE = os.getenv("FAKE_VERIFY_CODE", "123456")
+
+app = FastAPI(title="Fake Twilio Verify")
+
+_pending: dict[tuple[str, str], str] = {}
+
+
+async def _simulate() -> JSONResponse | None:
+    if LATENCY_MS:
+        await asyncio.sleep(LATENCY_MS / 1000)
+    if ERROR_RATE and random.random() < ERROR_RATE:
+        return JSONResponse(
+            status_code=503,
+            content={"code": 20503, "message": "Service unavailable (fake)", "status": 503},
+        )
+    return None
+
+
+@app.post("/v2/Services/{service_sid}/Verifications")
+async def start_verification(service_sid: str, To: str = Form(...), Channel: str = Form("sms")):
+    failure = await _simulate()
+    if failure:
+        return failure
+
+    sid = f"VE{secrets.token_hex(16)}"
+    _pending[(service_sid, To)] = sid
+    return {"sid": sid, "service_sid": service_sid, "to": To, "channel": Channel, "status": "pending"}
+
+
+@app.post("/v2/Services/{service_sid}/VerificationCheck")
+async def check_verification(service_sid: str, To: str = Form(...), Code: str = Form(...)):
+    failure = await _simulate()
+    if failure:
+        return failure
+
+    sid = _pending.get((service_sid, To))
+    if sid is None:
+        return JSONResponse(
+            status_code=404,
+            content={"code": 20404, "message": "The requested resource was not found", "status": 404},
+        )
+
+    approved = Code == ACCEPTED_CODE
+    if approved:
+        _pending.pop((service_sid, To), None)
+
+    return {
+        "sid": sid,
+        "service_sid": service_sid,
+        "to": To,
+        "status": "approved" if approved else "pending",
+        "valid": approved,
+    }
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from pymongo import UpdateOne
+
+from app.config import settings
+from app.scripts.migrations import is_done, mark_done
+from app.util.vector_codec import encode_embedding
+
+MIGRATION_ID = "chunk_embeddings_binary_v1"
+BATCH_SIZE = 500
+
+
+async def _convert(db, collection: str, dtype: str) -> int:
+    cursor = db[collection].find({"embedding": {"$type": "array"}}, {"_id": 1, "embedding": 1})
+
+    converted = 0
+    ops = []
+    async for doc in cursor:
+        # match on the array type so a concurrent re-embed isn't overwritten
+        ops.append(
+            UpdateOne(
+                {"_id": doc["_id"], "embedding": {"$type": "array"}},
+                {"$set": {"embedding": encode_embedding(doc["embedding"], dtype)}},
+            )
+        )
+        if len(ops) >= BATCH_SIZE:
+            await db[collection].bulk_write(ops, ordered=False)
+            converted += len(ops)
+            ops = []
+
+    if ops:
+        await db[collection].bulk_write(ops, ordered=False)
+        converted += len(ops)
+
+    return converted
+
+
+async def migrate_chunk_embeddings_if_needed(db) -> None:
+    """
+    Rewrites BSON double-array embeddings as packed BSON vectors
+    (note_chunks in EMBED_STORAGE_DTYPE, embedding_cache always float32).
+    """
+    if await is_done(db, MIGRATION_ID):
+        return
+
+    chunks = await _convert(db, "note_chunks", settings.EMBED_STORAGE_DTYPE)
+    cached = await _convert(db, "embedding_cache", "float32")
+
+    await mark_done(db, MIGRATION_ID, noteChunks=chunks, embeddingCache=cached)
+    print(f"[AI] Converted embeddings to BSON vectors: {chunks} chunks, {cached} cache entries")
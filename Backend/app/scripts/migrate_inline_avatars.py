@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import base64
+from app.scripts.migrations import is_done, mark_done
+from app.services.avatar_service import sniff_image_type, store_avatar
+
+MIGRATION_ID = "inline_avatars_to_blob_store_v1"
+
+
+async def migrate_inline_avatars_if_needed(db) -> None:
+    """
+    Moves base64 users.avatarData into the avatars blob store and replaces
+    it with avatarHash. Images that are not png/jpeg/webp/gif stay inline
+    (a data: URL in <img> cannot run script).
+    """
+    if await is_done(db, MIGRATION_ID):
+        return
+
+    cursor = db.users.find(
+        {"avatarData": {"$nin": [None, ""]}},
+        {"_id": 1, "avatarData": 1, "avatarMime": 1},
+    )
+
+    moved = 0
+    async for user in cursor:
+        try:
+            data = base64.b64decode(user["avatarData"])
+        except Exception:
+            print(f"[AVATAR] skipping undecodable avatar userId={user['_id']}")
+            continue
+
+        mime = sniff_image_type(data)
+        if mime is None:
+            print(f"[AVATAR] keeping unsupported inline avatar userId={user['_id']}")
+            continue
+
+        content_hash = await store_avatar(db, data, mime)
+        await db.users.update_one(
+            {"_id": user["_id"]},
+            {"$set": {"avatarHash": content_hash, "avatarMime": mime}, "$unset": {"avatarData": ""}},
+        )
+        moved += 1
+
+    await mark_done(db, MIGRATION_ID, updated=moved)
+    print(f"[AVATAR] Moved {moved} inline avatars to the blob store")
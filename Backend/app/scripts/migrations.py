@@ -0,0 +1,94 @@
+"""
+One-off data migrations, run in the background after startup.
+
+Each migration checks its db.migrations marker, so a finished one costs a
+single find_one. They run one after another in a task started by
+connect_to_mongo, so a large collection scan never delays startup; the
+readers of every migrated field also accept the old shape. Two workers
+may run the same migration at once: every step is idempotent and the
+marker is upserted.
+
+Run all pending migrations offline:
+    python -m app.scripts.migrations
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, List, Optional
+
+from app.core.logger import logger
+
+Migration = Callable[[object], Awaitable[None]]
+
+_task: Optional[asyncio.Task] = None
+
+
+async def is_done(db, migration_id: str) -> bool:
+    return await db.migrations.find_one({"_id": migration_id}) is not None
+
+
+async def mark_done(db, migration_id: str, **fields) -> None:
+    await db.migrations.update_one(
+        {"_id": migration_id},
+        {"$set": {**fields, "createdAt": datetime.now(timezone.utc)}},
+        upsert=True,
+    )
+
+
+def _migrations() -> List[Migration]:
+    from app.scripts.backfill_note_content_fields import backfill_note_content_fields_if_needed
+    from app.scripts.backfill_url_search_terms import backfill_url_search_terms_if_needed
+    from app.scripts.migrate_chunk_embeddings_to_binary import migrate_chunk_embeddings_if_needed
+    from app.scripts.migrate_inline_avatars import migrate_inline_avatars_if_needed
+
+    return [
+        migrate_inline_avatars_if_needed,
+        backfill_url_search_terms_if_needed,
+        backfill_note_content_fields_if_needed,
+        migrate_chunk_embeddings_if_needed,
+    ]
+
+
+async def run_migrations(db) -> None:
+    for migration in _migrations():
+        try:
+            await migration(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # retried on the next start
+            logger.exception(f"[MIGRATIONS] {migration.__name__} failed: {e}")
+
+
+def start_background_migrations(db) -> None:
+    global _task
+    if _task and not _task.done():
+        return
+    _task = asyncio.create_task(run_migrations(db))
+
+
+async def stop_background_migrations() -> None:
+    global _task
+    if _task:
+        _task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await _task
+        _task = None
+
+
+async def main() -> None:
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    from app.config import settings
+
+    client = AsyncIOMotorClient(settings.MONGODB_URI, tz_aware=True, tzinfo=timezone.utc)
+    try:
+        await run_migrations(client[settings.DB_NAME])
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import AsyncIterator, List
 
 class BaseAIProvider(ABC):
 
@@ -9,4 +9,8 @@ class BaseAIProvider(ABC):
 
     @abstractmethod
     async def embed(self, texts: List[str]) -> List[List[float]]:
-        pass
\ No newline at end of file
+        pass
+
+    async def stream_chat(self, system: str, user: str) -> AsyncIterator[str]:
+        # providers without native streaming emit the whole answer at once
+        yield await self.chat(system, user)
@@ -1,8 +1,30 @@
 from app.config import settings
+from .base import BaseAIProvider
 from .openai_provider import OpenAIProvider
 from .gemini_provider import GeminiProvider
 
+PROVIDERS: dict[str, type[BaseAIProvider]] = {
+    "openai": OpenAIProvider,
+    "gemini": GeminiProvider,
+}
+
+
+def provider_configured(name: str) -> bool:
+    if name == "openai":
+        return bool(settings.OPENAI_API_KEY)
+    if name == "gemini":
+        return bool(settings.GEMINI_API_KEY)
+    return False
+
+
+def get_provider(name: str) -> BaseAIProvider:
+    try:
+        return PROVIDERS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown AI provider: {name}")
+
+
 def get_ai_provider():
     if settings.AI_PROVIDER == "gemini":
         return GeminiProvider()
-    return OpenAIProvider()
\ No newline at end of file
+    return OpenAIProvider()
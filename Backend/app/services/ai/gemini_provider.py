@@ -1,34 +1,106 @@
-import google.generativeai as genai
-from typing import List
+import asyncio
+import contextlib
+import json
+from typing import AsyncIterator, List
+
 from app.config import settings
+from app.core.http_client import ai_http, iter_sse_data
 from .base import BaseAIProvider
 
 
-genai.configure(api_key=settings.GEMINI_API_KEY)
+class GeminiProvider(BaseAIProvider):
+    """
+    Gemini over its REST API on the shared pooled client, so calls never
+    block the event loop. Embeddings go through batchEmbedContents
+    (up to GEMINI_EMBED_BATCH_SIZE texts per call); larger inputs are split
+    and the batches sent concurrently, bounded by GEMINI_MAX_CONCURRENCY.
+    """
+
+    _semaphore: asyncio.Semaphore | None = None
 
+    @classmethod
+    def _limit(cls) -> asyncio.Semaphore:
+        # shared across instances; created lazily inside the running loop
+        if cls._semaphore is None:
+            cls._semaphore = asyncio.Semaphore(settings.GEMINI_MAX_CONCURRENCY)
+        return cls._semaphore
 
-class GeminiProvider(BaseAIProvider):
+    def _url(self, model: str, method: str) -> str:
+        if not model.startswith("models/"):
+            model = f"models/{model}"
+        return f"{settings.GEMINI_API_BASE_URL}/{model}:{method}"
+
+    def _headers(self) -> dict:
+        return {"x-goog-api-key": settings.GEMINI_API_KEY or ""}
+
+    async def _post(self, url: str, body: dict) -> dict:
+        headers = self._headers()
+        async with self._limit():
+            r = await ai_http.post(url, headers=headers, json=body)
+        r.raise_for_status()
+        return r.json()
+
+    @staticmethod
+    def _chat_body(system: str, user: str) -> dict:
+        return {
+            "systemInstruction": {"parts": [{"text": system}]},
+            "contents": [{"role": "user", "parts": [{"text": user}]}],
+            "generationConfig": {"temperature": 0.2},
+        }
+
+    @staticmethod
+    def _text(data: dict) -> str:
+        candidates = data.get("candidates") or []
+        if not candidates:
+            return ""
+        parts = (candidates[0].get("content") or {}).get("parts") or []
+        return "".join(p.get("text", "") for p in parts)
 
     async def chat(self, system: str, user: str) -> str:
-        model = genai.GenerativeModel(settings.GEMINI_MODEL)
+        data = await self._post(self._url(settings.GEMINI_MODEL, "generateContent"), self._chat_body(system, user))
+        return self._text(data)
+
+    async def stream_chat(self, system: str, user: str) -> AsyncIterator[str]:
+        url = self._url(settings.GEMINI_MODEL, "streamGenerateContent") + "?alt=sse"
+
+        async with contextlib.AsyncExitStack() as stack:
+            # the slot covers connect + response headers only; the body is read
+            # at the SSE client's pace and must not starve embeddings
+            async with self._limit():
+                r = await stack.enter_async_context(
+                    ai_http.stream("POST", url, headers=self._headers(), json=self._chat_body(system, user))
+                )
+            if r.status_code >= 400:
+                await r.aread()
+                r.raise_for_status()
 
-        response = model.generate_content(
-            f"{system}\n\n{user}"
-        )
+            async for data in iter_sse_data(r):
+                piece = self._text(json.loads(data))
+                if piece:
+                    yield piece
 
-        return response.text
+    async def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        model = settings.GEMINI_EMBED_MODEL
+        body = {
+            "requests": [
+                {
+                    "model": model,
+                    "content": {"parts": [{"text": t}]},
+                    "taskType": "RETRIEVAL_DOCUMENT",
+                }
+                for t in texts
+            ]
+        }
+
+        data = await self._post(self._url(model, "batchEmbedContents"), body)
+        return [item["values"] for item in data["embeddings"]]
 
     async def embed(self, texts: List[str]) -> List[List[float]]:
-        # Gemini embedding model
-        embedding_model = "models/embedding-001"
-
-        vectors = []
-        for t in texts:
-            result = genai.embed_content(
-                model=embedding_model,
-                content=t,
-                task_type="retrieval_document",
-            )
-            vectors.append(result["embedding"])
-
-        return vectors
\ No newline at end of file
+        if not texts:
+            return []
+
+        size = settings.GEMINI_EMBED_BATCH_SIZE
+        batches = [texts[i:i + size] for i in range(0, len(texts), size)]
+        results = await asyncio.gather(*(self._embed_batch(b) for b in batches))
+
+        return [vector for batch in results for vector in batch]
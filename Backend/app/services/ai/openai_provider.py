@@ -1,13 +1,14 @@
-import httpx
-from typing import List
+import json
+from typing import AsyncIterator, List
 from app.config import settings
+from app.core.http_client import ai_http, iter_sse_data
 from .base import BaseAIProvider
 
 
 class OpenAIProvider(BaseAIProvider):
 
-    async def chat(self, system: str, user: str) -> str:
-        url = "https://api.openai.com/v1/chat/completions"
+    def _chat_request(self, system: str, user: str) -> tuple[str, dict, dict]:
+        url = settings.OPENAI_CHAT_URL or "https://api.openai.com/v1/chat/completions"
         headers = {"Authorization": f"Bearer {settings.OPENAI_API_KEY}"}
 
         body = {
@@ -18,14 +19,36 @@ class OpenAIProvider(BaseAIProvider):
             ],
             "temperature": 0.2,
         }
+        return url, headers, body
 
-        async with httpx.AsyncClient(timeout=30) as client:
-            r = await client.post(url, headers=headers, json=body)
-            r.raise_for_status()
-            return r.json()["choices"][0]["message"]["content"]
+    async def chat(self, system: str, user: str) -> str:
+        url, headers, body = self._chat_request(system, user)
+
+        r = await ai_http.post(url, headers=headers, json=body)
+        r.raise_for_status()
+        return r.json()["choices"][0]["message"]["content"]
+
+    async def stream_chat(self, system: str, user: str) -> AsyncIterator[str]:
+        url, headers, body = self._chat_request(system, user)
+        body["stream"] = True
+
+        async with ai_http.stream("POST", url, headers=headers, json=body) as r:
+            if r.status_code >= 400:
+                await r.aread()
+                r.raise_for_status()
+
+            async for data in iter_sse_data(r):
+                if data == "[DONE]":
+                    break
+                choices = json.loads(data).get("choices") or []
+                if not choices:
+                    continue
+                piece = (choices[0].get("delta") or {}).get("content")
+                if piece:
+                    yield piece
 
     async def embed(self, texts: List[str]) -> List[List[float]]:
-        url = "https://api.openai.com/v1/embeddings"
+        url = settings.OPENAI_EMBED_URL or "https://api.openai.com/v1/embeddings"
         headers = {"Authorization": f"Bearer {settings.OPENAI_API_KEY}"}
 
         body = {
@@ -33,9 +56,8 @@ class OpenAIProvider(BaseAIProvider):
             "input": texts,
         }
 
-        async with httpx.AsyncClient(timeout=30) as client:
-            r = await client.post(url, headers=headers, json=body)
-            r.raise_for_status()
-            data = r.json()["data"]
+        r = await ai_http.post(url, headers=headers, json=body)
+        r.raise_for_status()
+        data = r.json()["data"]
 
         return [item["embedding"] for item in data]
\ No newline at end of file
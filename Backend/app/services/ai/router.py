@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import time
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, TypeVar
+
+from fastapi import HTTPException
+
+from app.config import settings
+from app.core.circuit_breaker import CircuitBreaker
+from app.core.histogram import LatencyHistogram
+from app.core.logger import logger
+from .base import BaseAIProvider
+from .factory import PROVIDERS, get_provider, provider_configured
+
+T = TypeVar("T")
+
+CHAT_ACTIONS = ("copilot", "summarize", "shorten", "highlights")
+EMBED_ACTION = "embed"
+
+# hedge on the primary's observed p95 once it has this many samples
+HEDGE_MIN_SAMPLES = 20
+
+
+def _parse_chain(value: str) -> List[str]:
+    return [p.strip().lower() for p in value.split(",") if p.strip()]
+
+
+def parse_routes(spec: str) -> dict[str, List[str]]:
+    """
+    "summarize=gemini,openai;copilot=openai" -> {"summarize": [...], "copilot": [...]}
+    """
+    routes: dict[str, List[str]] = {}
+    for part in (spec or "").split(";"):
+        action, sep, chain = part.partition("=")
+        if sep and action.strip():
+            routes[action.strip().lower()] = _parse_chain(chain)
+    return routes
+
+
+class _ProviderState:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.provider: BaseAIProvider = get_provider(name)
+        self.latency = LatencyHistogram()
+        self.ttft = LatencyHistogram()
+        self.breaker = CircuitBreaker(
+            f"ai:{name}",
+            failure_threshold=settings.AI_BREAKER_FAILURES,
+            reset_timeout=settings.AI_BREAKER_RESET_SECONDS,
+        )
+        self.calls = 0
+        self.errors = 0
+        self.cancelled = 0
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "cancelled": self.cancelled,
+            "breaker": self.breaker.stats(),
+            "latency": self.latency.stats(),
+            "timeToFirstToken": self.ttft.stats(),
+        }
+
+
+class AIProviderRouter:
+    """
+    Single entry point for AI traffic.
+
+    Each action has an ordered provider chain (AI_CHAT_PROVIDERS, overridable
+    per action with AI_ROUTES). Chat calls start on the first healthy provider;
+    if it hasn't answered within the hedge delay (its own p95, or
+    AI_HEDGE_AFTER_MS until there is enough history) the next provider is
+    started too and the first answer wins. Errors fall through to the next
+    provider. Per-provider circuit breakers keep a failing vendor out of the
+    chain until it recovers.
+
+    Embeddings are pinned to AI_EMBED_PROVIDER: vectors from different models
+    live in different spaces, so they are never hedged or mixed.
+    """
+
+    def __init__(self) -> None:
+        self._states: dict[str, _ProviderState] = {}
+        self.routes = parse_routes(settings.AI_ROUTES)
+        self.default_chain = _parse_chain(settings.AI_CHAT_PROVIDERS)
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.fallbacks = 0
+
+    def _state(self, name: str) -> _ProviderState:
+        state = self._states.get(name)
+        if state is None:
+            state = self._states[name] = _ProviderState(name)
+        return state
+
+    def chain(self, action: str) -> List[str]:
+        if action == EMBED_ACTION:
+            names = [settings.AI_EMBED_PROVIDER.lower()]
+        else:
+            names = self.routes.get(action) or self.default_chain
+        return [n for n in names if n in PROVIDERS and provider_configured(n)]
+
+    @property
+    def embed_model(self) -> str:
+        name = settings.AI_EMBED_PROVIDER.lower()
+        model = settings.GEMINI_EMBED_MODEL if name == "gemini" else settings.OPENAI_EMBED_MODEL
+        return f"{name}:{model}"
+
+    def _hedge_delay(self, name: str) -> Optional[float]:
+        if settings.AI_HEDGE_AFTER_MS <= 0:
+            return None
+        latency = self._state(name).latency
+        if latency.count >= HEDGE_MIN_SAMPLES:
+            return latency.quantile(0.95) / 1000.0
+        return settings.AI_HEDGE_AFTER_MS / 1000.0
+
+    async def _timed(self, state: _ProviderState, call: Callable[[BaseAIProvider], Awaitable[T]]) -> T:
+        state.calls += 1
+        start = time.perf_counter()
+        try:
+            result = await call(state.provider)
+        except asyncio.CancelledError:
+            # lost a hedge race; not the provider's fault
+            state.cancelled += 1
+            state.breaker.release()
+            raise
+        except Exception:
+            state.errors += 1
+            state.breaker.record_failure()
+            raise
+        state.latency.observe((time.perf_counter() - start) * 1000.0)
+        state.breaker.record_success()
+        return result
+
+    async def run(
+        self,
+        action: str,
+        call: Callable[[BaseAIProvider], Awaitable[T]],
+        *,
+        hedge: bool = True,
+    ) -> T:
+        chain = self.chain(action)
+        if not chain:
+            raise HTTPException(status_code=503, detail="AI is not configured")
+
+        remaining = list(chain)
+        pending: dict[asyncio.Task, str] = {}
+        errors: List[str] = []
+        hedge_name: Optional[str] = None
+        hedged = False
+
+        def launch() -> Optional[str]:
+            while remaining:
+                name = remaining.pop(0)
+                state = self._state(name)
+                if not state.breaker.allow():
+                    errors.append(f"{name}: circuit open")
+                    continue
+                task = asyncio.create_task(self._timed(state, call))
+                pending[task] = name
+                return name
+            return None
+
+        primary = launch()
+        if primary is None:
+            raise HTTPException(status_code=503, detail="AI providers are temporarily unavailable")
+        delay = self._hedge_delay(primary) if hedge else None
+
+        try:
+            while pending:
+                wait_for = delay if (delay is not None and not hedged and remaining) else None
+                done, _ = await asyncio.wait(
+                    pending, timeout=wait_for, return_when=asyncio.FIRST_COMPLETED
+                )
+
+                if not done:
+                    hedged = True
+                    hedge_name = launch()
+                    if hedge_name:
+                        self.hedges += 1
+                        logger.info(f"[AI][ROUTER] hedging action={action} primary={primary} hedge={hedge_name}")
+                    continue
+
+                for task in done:
+                    name = pending.pop(task)
+                    exc = task.exception()
+                    if exc is None:
+                        if name == hedge_name:
+                            self.hedge_wins += 1
+                        return task.result()
+                    errors.append(f"{name}: {exc!r}")
+                    logger.warning(f"[AI][ROUTER] provider failed action={action} provider={name} error={exc!r}")
+
+                if not pending and launch():
+                    # at most one extra provider in flight; no hedge on top of a fallback
+                    hedged = True
+                    self.fallbacks += 1
+        finally:
+            for task in pending:
+                task.cancel()
+
+        logger.error(f"[AI][ROUTER] all providers failed action={action} errors={errors}")
+        raise HTTPException(status_code=502, detail=f"AI provider failed for {action}")
+
+    async def chat(self, action: str, *, system: str, user: str) -> str:
+        return await self.run(action, lambda p: p.chat(system, user))
+
+    async def stream_chat(self, action: str, *, system: str, user: str) -> AsyncIterator[str]:
+        """
+        Streams the answer token by token from the first healthy provider in
+        the chain. A provider that fails before its first token falls through
+        to the next one; once tokens have been sent there is nothing to
+        fall back to, so later errors propagate. Streams are not hedged.
+        """
+        chain = self.chain(action)
+        if not chain:
+            raise HTTPException(status_code=503, detail="AI is not configured")
+
+        errors: List[str] = []
+        for name in chain:
+            state = self._state(name)
+            if not state.breaker.allow():
+                errors.append(f"{name}: circuit open")
+                continue
+            if errors:
+                self.fallbacks += 1
+
+            state.calls += 1
+            start = time.perf_counter()
+            started = False
+            try:
+                async with contextlib.aclosing(state.provider.stream_chat(system, user)) as pieces:
+                    async for piece in pieces:
+                        if not started:
+                            started = True
+                            state.ttft.observe((time.perf_counter() - start) * 1000.0)
+                        yield piece
+            except (asyncio.CancelledError, GeneratorExit):
+                # client went away
+                state.cancelled += 1
+                state.breaker.release()
+                raise
+            except Exception as e:
+                state.errors += 1
+                state.breaker.record_failure()
+                if started:
+                    logger.error(f"[AI][ROUTER] stream broke action={action} provider={name} error={e!r}")
+                    raise HTTPException(status_code=502, detail=f"AI provider failed for {action}")
+                errors.append(f"{name}: {e!r}")
+                logger.warning(f"[AI][ROUTER] stream failed action={action} provider={name} error={e!r}")
+                continue
+
+            state.latency.observe((time.perf_counter() - start) * 1000.0)
+            state.breaker.record_success()
+            return
+
+        logger.error(f"[AI][ROUTER] all providers failed action={action} errors={errors}")
+        raise HTTPException(status_code=502, detail=f"AI provider failed for {action}")
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return await self.run(EMBED_ACTION, lambda p: p.embed(texts), hedge=False)
+
+    def stats(self) -> dict:
+        return {
+            "routes": {a: self.chain(a) for a in (*CHAT_ACTIONS, EMBED_ACTION)},
+            "embedModel": self.embed_model,
+            "hedges": self.hedges,
+            "hedgeWins": self.hedge_wins,
+            "fallbacks": self.fallbacks,
+            "providers": {name: state.stats() for name, state in self._states.items()},
+        }
+
+
+ai_router = AIProviderRouter()
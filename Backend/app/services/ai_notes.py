@@ -2,10 +2,17 @@ import hashlib
 from datetime import datetime, timezone
 from typing import List, Dict, Any
 
-import httpx
 from bson import ObjectId
 from fastapi import HTTPException
+from pymongo import UpdateOne
 from app.config import settings
+from app.services.ai.router import ai_router
+from app.services.copilot_cache_service import copilot_cache
+from app.services.embedding_cache_service import embedding_cache
+from app.services.hybrid_retrieval_service import POOL_FACTOR, dedupe_per_note, hybrid_retriever
+from app.services.vector_search_service import vector_search
+from app.util.note_chunker import chunk_note
+from app.util.vector_codec import encode_embedding
 
 EMBED_DIM = settings.EMBED_DIM
 
@@ -14,42 +21,10 @@ def sha256_text(s: str) -> str:
     return hashlib.sha256(s.encode("utf-8")).hexdigest()
 
 
-def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 150) -> List[str]:
-    text = (text or "").strip()
-    if not text:
-        return []
-
-    chunks = []
-    i = 0
-
-    while i < len(text):
-        end = min(len(text), i + chunk_size)
-        chunks.append(text[i:end])
-
-        if end == len(text):
-            break
-
-        i = max(0, end - overlap)
-
-    return chunks
-
-
-async def embed_texts(texts: List[str], api_key: str, model: str) -> List[List[float]]:
+async def embed_texts(db, texts: List[str], hashes: List[str] | None = None) -> List[List[float]]:
     if not texts:
         return []
-
-    url = settings.OPENAI_EMBED_URL
-    headers = {"Authorization": f"Bearer {api_key}"}
-    payload = {"model": model, "input": texts}
-
-    async with httpx.AsyncClient(timeout=30) as client:
-        r = await client.post(url, headers=headers, json=payload)
-        if r.status_code >= 400:
-            raise HTTPException(status_code=502, detail=f"OpenAI embeddings failed: {r.text}")
-        data = r.json()
-
-    vectors = [item["embedding"] for item in data["data"]]
-    return vectors
+    return await embedding_cache.embed(db, texts, hashes)
 
 
 def normalize_user_id(user_id: str | ObjectId) -> ObjectId:
@@ -62,6 +37,13 @@ def normalize_user_id(user_id: str | ObjectId) -> ObjectId:
         raise HTTPException(status_code=400, detail="Invalid user id")
 
 
+async def delete_note_chunks(db, *, user_id: str | ObjectId, note_id: str) -> None:
+    owner_id = normalize_user_id(user_id)
+    await db.note_chunks.delete_many({"userId": owner_id, "noteId": note_id})
+    await vector_search.note_changed(db, owner_id=owner_id, note_id=note_id)
+    await copilot_cache.invalidate_note(db, owner_id=owner_id, note_id=note_id)
+
+
 async def upsert_note_chunks(
     db,
     *,
@@ -69,18 +51,18 @@ async def upsert_note_chunks(
     note_id: str,
     title: str,
     content: str,
-    api_key: str,
-    embed_model: str,
+    html: str | None = None,
 ):
     owner_id = normalize_user_id(user_id)
 
-    source = f"{title.strip()}\n\n{(content or '').strip()}".strip()
+    title = (title or "").strip()
+    body = html if html else (content or "").strip()
 
-    if not source:
-        await db.note_chunks.delete_many({"userId": owner_id, "noteId": note_id})
+    if not (title or (content or "").strip()):
+        await delete_note_chunks(db, user_id=owner_id, note_id=note_id)
         return
 
-    content_hash = sha256_text(source)
+    content_hash = sha256_text(f"{title}\n\n{body}")
 
     existing = await db.note_chunks.find_one(
         {
@@ -93,22 +75,62 @@ async def upsert_note_chunks(
     if existing:
         return
 
-    await db.note_chunks.delete_many({"userId": owner_id, "noteId": note_id})
-
-    chunks = chunk_text(source)
-    vectors = await embed_texts(chunks, api_key=api_key, model=embed_model)
+    chunks = chunk_note(
+        title=title,
+        html=html,
+        text=content,
+        max_tokens=settings.NOTE_CHUNK_MAX_TOKENS,
+        min_tokens=settings.NOTE_CHUNK_MIN_TOKENS,
+    )
+    hashes = [sha256_text(c) for c in chunks]
+    embed_model = ai_router.embed_model
+
+    # Stored chunks are matched by text hash, not position: the chunker keeps
+    # boundaries stable, so after an edit most chunks survive (possibly at a
+    # new chunkIndex) and only the touched ones are re-embedded. New vectors
+    # come from the embedding cache, so only text never seen before reaches
+    # the provider.
+    reusable: Dict[str, List[Dict[str, Any]]] = {}
+    stale_ids = []
+    async for doc in db.note_chunks.find(
+        {"userId": owner_id, "noteId": note_id},
+        {"chunkIndex": 1, "chunkHash": 1, "embedModel": 1},
+    ):
+        if doc.get("chunkHash") and doc.get("embedModel") == embed_model:
+            reusable.setdefault(doc["chunkHash"], []).append(doc)
+        else:
+            stale_ids.append(doc["_id"])
 
     now = datetime.now(timezone.utc)
+    keep_ops, todo = [], []
+    moved = False
+    for idx, h in enumerate(hashes):
+        matches = reusable.get(h)
+        if not matches:
+            todo.append(idx)
+            continue
+        doc = matches.pop()
+        update = {"contentHash": content_hash, "updatedAt": now}
+        if doc.get("chunkIndex") != idx:
+            update["chunkIndex"] = idx
+            moved = True
+        keep_ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": update}))
+    stale_ids.extend(doc["_id"] for docs in reusable.values() for doc in docs)
+
+    vectors = await embed_texts(db, [chunks[i] for i in todo], [hashes[i] for i in todo])
+
     docs = []
 
-    for idx, (txt, vec) in enumerate(zip(chunks, vectors)):
+    for idx, vec in zip(todo, vectors):
         docs.append(
             {
                 "userId": owner_id,
                 "noteId": note_id,
                 "chunkIndex": idx,
-                "text": txt,
-                "embedding": vec,
+                "text": chunks[idx],
+                "chunkHash": hashes[idx],
+                "embedModel": embed_model,
+                "embedding": encode_embedding(vec, settings.EMBED_STORAGE_DTYPE),
                 "contentHash": content_hash,
                 "createdAt": now,
                 "updatedAt": now,
@@ -117,49 +139,38 @@ async def upsert_note_chunks(
 
     if docs:
         await db.note_chunks.insert_many(docs)
+    if stale_ids:
+        await db.note_chunks.delete_many({"_id": {"$in": stale_ids}})
+    if keep_ops:
+        await db.note_chunks.bulk_write(keep_ops, ordered=False)
+    if docs or stale_ids or moved:
+        await vector_search.note_changed(db, owner_id=owner_id, note_id=note_id)
+    if docs or stale_ids:
+        await copilot_cache.invalidate_note(db, owner_id=owner_id, note_id=note_id)
 
 
-async def vector_search_chunks(
+async def embed_query(db, query: str) -> List[float]:
+    return (await embed_texts(db, [query]))[0]
+
+
+async def search_chunks(
     db,
     *,
     user_id: str | ObjectId,
     query: str,
-    api_key: str,
-    embed_model: str,
     top_k: int = 6,
+    query_vector: List[float] | None = None,
 ):
+    """Copilot retrieval: hybrid lexical + vector when enabled, else vector only."""
     owner_id = normalize_user_id(user_id)
 
-    qvec = (await embed_texts([query], api_key=api_key, model=embed_model))[0]
-
-    pipeline = [
-        {
-            "$vectorSearch": {
-                "index": "note_chunks_embedding",
-                "path": "embedding",
-                "queryVector": qvec,
-                "numCandidates": 100,
-                "limit": top_k,
-                "filter": {"userId": owner_id},
-            }
-        },
-        {
-            "$project": {
-                "_id": 0,
-                "noteId": 1,
-                "chunkIndex": 1,
-                "text": 1,
-                "score": {"$meta": "vectorSearchScore"},
-            }
-        },
-    ]
+    qvec = query_vector if query_vector is not None else await embed_query(db, query)
 
-    cursor = db.note_chunks.aggregate(pipeline)
-    return await cursor.to_list(length=top_k)
+    if hybrid_retriever.enabled:
+        return await hybrid_retriever.retrieve(
+            db, owner_id=owner_id, query=query, query_vector=qvec, top_k=top_k
+        )
 
+    chunks = await vector_search.search(db, owner_id=owner_id, query_vector=qvec, top_k=top_k * POOL_FACTOR)
+    return dedupe_per_note(chunks, settings.COPILOT_CHUNKS_PER_NOTE, top_k)
 
-def build_prompt_context(chunks: List[Dict[str, Any]]) -> str:
-    lines = []
-    for c in chunks:
-        lines.append(f"[noteId:{c['noteId']} chunk:{c['chunkIndex']}] {c['text']}")
-    return "\n\n".join(lines)
\ No newline at end of file
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import io
+from typing import Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+from gridfs.errors import NoFile
+
+from app.config import settings
+from app.core.logger import logger
+
+try:
+    from PIL import Image
+except ImportError:  # thumbnails are optional; originals are served without Pillow
+    Image = None
+
+
+AVATAR_BUCKET = "avatars"
+AVATAR_ROUTE_PREFIX = "/api/avatars"
+AVATAR_MAX_BYTES = 2 * 1024 * 1024
+THUMBNAIL_SIZES = (32, 64, 128, 256)
+
+# Raster formats only: avatars are served from the API origin, where an SVG
+# (or anything a browser might sniff as HTML) would run script
+_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+_PIL_FORMATS = {"PNG": "image/png", "JPEG": "image/jpeg", "GIF": "image/gif", "WEBP": "image/webp"}
+ALLOWED_AVATAR_TYPES = frozenset(_PIL_FORMATS.values())
+
+
+def _bucket(db) -> AsyncIOMotorGridFSBucket:
+    return AsyncIOMotorGridFSBucket(db, bucket_name=AVATAR_BUCKET)
+
+
+def avatar_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def avatar_url(content_hash: str) -> str:
+    return f"{settings.BASE_URL}{AVATAR_ROUTE_PREFIX}/{content_hash}"
+
+
+def sniff_image_type(data: bytes) -> Optional[str]:
+    """
+    MIME type of png/jpeg/gif/webp image bytes, else None. Decided from the
+    bytes, never from the client's Content-Type; with Pillow installed the
+    image must also parse.
+    """
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        mime = "image/webp"
+    else:
+        mime = next((m for sig, m in _SIGNATURES if data.startswith(sig)), None)
+    if mime is None or Image is None:
+        return mime
+
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            fmt = img.format
+            img.verify()
+    except Exception:
+        return None
+    return _PIL_FORMATS.get(fmt)
+
+
+def _filename(content_hash: str, size: Optional[int] = None) -> str:
+    return f"{content_hash}@{size}" if size else content_hash
+
+
+async def _exists(db, filename: str) -> bool:
+    return bool(await db[f"{AVATAR_BUCKET}.files"].find_one({"filename": filename}, {"_id": 1}))
+
+
+async def store_avatar(db, data: bytes, mime: str) -> str:
+    """
+    Stores the image once per content hash and returns the hash.
+    Re-uploading identical bytes is a single indexed lookup.
+    """
+    content_hash = avatar_hash(data)
+    if not await _exists(db, content_hash):
+        await _bucket(db).upload_from_stream(
+            content_hash,
+            data,
+            metadata={"contentType": mime},
+        )
+    return content_hash
+
+
+async def _read(db, filename: str) -> Optional[Tuple[bytes, str]]:
+    try:
+        grid_out = await _bucket(db).open_download_stream_by_name(filename)
+    except NoFile:
+        return None
+    data = await grid_out.read()
+    mime = (grid_out.metadata or {}).get("contentType") or "application/octet-stream"
+    return data, mime
+
+
+def _make_thumbnail(data: bytes, size: int) -> Tuple[bytes, str]:
+    with Image.open(io.BytesIO(data)) as img:
+        img.thumbnail((size, size))
+        out = io.BytesIO()
+        if img.mode in ("RGBA", "LA", "P"):
+            img.save(out, format="PNG", optimize=True)
+            return out.getvalue(), "image/png"
+        img.convert("RGB").save(out, format="JPEG", quality=85, optimize=True)
+        return out.getvalue(), "image/jpeg"
+
+
+async def load_avatar(db, content_hash: str, size: Optional[int] = None) -> Optional[Tuple[bytes, str]]:
+    """
+    Returns (bytes, mime). When a thumbnail size is requested and Pillow is
+    available, the resized image is generated once and stored next to the
+    original under "<hash>@<size>".
+    """
+    if size and Image is not None:
+        cached = await _read(db, _filename(content_hash, size))
+        if cached:
+            return cached
+
+    original = await _read(db, content_hash)
+    if not original or not size or Image is None:
+        return original
+
+    try:
+        data, mime = await asyncio.to_thread(_make_thumbnail, original[0], size)
+    except Exception as e:
+        logger.warning(f"[AVATAR] thumbnail failed hash={content_hash} size={size}: {e}")
+        return original
+
+    await _bucket(db).upload_from_stream(
+        _filename(content_hash, size),
+        data,
+        metadata={"contentType": mime, "source": content_hash},
+    )
+    return data, mime
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+from datetime import datetime, timezone
+from typing import Optional
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.config import settings
+from app.core.logger import logger
+from app.services.url_analytics_service import (
+    GRANULARITIES,
+    MAX_BUCKET_REFERRERS,
+    OTHER_KEY,
+    bucket_start,
+    build_bucket_ops,
+    referrer_host,
+    user_agent_family,
+)
+
+
+class ClickCounter:
+    """
+    Buffers redirect clicks in memory and flushes them to db.urls as one
+    unordered bulk_write per interval, one UpdateOne per shortId.
+    The same flush upserts per-minute/hour/day rollups into
+    db.url_click_buckets.
+    Counts that fail to flush are merged back and retried next tick; after
+    a partial BulkWriteError only the failed ops are retried.
+    Each bucket keeps at most MAX_BUCKET_REFERRERS referrer hosts (per
+    process); the rest are counted as OTHER_KEY.
+    """
+
+    def __init__(self, interval_seconds: float) -> None:
+        self.interval_seconds = interval_seconds
+        self._db = None
+        self._pending: dict[str, list] = {}
+        self._buckets: dict[tuple, list] = {}
+        # referrer hosts already written to each open bucket
+        self._bucket_referrers: dict[tuple, set[str]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    def record(
+        self,
+        short_id: str,
+        at: Optional[datetime] = None,
+        *,
+        referrer: Optional[str] = None,
+        user_agent: Optional[str] = None,
+    ) -> None:
+        at = at or datetime.now(timezone.utc)
+        entry = self._pending.get(short_id)
+        if entry is None:
+            self._pending[short_id] = [1, at]
+        else:
+            entry[0] += 1
+            if at > entry[1]:
+                entry[1] = at
+
+        host = referrer_host(referrer)
+        family = user_agent_family(user_agent)
+        for granularity in GRANULARITIES:
+            key = (short_id, granularity, bucket_start(at, granularity))
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [0, {}, {}]
+            bucket[0] += 1
+            key_host = self._capped_referrer(key, host)
+            bucket[1][key_host] = bucket[1].get(key_host, 0) + 1
+            bucket[2][family] = bucket[2].get(family, 0) + 1
+
+    def _capped_referrer(self, key: tuple, host: str) -> str:
+        seen = self._bucket_referrers.get(key)
+        if seen is None:
+            seen = self._bucket_referrers[key] = set()
+        if host in seen:
+            return host
+        if len(seen) >= MAX_BUCKET_REFERRERS:
+            return OTHER_KEY
+        seen.add(host)
+        return host
+
+    def _prune_bucket_referrers(self, now: datetime) -> None:
+        # buckets before the current one only see late or retried clicks
+        self._bucket_referrers = {
+            key: seen
+            for key, seen in self._bucket_referrers.items()
+            if key[2] >= bucket_start(now, key[1]) or key in self._buckets
+        }
+
+    @staticmethod
+    def _failed(e: BulkWriteError, keys: list) -> list:
+        """
+        Keys of the ops listed in writeErrors. With an unordered bulk every
+        other op was applied (a write concern error alone means all were).
+        """
+        return [keys[err["index"]] for err in (e.details or {}).get("writeErrors", [])]
+
+    def _merge_back(self, batch: dict[str, list]) -> None:
+        for short_id, (count, last) in batch.items():
+            entry = self._pending.get(short_id)
+            if entry is None:
+                self._pending[short_id] = [count, last]
+            else:
+                entry[0] += count
+                if last > entry[1]:
+                    entry[1] = last
+
+    def _merge_back_buckets(self, batch: dict[tuple, list]) -> None:
+        for key, (count, referrers, agents) in batch.items():
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                self._buckets[key] = [count, referrers, agents]
+                continue
+            bucket[0] += count
+            for host, n in referrers.items():
+                bucket[1][host] = bucket[1].get(host, 0) + n
+            for family, n in agents.items():
+                bucket[2][family] = bucket[2].get(family, 0) + n
+
+    async def flush(self) -> int:
+        if self._db is None or not self._pending:
+            return 0
+
+        async with self._lock:
+            batch, self._pending = self._pending, {}
+
+            ops = [
+                UpdateOne(
+                    {"shortId": short_id},
+                    {
+                        "$inc": {"clicks": count},
+                        "$max": {"lastAccessed": last},
+                    },
+                )
+                for short_id, (count, last) in batch.items()
+            ]
+
+            try:
+                await self._db.urls.bulk_write(ops, ordered=False)
+            except BulkWriteError as e:
+                # unordered: every op not listed in writeErrors was applied
+                failed = self._failed(e, list(batch))
+                logger.exception(f"[URL][CLICKS] flush partially failed ops={len(ops)} failed={len(failed)}: {e}")
+                self._merge_back({short_id: batch[short_id] for short_id in failed})
+            except Exception as e:
+                logger.exception(f"[URL][CLICKS] flush failed ops={len(ops)}: {e}")
+                self._merge_back(batch)
+                return 0
+
+            buckets, self._buckets = self._buckets, {}
+            bucket_ops = build_bucket_ops(buckets)
+            if bucket_ops:
+                try:
+                    await self._db.url_click_buckets.bulk_write(bucket_ops, ordered=False)
+                except BulkWriteError as e:
+                    failed = self._failed(e, list(buckets))
+                    logger.exception(
+                        f"[URL][CLICKS] bucket flush partially failed ops={len(bucket_ops)} failed={len(failed)}: {e}"
+                    )
+                    self._merge_back_buckets({key: buckets[key] for key in failed})
+                except Exception as e:
+                    logger.exception(f"[URL][CLICKS] bucket flush failed ops={len(bucket_ops)}: {e}")
+                    self._merge_back_buckets(buckets)
+
+            self._prune_bucket_referrers(datetime.now(timezone.utc))
+
+        logger.info(f"[URL][CLICKS] flushed ops={len(ops)} bucketOps={len(bucket_ops)}")
+        return len(ops)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            await self.flush()
+
+    async def start(self, db) -> None:
+        self._db = db
+        if self._task and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._flush_loop())
+        print("[Click Counter] started")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+        await self.flush()
+        print("[Click Counter] stopped")
+
+    def stats(self) -> dict:
+        return {"pendingLinks": len(self._pending), "pendingBuckets": len(self._buckets)}
+
+
+click_counter = ClickCounter(interval_seconds=settings.CLICK_FLUSH_INTERVAL_SECONDS)
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import hashlib
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from bson import ObjectId
+
+from app.config import settings
+from app.core.logger import logger
+from app.util.vector_codec import decode_embedding, encode_embedding
+
+# newest entries compared per lookup; all share the same source set
+MAX_CANDIDATES = 20
+
+
+def _chunk_hash(source: Dict[str, Any]) -> str:
+    return hashlib.sha256((source.get("text") or "").encode("utf-8")).hexdigest()
+
+
+def sources_key(sources: List[Dict[str, Any]], top_k: int) -> str:
+    """
+    Identity of the retrieved context: the set of chunk content hashes.
+    Any edit to a cited chunk changes its hash and therefore the key.
+    """
+    hashes = sorted(_chunk_hash(s) for s in sources)
+    return hashlib.sha256(f"{top_k}|{','.join(hashes)}".encode("utf-8")).hexdigest()
+
+
+def _cosine(a: np.ndarray, b: np.ndarray) -> float:
+    if a.shape != b.shape:
+        return -1.0
+    a = a.astype(np.float32)
+    b = b.astype(np.float32)
+    denom = float(np.linalg.norm(a) * np.linalg.norm(b))
+    return float(a @ b) / denom if denom else -1.0
+
+
+class CopilotAnswerCache:
+    """
+    Per-user semantic cache for Notes Copilot answers (db.copilot_answer_cache).
+
+    A cached answer is reused when the new question retrieves exactly the same
+    source chunks (same content hashes) and its embedding is within
+    COPILOT_CACHE_SIMILARITY cosine of the cached question, so the chat call
+    is skipped. Entries are dropped when any note they cite is re-indexed or
+    deleted, and expire after COPILOT_CACHE_TTL_SECONDS.
+    """
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return settings.COPILOT_CACHE_TTL_SECONDS > 0
+
+    async def lookup(
+        self,
+        db,
+        *,
+        owner_id: ObjectId,
+        query_vector: Sequence[float],
+        sources: List[Dict[str, Any]],
+        top_k: int,
+    ) -> Optional[Dict[str, Any]]:
+        if not self.enabled or not sources:
+            return None
+
+        key = sources_key(sources, top_k)
+        query = np.asarray(query_vector, dtype=np.float32)
+
+        best, best_score = None, settings.COPILOT_CACHE_SIMILARITY
+        try:
+            cursor = (
+                db.copilot_answer_cache.find(
+                    {"userId": owner_id, "sourcesKey": key},
+                    {"queryVector": 1, "answer": 1},
+                )
+                .sort("createdAt", -1)
+                .limit(MAX_CANDIDATES)
+            )
+            async for doc in cursor:
+                try:
+                    score = _cosine(query, decode_embedding(doc["queryVector"]))
+                except (KeyError, TypeError, ValueError) as e:
+                    logger.warning(f"[AI][COPILOT_CACHE] skipping bad entry id={doc.get('_id')}: {e}")
+                    continue
+                if score >= best_score:
+                    best, best_score = doc, score
+        except Exception as e:
+            # the cache is an optimisation: a failed lookup is a miss
+            logger.warning(f"[AI][COPILOT_CACHE] lookup failed userId={owner_id}: {e}")
+            self.errors += 1
+            return None
+
+        if best is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return {"_id": best["_id"], "answer": best["answer"], "similarity": best_score}
+
+    async def store(
+        self,
+        db,
+        *,
+        owner_id: ObjectId,
+        query: str,
+        query_vector: Sequence[float],
+        sources: List[Dict[str, Any]],
+        top_k: int,
+        answer: str,
+    ) -> None:
+        if not self.enabled or not sources:
+            return
+
+        now = datetime.now(timezone.utc)
+        try:
+            await db.copilot_answer_cache.insert_one(
+                {
+                    "userId": owner_id,
+                    "sourcesKey": sources_key(sources, top_k),
+                    "noteIds": sorted({s["noteId"] for s in sources}),
+                    "query": query,
+                    "queryVector": encode_embedding(query_vector),
+                    "answer": answer,
+                    "createdAt": now,
+                    "expiresAt": now + timedelta(seconds=settings.COPILOT_CACHE_TTL_SECONDS),
+                }
+            )
+        except Exception as e:
+            logger.warning(f"[AI][COPILOT_CACHE] store failed userId={owner_id}: {e}")
+
+    async def invalidate_note(self, db, *, owner_id: ObjectId, note_id: str) -> None:
+        try:
+            await db.copilot_answer_cache.delete_many({"userId": owner_id, "noteIds": note_id})
+        except Exception as e:
+            logger.warning(f"[AI][COPILOT_CACHE] invalidate failed note_id={note_id}: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "similarity": settings.COPILOT_CACHE_SIMILARITY,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+        }
+
+
+copilot_cache = CopilotAnswerCache()
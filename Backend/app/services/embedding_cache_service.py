@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+from array import array
+from datetime import datetime, timezone
+from typing import List, Optional, Sequence
+
+from pymongo.errors import BulkWriteError
+
+from app.config import settings
+from app.core.logger import logger
+from app.core.redis import get_redis
+from app.services.ai.router import ai_router
+from app.util.vector_codec import decode_embedding, encode_embedding
+
+
+EMBEDDING_KEY_PREFIX = "emb:"
+
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _cache_id(model: str, text_hash: str) -> str:
+    return f"{model}|{text_hash}"
+
+
+def _redis_key(model: str, text_hash: str) -> str:
+    return f"{EMBEDDING_KEY_PREFIX}{model}:{text_hash}"
+
+
+def _pack(vector: Sequence[float]) -> str:
+    # float32, base64: ~8KB for 1536 dims vs ~30KB as JSON
+    return base64.b64encode(array("f", vector).tobytes()).decode("ascii")
+
+
+def _unpack(raw: str) -> List[float]:
+    values = array("f")
+    values.frombytes(base64.b64decode(raw))
+    return values.tolist()
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache keyed by (embed model, sha256(text)).
+    Lookup order: Redis -> Mongo (db.embedding_cache) -> provider.
+    Only the misses are sent to the provider, in one batched call; the
+    results are written back to both tiers. Identical chunks across notes
+    and users share one entry.
+    """
+
+    def __init__(self) -> None:
+        self.redis_hits = 0
+        self.mongo_hits = 0
+        self.misses = 0
+
+    async def _redis_get(self, keys: List[str]) -> List[Optional[str]]:
+        try:
+            return await get_redis().mget(keys)
+        except Exception as e:
+            logger.warning(f"[AI][EMBED_CACHE] redis mget failed: {e}")
+            return [None] * len(keys)
+
+    async def _redis_set(self, entries: dict[str, List[float]]) -> None:
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            for key, vector in entries.items():
+                pipe.set(key, _pack(vector), ex=settings.EMBED_CACHE_REDIS_TTL_SECONDS)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"[AI][EMBED_CACHE] redis set failed: {e}")
+
+    async def embed(
+        self,
+        db,
+        texts: List[str],
+        hashes: Optional[List[str]] = None,
+    ) -> List[List[float]]:
+        if not texts:
+            return []
+
+        model = ai_router.embed_model
+        hashes = hashes or [chunk_hash(t) for t in texts]
+
+        # dedupe: one lookup / embed per distinct text
+        unique: dict[str, str] = {}
+        for h, t in zip(hashes, texts):
+            unique.setdefault(h, t)
+
+        found: dict[str, List[float]] = {}
+
+        wanted = list(unique)
+        raw = await self._redis_get([_redis_key(model, h) for h in wanted])
+        for h, value in zip(wanted, raw):
+            if value:
+                found[h] = _unpack(value)
+        self.redis_hits += len(found)
+
+        wanted = [h for h in wanted if h not in found]
+        if wanted:
+            cursor = db.embedding_cache.find(
+                {"_id": {"$in": [_cache_id(model, h) for h in wanted]}},
+                {"hash": 1, "embedding": 1},
+            )
+            from_mongo: dict[str, List[float]] = {}
+            async for doc in cursor:
+                from_mongo[doc["hash"]] = decode_embedding(doc["embedding"]).tolist()
+            self.mongo_hits += len(from_mongo)
+            found.update(from_mongo)
+            if from_mongo:
+                await self._redis_set({_redis_key(model, h): v for h, v in from_mongo.items()})
+
+        missing = [h for h in wanted if h not in found]
+        if missing:
+            self.misses += len(missing)
+            vectors = await ai_router.embed([unique[h] for h in missing])
+            fresh = dict(zip(missing, vectors))
+            found.update(fresh)
+
+            now = datetime.now(timezone.utc)
+            try:
+                await db.embedding_cache.insert_many(
+                    [
+                        {
+                            "_id": _cache_id(model, h),
+                            "model": model,
+                            "hash": h,
+                            "embedding": encode_embedding(v),
+                            "createdAt": now,
+                        }
+                        for h, v in fresh.items()
+                    ],
+                    ordered=False,
+                )
+            except BulkWriteError:
+                # another worker cached the same text first
+                pass
+            await self._redis_set({_redis_key(model, h): v for h, v in fresh.items()})
+
+        return [found[h] for h in hashes]
+
+    def stats(self) -> dict:
+        return {
+            "model": ai_router.embed_model,
+            "redisHits": self.redis_hits,
+            "mongoHits": self.mongo_hits,
+            "misses": self.misses,
+        }
+
+
+embedding_cache = EmbeddingCache()
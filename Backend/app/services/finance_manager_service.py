@@ -22,6 +22,7 @@ from app.schemas.finance_manager_schema import (
     MonthlyTrendItem,
 )
 from app.util.mongo_serializer import serialize_finance_doc
+from app.util.pagination import apply_keyset, next_cursor
 from app.helper.finance_manager_helper import (
     utc_now,
     get_finance_collections,
@@ -30,6 +31,9 @@ from app.helper.finance_manager_helper import (
 )
 
 
+TRANSACTIONS_SORT = [("transactionDate", -1), ("_id", -1)]
+
+
 # Account balance
 
 async def compute_account_balance(db, user_id: str, account_id: ObjectId) -> float:
@@ -400,7 +404,9 @@ async def list_finance_transactions(
     type_filter: Optional[str] = None,
     category_id: Optional[str] = None,
     account_id: Optional[str] = None,
-) -> list[dict]:
+    limit: int = 1000,
+    cursor: Optional[str] = None,
+) -> tuple[list[dict], Optional[str]]:
     cols = get_finance_collections(db)
     transactions = cols["transactions"]
 
@@ -422,8 +428,14 @@ async def list_finance_transactions(
         if end_date:
             query["transactionDate"]["$lte"] = end_date
 
-    docs = await transactions.find(query).sort("transactionDate", -1).to_list(length=1000)
-    return [serialize_finance_doc(doc) for doc in docs]
+    docs = await (
+        transactions.find(apply_keyset(query, TRANSACTIONS_SORT, cursor))
+        .sort(TRANSACTIONS_SORT)
+        .limit(limit)
+        .to_list(length=limit)
+    )
+    nxt = next_cursor(docs, TRANSACTIONS_SORT, limit)
+    return [serialize_finance_doc(doc) for doc in docs], nxt
 
 
 async def update_finance_transaction(
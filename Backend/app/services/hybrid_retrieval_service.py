@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Dict, List, Sequence, Tuple
+
+from bson import ObjectId
+
+from app.config import settings
+from app.core.histogram import LatencyHistogram
+from app.services.notes_search_service import notes_search, query_tokens, tokenize
+from app.services.vector_search_service import vector_search
+
+RETRIEVAL_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+# candidate pool per retriever = top_k * POOL_FACTOR, doubled (at most
+# MAX_ROUNDS - 1 times) while per-note dedupe leaves fewer than top_k chunks
+POOL_FACTOR = 3
+MAX_ROUNDS = 3
+# Atlas numCandidates per requested result (ANN recall vs latency)
+CANDIDATES_PER_RESULT = 10
+
+# queries that look like identifiers (invoice numbers, codes) or are very
+# short lean on the lexical ranking
+EXACT_LEXICAL_WEIGHT = 2.0
+SHORT_QUERY_TOKENS = 2
+
+CHUNK_PROJECTION = {"_id": 0, "noteId": 1, "chunkIndex": 1, "text": 1}
+
+
+def rrf_fuse(
+    ranked_lists: Sequence[List[Dict[str, Any]]],
+    weights: Sequence[float],
+    k: int = 60,
+) -> List[Dict[str, Any]]:
+    """
+    Weighted reciprocal rank fusion of chunk lists keyed by (noteId, chunkIndex):
+    score = sum(w / (k + rank)). The first list a chunk appears in supplies
+    its fields.
+    """
+    fused: Dict[Tuple[str, int], Dict[str, Any]] = {}
+    for chunks, weight in zip(ranked_lists, weights):
+        for rank, chunk in enumerate(chunks, start=1):
+            key = (chunk["noteId"], chunk["chunkIndex"])
+            entry = fused.get(key)
+            if entry is None:
+                entry = fused[key] = {**chunk, "score": 0.0}
+            entry["score"] += weight / (k + rank)
+    return sorted(fused.values(), key=lambda c: -c["score"])
+
+
+def dedupe_per_note(chunks: List[Dict[str, Any]], per_note: int, limit: int) -> List[Dict[str, Any]]:
+    """At most per_note chunks per note and no repeated chunk text, in rank order."""
+    out: List[Dict[str, Any]] = []
+    per: Dict[str, int] = {}
+    seen_text = set()
+    for c in chunks:
+        if per.get(c["noteId"], 0) >= per_note or c["text"] in seen_text:
+            continue
+        per[c["noteId"]] = per.get(c["noteId"], 0) + 1
+        seen_text.add(c["text"])
+        out.append(c)
+        if len(out) >= limit:
+            break
+    return out
+
+
+def _chunk_match(words: List[str], tokens: List[str]) -> Tuple[int, int]:
+    """(query tokens present as word prefixes, total matching words)."""
+    matched = hits = 0
+    for t in tokens:
+        n = sum(1 for w in words if w.startswith(t))
+        if n:
+            matched += 1
+            hits += n
+    return matched, hits
+
+
+def is_exact_query(tokens: List[str]) -> bool:
+    return len(tokens) <= SHORT_QUERY_TOKENS or any(ch.isdigit() for t in tokens for ch in t)
+
+
+class HybridRetriever:
+    """
+    Notes Copilot retrieval (COPILOT_RETRIEVAL=hybrid).
+
+    Runs the notes BM25 index (exact words, names, numbers) and vector
+    search over chunks concurrently and fuses the two rankings with RRF.
+    Lexical hits are notes; each contributes its best-matching chunks.
+    Results are deduped per note (COPILOT_CHUNKS_PER_NOTE). If dedupe
+    leaves fewer than top_k chunks, both candidate pools are doubled and
+    the search is repeated, so small requests stay cheap and only
+    clustered results pay for a wider search.
+    """
+
+    def __init__(self) -> None:
+        self.lexical_latency = LatencyHistogram(RETRIEVAL_BUCKETS_MS)
+        self.vector_latency = LatencyHistogram(RETRIEVAL_BUCKETS_MS)
+        self.retrievals = 0
+        self.widened = 0
+        self.lexical_only = 0
+
+    @property
+    def enabled(self) -> bool:
+        return settings.COPILOT_RETRIEVAL == "hybrid" and notes_search.enabled
+
+    async def lexical_chunks(
+        self,
+        db,
+        *,
+        owner_id: ObjectId,
+        tokens: List[str],
+        limit: int,
+    ) -> List[Dict[str, Any]]:
+        start = time.perf_counter()
+        # questions rarely share every word with the note that answers them
+        ranked = await notes_search.rank(
+            db, owner_id=owner_id, tokens=tokens, limit=limit, trashed=False, match_all=False
+        )
+        # no lexical list while the index loads: the vector list answers alone
+        page = ranked[0] if ranked else []
+        if not page:
+            self.lexical_latency.observe((time.perf_counter() - start) * 1000.0)
+            return []
+
+        note_ids = [note_id for note_id, _ in page]
+        by_note: Dict[str, List[Dict[str, Any]]] = {}
+        async for c in db.note_chunks.find({"userId": owner_id, "noteId": {"$in": note_ids}}, CHUNK_PROJECTION):
+            by_note.setdefault(c["noteId"], []).append(c)
+
+        out: List[Dict[str, Any]] = []
+        for note_id in note_ids:
+            chunks = by_note.get(note_id)
+            if not chunks:
+                continue  # not embedded yet
+            scored = sorted(
+                ((_chunk_match(tokenize(c["text"]), tokens), c) for c in chunks),
+                key=lambda sc: (-sc[0][0], -sc[0][1], sc[1]["chunkIndex"]),
+            )
+            best = [c for (matched, _), c in scored if matched][: settings.COPILOT_CHUNKS_PER_NOTE]
+            # matched on tags only: the first chunk carries the title
+            out.extend(best or [scored[0][1]])
+
+        self.lexical_latency.observe((time.perf_counter() - start) * 1000.0)
+        return out
+
+    async def vector_chunks(
+        self,
+        db,
+        *,
+        owner_id: ObjectId,
+        query_vector: Sequence[float],
+        limit: int,
+    ) -> List[Dict[str, Any]]:
+        start = time.perf_counter()
+        num_candidates = min(max(limit * CANDIDATES_PER_RESULT, 100), settings.HYBRID_MAX_CANDIDATES)
+        chunks = await vector_search.search(
+            db,
+            owner_id=owner_id,
+            query_vector=query_vector,
+            top_k=limit,
+            num_candidates=num_candidates,
+        )
+        self.vector_latency.observe((time.perf_counter() - start) * 1000.0)
+        return chunks
+
+    async def retrieve(
+        self,
+        db,
+        *,
+        owner_id: ObjectId,
+        query: str,
+        query_vector: Sequence[float],
+        top_k: int,
+    ) -> List[Dict[str, Any]]:
+        self.retrievals += 1
+        tokens = query_tokens(query)
+        weights = (EXACT_LEXICAL_WEIGHT if is_exact_query(tokens) else 1.0, 1.0)
+
+        pool = top_k * POOL_FACTOR
+        for round_ in range(MAX_ROUNDS):
+            lexical, vector = await asyncio.gather(
+                self.lexical_chunks(db, owner_id=owner_id, tokens=tokens, limit=pool),
+                self.vector_chunks(db, owner_id=owner_id, query_vector=query_vector, limit=pool),
+            )
+            fused = rrf_fuse([lexical, vector], weights, k=settings.HYBRID_RRF_K)
+            results = dedupe_per_note(fused, settings.COPILOT_CHUNKS_PER_NOTE, top_k)
+
+            exhausted = len(vector) < pool and len({c["noteId"] for c in lexical}) < pool
+            if len(results) >= top_k or exhausted or round_ == MAX_ROUNDS - 1:
+                break
+            pool *= 2
+            self.widened += 1
+
+        vector_keys = {(c["noteId"], c["chunkIndex"]) for c in vector}
+        self.lexical_only += sum((c["noteId"], c["chunkIndex"]) not in vector_keys for c in results)
+        return results
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "retrievals": self.retrievals,
+            "widened": self.widened,
+            "lexicalOnlyChunks": self.lexical_only,
+            "lexical": self.lexical_latency.stats(),
+            "vector": self.vector_latency.stats(),
+        }
+
+
+hybrid_retriever = HybridRetriever()
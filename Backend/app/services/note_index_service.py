@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import time
+from typing import Optional
+
+from bson import ObjectId
+
+from app.config import settings
+from app.core.histogram import LatencyHistogram
+from app.core.logger import logger
+from app.services.ai_notes import delete_note_chunks, upsert_note_chunks
+
+MAX_ATTEMPTS = 3
+
+
+class _Job:
+    __slots__ = ("user_id", "note_id", "first_at", "due_at", "attempts")
+
+    def __init__(self, user_id: str, note_id: str, first_at: float, due_at: float) -> None:
+        self.user_id = user_id
+        self.note_id = note_id
+        self.first_at = first_at
+        self.due_at = due_at
+        self.attempts = 0
+
+
+class NoteIndexer:
+    """
+    Background embedding pipeline for notes.
+
+    Saves call schedule() and return immediately. Jobs are keyed by note id:
+    further edits inside the debounce window push the job back (never past
+    max_delay from the first edit), so an autosave burst becomes one
+    embedding job. A job reads the note as it is when it runs, and a note is
+    never indexed by two workers at once.
+
+    The queue is in-process (one per app worker); whatever is still pending at
+    shutdown is drained before the DB connection closes.
+    """
+
+    def __init__(self, workers: int, debounce_seconds: float, max_delay_seconds: float) -> None:
+        self.workers = workers
+        self.debounce_seconds = debounce_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self._db = None
+        self._pending: dict[str, _Job] = {}
+        self._running: set[str] = set()
+        self._queue: Optional[asyncio.Queue] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: list[asyncio.Task] = []
+        self.lag = LatencyHistogram()
+        self.scheduled = 0
+        self.coalesced = 0
+        self.indexed = 0
+        self.failed = 0
+
+    def schedule(self, user_id: str, note_id: str) -> None:
+        now = time.monotonic()
+        self.scheduled += 1
+
+        job = self._pending.get(note_id)
+        if job is None:
+            self._pending[note_id] = _Job(user_id, note_id, first_at=now, due_at=now + self.debounce_seconds)
+        else:
+            self.coalesced += 1
+            job.due_at = min(now + self.debounce_seconds, job.first_at + self.max_delay_seconds)
+
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _scheduler_loop(self) -> None:
+        while True:
+            now = time.monotonic()
+            for note_id, job in list(self._pending.items()):
+                if job.due_at <= now and note_id not in self._running:
+                    del self._pending[note_id]
+                    self._running.add(note_id)
+                    self._queue.put_nowait(job)
+
+            waiting = [j.due_at for n, j in self._pending.items() if n not in self._running]
+            timeout = max(0.0, min(waiting) - now) if waiting else None
+
+            self._wakeup.clear()
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+
+    async def _index(self, job: _Job) -> None:
+        owner_id = ObjectId(job.user_id)
+        note = await self._db.notes.find_one(
+            {"_id": ObjectId(job.note_id), "userId": owner_id},
+            {"title": 1, "contentText": 1, "contentHtml": 1, "isTrashed": 1},
+        )
+
+        if not note or note.get("isTrashed", False):
+            await delete_note_chunks(self._db, user_id=owner_id, note_id=job.note_id)
+            return
+
+        await upsert_note_chunks(
+            self._db,
+            user_id=owner_id,
+            note_id=job.note_id,
+            title=note.get("title", "") or "",
+            content=note.get("contentText", "") or "",
+            html=note.get("contentHtml") or None,
+        )
+
+    async def _run(self, job: _Job) -> None:
+        try:
+            await self._index(job)
+        except Exception as e:
+            if job.note_id in self._pending:
+                # a newer edit is already queued and will index the latest text
+                logger.warning(f"[AI][INDEX] failed, superseded note_id={job.note_id} error={e!r}")
+                return
+            job.attempts += 1
+            if job.attempts < MAX_ATTEMPTS:
+                logger.warning(
+                    f"[AI][INDEX] retrying note_id={job.note_id} userId={job.user_id} "
+                    f"attempt={job.attempts} error={e!r}"
+                )
+                job.due_at = time.monotonic() + self.debounce_seconds * (2 ** job.attempts)
+                self._pending[job.note_id] = job
+            else:
+                self.failed += 1
+                logger.exception(f"[AI][INDEX] failed note_id={job.note_id} userId={job.user_id}: {e}")
+            return
+
+        self.indexed += 1
+        self.lag.observe((time.monotonic() - job.first_at) * 1000.0)
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._running.discard(job.note_id)
+                self._queue.task_done()
+                self._wakeup.set()
+
+    async def start(self, db) -> None:
+        self._db = db
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._scheduler_loop())]
+        self._tasks += [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        print("[Note Indexer] started")
+
+    async def _drain(self) -> None:
+        while self._pending:
+            _, job = self._pending.popitem()
+            job.attempts = MAX_ATTEMPTS - 1  # no retries during shutdown
+            await self._run(job)
+
+    async def stop(self) -> None:
+        # let in-flight jobs finish, then index whatever is still debouncing
+        if self._queue is not None:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._queue.join(), settings.NOTE_INDEX_DRAIN_SECONDS)
+
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        self._tasks = []
+
+        if self._db is not None and self._pending:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._drain(), settings.NOTE_INDEX_DRAIN_SECONDS)
+        print("[Note Indexer] stopped")
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        oldest = min((j.first_at for j in self._pending.values()), default=None)
+        return {
+            "workers": self.workers,
+            "pending": len(self._pending),
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "running": len(self._running),
+            "oldestPendingMs": round((now - oldest) * 1000.0, 1) if oldest is not None else None,
+            "scheduled": self.scheduled,
+            "coalesced": self.coalesced,
+            "indexed": self.indexed,
+            "failed": self.failed,
+            "lag": self.lag.stats(),
+        }
+
+
+note_indexer = NoteIndexer(
+    workers=settings.NOTE_INDEX_WORKERS,
+    debounce_seconds=settings.NOTE_INDEX_DEBOUNCE_SECONDS,
+    max_delay_seconds=settings.NOTE_INDEX_MAX_DELAY_SECONDS,
+)
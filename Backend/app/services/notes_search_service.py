@@ -0,0 +1,594 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import html
+import math
+import re
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from bson import ObjectId
+from fastapi import HTTPException
+
+from app.config import settings
+from app.core.logger import logger
+from app.core.redis import get_redis
+from app.util.pagination import decode_cursor, encode_cursor
+
+
+SEARCH_VERSION_KEY_PREFIX = "notes:search:ver:"
+
+# "false" on a q= response served by the unranked regex scan while the index loads
+SEARCH_RANKED_HEADER = "X-Search-Ranked"
+
+MAX_TERM_LEN = 40
+# longer words are indexed as several MAX_TERM_LEN pieces
+TOKEN_RE = re.compile(r"\w{1,%d}" % MAX_TERM_LEN, re.UNICODE)
+MAX_QUERY_TERMS = 8
+MAX_PREFIX_EXPANSIONS = 64
+
+# exact tag terms for the ?tag= filter; word tokens can never collide with them
+TAG_TERM_PREFIX = "\x00tag:"
+
+# BM25 with BM25F-style field weights folded into the term frequency
+K1 = 1.2
+B = 0.75
+TITLE_WEIGHT = 3.0
+HEADING_WEIGHT = 2.0
+TAG_WEIGHT = 2.0
+PREFIX_MATCH_FACTOR = 0.8
+
+# delta segment size that triggers a rebuild of the user's index
+DELTA_REBUILD_MIN = 1000
+DELTA_REBUILD_RATIO = 0.1
+
+SNIPPET_CHARS = 160
+SNIPPET_LEAD_CHARS = 60
+
+INDEX_PROJECTION = {
+    "_id": 1,
+    "title": 1,
+    "contentText": 1,
+    "tags": 1,
+    "outline": 1,
+    "pinned": 1,
+    "isTrashed": 1,
+}
+
+
+def _version_key(user_id: str) -> str:
+    return f"{SEARCH_VERSION_KEY_PREFIX}{user_id}"
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return TOKEN_RE.findall((text or "").lower())
+
+
+def query_tokens(q: Optional[str]) -> List[str]:
+    return list(dict.fromkeys(tokenize(q)))[:MAX_QUERY_TERMS]
+
+
+def is_search_cursor(cursor: str) -> bool:
+    """True for a cursor issued by a ranked search page: (score, _id)."""
+    try:
+        decode_cursor(cursor, 2)
+    except HTTPException:
+        return False
+    return True
+
+
+def note_terms(doc: Dict[str, Any]) -> Tuple[Counter, float]:
+    """Weighted term frequencies and document length of a note."""
+    tf: Counter = Counter(tokenize(doc.get("contentText")))
+    for t in tokenize(doc.get("title")):
+        tf[t] += TITLE_WEIGHT
+    for heading in doc.get("outline") or []:
+        # heading text is already counted once as part of contentText
+        for t in tokenize(heading.get("text")):
+            tf[t] += HEADING_WEIGHT - 1
+    tags = doc.get("tags") or []
+    for tag in tags:
+        for t in tokenize(tag):
+            tf[t] += TAG_WEIGHT
+
+    length = float(sum(tf.values()))
+    for tag in tags:
+        tf[f"{TAG_TERM_PREFIX}{tag}"] = 1.0
+    return tf, length
+
+
+def make_snippet(text: Optional[str], tokens: List[str]) -> str:
+    """
+    ~SNIPPET_CHARS of contentText around the first query match, HTML-escaped,
+    with every matched word wrapped in <mark>.
+    """
+    text = text or ""
+    pattern = re.compile(r"\b(?:" + "|".join(re.escape(t) for t in tokens) + r")\w*", re.IGNORECASE)
+
+    first = pattern.search(text)
+    start = 0
+    if first and first.start() > SNIPPET_LEAD_CHARS:
+        start = text.rfind(" ", 0, first.start() - SNIPPET_LEAD_CHARS) + 1
+    end = min(len(text), start + SNIPPET_CHARS)
+    if end < len(text):
+        cut = text.rfind(" ", start, end)
+        end = cut if cut > start else end
+
+    window = text[start:end]
+    out, pos = [], 0
+    for m in pattern.finditer(window):
+        out.append(html.escape(window[pos : m.start()]))
+        out.append(f"<mark>{html.escape(m.group(0))}</mark>")
+        pos = m.end()
+    out.append(html.escape(window[pos:]))
+
+    return ("…" if start > 0 else "") + "".join(out) + ("…" if end < len(text) else "")
+
+
+class _NotesIndex:
+    """
+    One user's notes as an inverted index.
+
+    The base segment is immutable CSR postings over a sorted vocabulary
+    (prefix lookups are a bisect). Each posting stores its BM25 term weight,
+    computed once at build time against the segment's average note length,
+    so a query only multiplies by idf. Notes created or edited after the
+    build go to a small delta segment and their old slots are marked dead;
+    once the delta is large the index is rebuilt from Mongo.
+    """
+
+    def __init__(self) -> None:
+        self.ids: List[str] = []
+        self.slot_of: Dict[str, int] = {}
+        self.alive = np.zeros(0, dtype=bool)
+        self.trashed = np.zeros(0, dtype=bool)
+        self.pinned = np.zeros(0, dtype=bool)
+        self.size = 0
+        self.avgdl = 1.0
+
+        self.vocab: List[str] = []
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.post_slots = np.zeros(0, dtype=np.int32)
+        self.post_weight = np.zeros(0, dtype=np.float32)
+
+        self.delta: Dict[str, List[Tuple[int, float]]] = {}
+        self._delta_vocab: Optional[List[str]] = None
+        self._delta_arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.delta_docs = 0
+
+        self.version: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self.slot_of)
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self.alive, self.trashed, self.pinned, self.indptr, self.post_slots, self.post_weight)
+        return sum(a.nbytes for a in arrays)
+
+    @property
+    def needs_rebuild(self) -> bool:
+        return self.delta_docs > max(DELTA_REBUILD_MIN, DELTA_REBUILD_RATIO * self.size)
+
+    def _weight(self, tf, length):
+        return tf * (K1 + 1.0) / (tf + K1 * (1.0 - B + B * length / self.avgdl))
+
+    def _grow(self, needed: int) -> None:
+        capacity = len(self.alive)
+        if self.size + needed <= capacity:
+            return
+        new_capacity = max(self.size + needed, capacity * 2, 64)
+        for name in ("alive", "trashed", "pinned"):
+            old = getattr(self, name)
+            new = np.zeros(new_capacity, dtype=old.dtype)
+            new[: self.size] = old[: self.size]
+            setattr(self, name, new)
+
+    def _add_slot(self, doc: Dict[str, Any]) -> int:
+        note_id = str(doc["_id"])
+        self.remove(note_id)
+        self._grow(1)
+        slot = self.size
+        self.size += 1
+        self.ids.append(note_id)
+        self.slot_of[note_id] = slot
+        self.alive[slot] = True
+        self.trashed[slot] = bool(doc.get("isTrashed", False))
+        self.pinned[slot] = bool(doc.get("pinned", False))
+        return slot
+
+    @classmethod
+    def build(cls, docs: List[Dict[str, Any]]) -> "_NotesIndex":
+        index = cls()
+        term_ids: Dict[str, int] = {}
+        col_term: List[int] = []
+        col_slot: List[int] = []
+        col_tf: List[float] = []
+        lengths: List[float] = []
+
+        for doc in docs:
+            tf, length = note_terms(doc)
+            slot = index._add_slot(doc)
+            col_term.extend([term_ids.setdefault(t, len(term_ids)) for t in tf])
+            col_slot.extend([slot] * len(tf))
+            col_tf.extend(tf.values())
+            lengths.append(length)
+
+        length = np.asarray(lengths, dtype=np.float32)
+        index.avgdl = float(length.mean()) if len(length) else 1.0
+        if index.avgdl <= 0:
+            index.avgdl = 1.0
+
+        # renumber terms in sorted order and group postings by term (CSR)
+        unsorted = list(term_ids)
+        order = sorted(range(len(unsorted)), key=unsorted.__getitem__)
+        rank = np.empty(len(unsorted), dtype=np.int64)
+        rank[order] = np.arange(len(unsorted))
+        terms = rank[np.asarray(col_term, dtype=np.int64)]
+        perm = np.argsort(terms, kind="stable")
+
+        slots = np.asarray(col_slot, dtype=np.int32)[perm]
+        tf = np.asarray(col_tf, dtype=np.float32)[perm]
+
+        index.vocab = [unsorted[i] for i in order]
+        index.indptr = np.zeros(len(index.vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=len(index.vocab)), out=index.indptr[1:])
+        index.post_slots = slots
+        index.post_weight = index._weight(tf, length[slots]).astype(np.float32)
+        return index
+
+    def add(self, doc: Dict[str, Any]) -> None:
+        tf, length = note_terms(doc)
+        slot = self._add_slot(doc)
+        for term, f in tf.items():
+            self.delta.setdefault(term, []).append((slot, float(self._weight(f, length))))
+            self._delta_arrays.pop(term, None)
+        self._delta_vocab = None
+        self.delta_docs += 1
+
+    def remove(self, note_id: str) -> None:
+        slot = self.slot_of.pop(note_id, None)
+        if slot is not None:
+            self.alive[slot] = False
+
+    @property
+    def delta_vocab(self) -> List[str]:
+        if self._delta_vocab is None:
+            self._delta_vocab = sorted(self.delta)
+        return self._delta_vocab
+
+    def _delta_postings(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        cached = self._delta_arrays.get(term)
+        if cached is None:
+            entries = self.delta.get(term)
+            if not entries:
+                return None
+            cached = (
+                np.fromiter((s for s, _ in entries), dtype=np.int32, count=len(entries)),
+                np.fromiter((w for _, w in entries), dtype=np.float32, count=len(entries)),
+            )
+            self._delta_arrays[term] = cached
+        return cached
+
+    def _postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(slots, BM25 weights); may include dead slots."""
+        parts = []
+        i = bisect.bisect_left(self.vocab, term)
+        if i < len(self.vocab) and self.vocab[i] == term:
+            lo, hi = self.indptr[i], self.indptr[i + 1]
+            parts.append((self.post_slots[lo:hi], self.post_weight[lo:hi]))
+        extra = self._delta_postings(term)
+        if extra is not None:
+            parts.append(extra)
+        if not parts:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+
+    def _expand(self, token: str) -> List[str]:
+        """token itself plus up to MAX_PREFIX_EXPANSIONS terms it prefixes (most frequent)."""
+        terms = [token]
+        lo = bisect.bisect_left(self.vocab, token)
+        hi = bisect.bisect_left(self.vocab, token + "\uffff", lo)
+        if hi - lo > MAX_PREFIX_EXPANSIONS:
+            df = self.indptr[lo + 1 : hi + 1] - self.indptr[lo:hi]
+            top = np.argpartition(-df, MAX_PREFIX_EXPANSIONS - 1)[:MAX_PREFIX_EXPANSIONS]
+            terms.extend(self.vocab[lo + int(i)] for i in top)
+        else:
+            terms.extend(self.vocab[lo:hi])
+
+        dv = self.delta_vocab
+        lo = bisect.bisect_left(dv, token)
+        hi = bisect.bisect_left(dv, token + "\uffff", lo)
+        terms.extend(dv[lo : min(hi, lo + MAX_PREFIX_EXPANSIONS)])
+        return list(dict.fromkeys(terms))
+
+    def search(
+        self,
+        tokens: List[str],
+        *,
+        limit: int,
+        cursor: Optional[str] = None,
+        offset: int = 0,
+        pinned: Optional[bool] = None,
+        trashed: Optional[bool] = None,
+        tag: Optional[str] = None,
+        match_all: bool = True,
+    ) -> Tuple[List[Tuple[str, float]], Optional[str]]:
+        """
+        Ranked (note id, score) page for an AND query where every token
+        matches a word exactly or as a prefix, plus the next cursor.
+        match_all=False ranks notes matching any token (plain BM25).
+        Order is (score desc, _id desc); the cursor is the last (score, _id).
+        """
+        n = self.size
+        mask = self.alive[:n].copy()
+        if trashed is not None:
+            mask &= self.trashed[:n] == trashed
+        if pinned is not None:
+            mask &= self.pinned[:n] == pinned
+        if tag:
+            tag_slots, _ = self._postings(f"{TAG_TERM_PREFIX}{tag}")
+            tagged = np.zeros(n, dtype=bool)
+            tagged[tag_slots] = True
+            mask &= tagged
+
+        live = len(self.slot_of)
+        if not live or not mask.any():
+            return [], None
+
+        total = np.zeros(n, dtype=np.float32)
+        for token in tokens:
+            best = np.zeros(n, dtype=np.float32)
+            for term in self._expand(token):
+                slots, weight = self._postings(term)
+                df = len(slots)
+                if not df:
+                    continue
+                idf = math.log(1.0 + max(live - df + 0.5, 0.0) / (df + 0.5))
+                if term != token:
+                    idf *= PREFIX_MATCH_FACTOR
+                best[slots] = np.maximum(best[slots], weight * np.float32(idf))
+            if match_all:
+                mask &= best > 0
+                if not mask.any():
+                    return [], None
+            total += best
+        if not match_all:
+            mask &= total > 0
+
+        hits = np.nonzero(mask)[0]
+        scores = total[hits]
+
+        if cursor:
+            last_score, last_id = decode_cursor(cursor, 2)
+            last_score = np.float32(last_score)
+            after = scores < last_score
+            for i in np.nonzero(scores == last_score)[0]:
+                after[i] = self.ids[hits[i]] < last_id
+            hits, scores = hits[after], scores[after]
+        elif offset:
+            limit += offset
+
+        if len(hits) > limit:
+            # keep everything tied with the limit-th score so _id breaks ties exactly
+            kth = np.partition(-scores, limit - 1)[limit - 1]
+            top = np.nonzero(-scores <= kth)[0]
+        else:
+            top = np.arange(len(hits))
+
+        ranked = sorted(top.tolist(), key=lambda i: self.ids[hits[i]], reverse=True)
+        ranked.sort(key=lambda i: -scores[i])
+        more = len(hits) > limit
+        ranked = ranked[0 if cursor else offset : limit]
+
+        page = [(self.ids[hits[i]], float(scores[i])) for i in ranked]
+        nxt = encode_cursor([page[-1][1], page[-1][0]]) if more and page else None
+        return page, nxt
+
+
+class NotesSearch:
+    """
+    Ranked full-text search for /api/notes?q= (NOTES_SEARCH_BACKEND=index).
+
+    Each user's notes are loaded into an in-process BM25 inverted index on
+    first search and kept in an LRU of NOTES_SEARCH_MAX_USERS users. Title,
+    headings and tags weigh more than body text, every query word also
+    matches as a prefix, and results carry a highlighted snippet. Note
+    writes update the loaded index in place; a per-user version counter in
+    Redis tells other app workers to reload theirs.
+
+    An index is built in a worker thread, at most one build per user at a
+    time; until it is ready search and rank return None and the caller
+    answers without it.
+    """
+
+    def __init__(self, backend: str, max_users: int) -> None:
+        self.backend = backend
+        self.max_users = max_users
+        self._users: OrderedDict[str, _NotesIndex] = OrderedDict()
+        self._loading: Dict[str, asyncio.Task] = {}
+        self.loads = 0
+        self.searches = 0
+        self.not_ready = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend == "index"
+
+    async def _remote_version(self, user_id: str) -> Optional[int]:
+        try:
+            raw = await get_redis().get(_version_key(user_id))
+        except Exception as e:
+            logger.warning(f"[NOTES][SEARCH] redis version read failed userId={user_id}: {e}")
+            return None
+        return int(raw) if raw else 0
+
+    async def _bump_version(self, user_id: str) -> Optional[int]:
+        try:
+            return int(await get_redis().incr(_version_key(user_id)))
+        except Exception as e:
+            logger.warning(f"[NOTES][SEARCH] redis version bump failed userId={user_id}: {e}")
+            return None
+
+    def _remember(self, user_id: str, index: _NotesIndex) -> None:
+        self._users[user_id] = index
+        self._users.move_to_end(user_id)
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+
+    async def _load(self, db, owner_id: ObjectId, version: Optional[int]) -> None:
+        user_id = str(owner_id)
+        try:
+            docs = await db.notes.find({"userId": owner_id}, INDEX_PROJECTION).to_list(length=None)
+            # tokenizing and sorting tens of thousands of notes takes seconds
+            index = await asyncio.to_thread(_NotesIndex.build, docs)
+            index.version = version
+            self._remember(user_id, index)
+            self.loads += 1
+        except Exception as e:
+            logger.warning(f"[NOTES][SEARCH] index load failed userId={user_id}: {e}")
+        finally:
+            self._loading.pop(user_id, None)
+
+    async def _index_for(self, db, owner_id: ObjectId, wait: bool = False) -> Optional[_NotesIndex]:
+        """The user's index, or None while it is (re)loaded in the background unless wait."""
+        user_id = str(owner_id)
+        version = await self._remote_version(user_id)
+        index = self._users.get(user_id)
+        if index is not None and (version is None or index.version == version):
+            self._users.move_to_end(user_id)
+            return index
+        task = self._loading.get(user_id)
+        if task is None:
+            task = self._loading[user_id] = asyncio.create_task(self._load(db, owner_id, version))
+        if not wait:
+            return None
+        # a cancelled request must not cancel the load other requests share
+        await asyncio.shield(task)
+        return self._users.get(user_id)
+
+    async def rank(
+        self,
+        db,
+        *,
+        owner_id: ObjectId,
+        tokens: List[str],
+        limit: int,
+        cursor: Optional[str] = None,
+        offset: int = 0,
+        pinned: Optional[bool] = None,
+        trashed: Optional[bool] = None,
+        tag: Optional[str] = None,
+        match_all: bool = True,
+        wait: bool = False,
+    ) -> Optional[Tuple[List[Tuple[str, float]], Optional[str]]]:
+        """Ranked (note id, score) page without fetching the notes; None if the index is loading."""
+        if not tokens:
+            return [], None
+        index = await self._index_for(db, owner_id, wait)
+        if index is None:
+            self.not_ready += 1
+            return None
+        self.searches += 1
+        return index.search(
+            tokens,
+            limit=limit,
+            cursor=cursor,
+            offset=offset,
+            pinned=pinned,
+            trashed=trashed,
+            tag=tag,
+            match_all=match_all,
+        )
+
+    async def search(
+        self,
+        db,
+        *,
+        owner_id: ObjectId,
+        q: str,
+        limit: int,
+        cursor: Optional[str] = None,
+        offset: int = 0,
+        pinned: Optional[bool] = None,
+        trashed: Optional[bool] = None,
+        tag: Optional[str] = None,
+        wait: bool = False,
+    ) -> Optional[Tuple[List[Dict[str, Any]], Optional[str]]]:
+        tokens = query_tokens(q)
+        ranked = await self.rank(
+            db,
+            owner_id=owner_id,
+            tokens=tokens,
+            limit=limit,
+            cursor=cursor,
+            offset=offset,
+            pinned=pinned,
+            trashed=trashed,
+            tag=tag,
+            wait=wait,
+        )
+        if ranked is None:
+            return None
+        page, nxt = ranked
+        if not page:
+            return [], None
+
+        docs = await db.notes.find(
+            {"_id": {"$in": [ObjectId(note_id) for note_id, _ in page]}, "userId": owner_id}
+        ).to_list(length=len(page))
+        by_id = {str(d["_id"]): d for d in docs}
+
+        results = []
+        for note_id, _ in page:
+            doc = by_id.get(note_id)
+            if doc is None:
+                continue  # deleted since the index was read
+            doc["snippet"] = make_snippet(doc.get("contentText"), tokens)
+            results.append(doc)
+        return results, nxt
+
+    async def note_changed(self, *, owner_id: ObjectId, note_id: str, doc: Optional[Dict[str, Any]]) -> None:
+        """Apply a note write (doc=None for a delete) to this worker's index."""
+        if not self.enabled:
+            return
+        user_id = str(owner_id)
+        try:
+            version = await self._bump_version(user_id)
+            index = self._users.get(user_id)
+            if index is None:
+                return
+            if version is None or index.version is None or index.version != version - 1:
+                # missed someone else's update; reload on next search
+                self._users.pop(user_id, None)
+                return
+
+            if doc is None:
+                index.remove(note_id)
+            else:
+                index.add(doc)
+            index.version = version
+            if index.needs_rebuild:
+                self._users.pop(user_id, None)
+        except Exception as e:
+            logger.warning(f"[NOTES][SEARCH] index update failed note_id={note_id}: {e}")
+            self._users.pop(user_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend,
+            "users": len(self._users),
+            "loading": len(self._loading),
+            "notes": sum(len(i) for i in self._users.values()),
+            "bytes": sum(i.nbytes for i in self._users.values()),
+            "loads": self.loads,
+            "searches": self.searches,
+            "notReady": self.not_ready,
+        }
+
+
+notes_search = NotesSearch(settings.NOTES_SEARCH_BACKEND, settings.NOTES_SEARCH_MAX_USERS)
@@ -7,6 +7,10 @@ from bson import ObjectId
 from pymongo.errors import DuplicateKeyError
 
 from app.realtime.emitter import emit_user_event
+from app.util.pagination import apply_keyset, next_cursor
+
+
+NOTIFICATIONS_SORT = [("createdAt", -1), ("_id", -1)]
 
 
 def utc_now() -> datetime:
@@ -82,6 +86,7 @@ async def list_notifications(
     limit: int = 20,
     skip: int = 0,
     unread_only: bool = False,
+    cursor: Optional[str] = None,
 ) -> dict[str, Any]:
     limit = max(1, min(limit, 100))
     skip = max(0, skip)
@@ -90,14 +95,13 @@ async def list_notifications(
     if unread_only:
         query["read"] = False
 
-    cursor = (
-        db.notifications.find(query)
-        .sort("createdAt", -1)
-        .skip(skip)
-        .limit(limit)
+    find = db.notifications.find(apply_keyset(query, NOTIFICATIONS_SORT, cursor)).sort(
+        NOTIFICATIONS_SORT
     )
+    if skip and not cursor:
+        find = find.skip(skip)
 
-    docs = await cursor.to_list(length=limit)
+    docs = await find.limit(limit).to_list(length=limit)
     total = await db.notifications.count_documents(query)
     unread_count = await db.notifications.count_documents(
         {"userId": str(user_id), "read": False}
@@ -107,6 +111,7 @@ async def list_notifications(
         "items": [serialize_notification(doc) for doc in docs],
         "total": total,
         "unreadCount": unread_count,
+        "nextCursor": next_cursor(docs, NOTIFICATIONS_SORT, limit),
     }
 
 
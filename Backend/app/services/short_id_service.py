@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import hashlib
+import hmac
+from typing import List
+
+from app.config import settings
+from app.core.logger import logger
+from app.core.redis import get_redis
+from app.utils import ALPHABET, generate_short_id
+
+
+SHORT_ID_LENGTH = 7
+SHORT_ID_SPACE = len(ALPHABET) ** SHORT_ID_LENGTH  # 62^7 ~= 3.5e12
+SHORT_ID_SEQ_KEY = "url:seq"
+# sequence numbers covered by one write of the Mongo high-water mark
+SHORT_ID_HWM_BLOCK = 10000
+
+# Feistel network over 42 bits (2^42 > 62^7), cycle-walked into SHORT_ID_SPACE
+_HALF_BITS = 21
+_HALF_MASK = (1 << _HALF_BITS) - 1
+_ROUNDS = 4
+
+
+def _permutation_key() -> bytes:
+    secret = settings.SHORT_ID_KEY or settings.JWT_SECRET or ""
+    return hashlib.sha256(f"short-id:{secret}".encode("utf-8")).digest()
+
+
+_KEY = _permutation_key()
+
+_seeded = False
+_reserved_through = 0
+
+
+def _round(value: int, round_no: int) -> int:
+    msg = bytes([round_no]) + value.to_bytes(3, "big")
+    digest = hmac.new(_KEY, msg, hashlib.sha256).digest()
+    return int.from_bytes(digest[:3], "big") & _HALF_MASK
+
+
+def _feistel(value: int) -> int:
+    left, right = value >> _HALF_BITS, value & _HALF_MASK
+    for i in range(_ROUNDS):
+        left, right = right, left ^ _round(right, i)
+    return (left << _HALF_BITS) | right
+
+
+def permute(seq: int) -> int:
+    """
+    Keyed bijection on [0, SHORT_ID_SPACE). Distinct sequence numbers
+    always map to distinct ids, and consecutive ones look unrelated.
+    """
+    value = _feistel(seq % SHORT_ID_SPACE)
+    while value >= SHORT_ID_SPACE:
+        value = _feistel(value)
+    return value
+
+
+def encode_base62(value: int, length: int = SHORT_ID_LENGTH) -> str:
+    chars = []
+    for _ in range(length):
+        value, rem = divmod(value, len(ALPHABET))
+        chars.append(ALPHABET[rem])
+    return "".join(reversed(chars))
+
+
+async def _persist_high_water(db, last: int) -> None:
+    global _reserved_through
+    if last <= _reserved_through:
+        return
+    ceiling = last + SHORT_ID_HWM_BLOCK
+    try:
+        await db.counters.update_one(
+            {"_id": SHORT_ID_SEQ_KEY}, {"$max": {"value": ceiling}}, upsert=True
+        )
+        _reserved_through = ceiling
+    except Exception as e:
+        logger.warning(f"[URL] short id high-water mark not saved last={last}: {e}")
+
+
+async def _stored_high_water(db) -> int:
+    doc = await db.counters.find_one({"_id": SHORT_ID_SEQ_KEY})
+    return int(doc["value"]) if doc else 0
+
+
+async def _seed_counter(db, r) -> None:
+    """First use in this process: recreate a missing counter from Mongo."""
+    global _seeded
+    high_water = await _stored_high_water(db)
+    if high_water:
+        await r.set(SHORT_ID_SEQ_KEY, high_water, nx=True)
+    _seeded = True
+
+
+async def allocate_short_ids(db, count: int = 1) -> List[str]:
+    """
+    Reserve `count` ids with a single Redis INCRBY.
+    Falls back to random ids if Redis is unavailable; callers still rely
+    on the unique shortId index and retry on DuplicateKeyError.
+
+    Redis loses the counter on a flush or restore from an old snapshot,
+    which would replay used sequence numbers. db.counters keeps a
+    high-water mark, saved ahead in blocks of SHORT_ID_HWM_BLOCK, that
+    re-seeds the counter when it is missing.
+    """
+    if count <= 0:
+        return []
+
+    try:
+        r = get_redis()
+        if not _seeded:
+            await _seed_counter(db, r)
+        last = await r.incrby(SHORT_ID_SEQ_KEY, count)
+        if last == count:
+            # the counter was just created (Redis flushed after seeding)
+            high_water = await _stored_high_water(db)
+            if high_water:
+                logger.warning(f"[URL] short id counter missing, reseeding from {high_water}")
+                last = await r.incrby(SHORT_ID_SEQ_KEY, high_water)
+    except Exception as e:
+        logger.warning(f"[URL] short id counter unavailable, using random ids: {e}")
+        return [generate_short_id(SHORT_ID_LENGTH) for _ in range(count)]
+
+    await _persist_high_water(db, last)
+
+    first = last - count + 1
+    return [encode_base62(permute(seq)) for seq in range(first, last + 1)]
@@ -1,18 +1,99 @@
+import asyncio
+from typing import Optional
+
+import httpx
 from fastapi import HTTPException
-from twilio.base.exceptions import TwilioRestException
-from twilio.rest import Client
 
 from app.config import settings
+from app.core.circuit_breaker import CircuitBreaker
 from app.core.logger import logger
 from app.services.phone_verification_service import normalize_mobile_number
 
 
-def _get_twilio_client() -> Client:
-    if not settings.TWILIO_ACCOUNT_SID or not settings.TWILIO_AUTH_TOKEN:
-        logger.error("[TWILIO_VERIFY] Missing Twilio credentials")
-        raise HTTPException(status_code=500, detail="Twilio is not configured")
+class TwilioVerifyError(Exception):
+    def __init__(self, status_code: int, code: Optional[int], message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.code = code
+
+
+class TwilioVerifyClient:
+    """
+    Async client for the Twilio Verify v2 REST API.
+    One pooled httpx.AsyncClient is reused across requests (created lazily,
+    closed on shutdown). Transport errors, timeouts and 5xx responses count
+    against a circuit breaker so an outage fails fast instead of tying up
+    workers. TWILIO_VERIFY_BASE_URL can point at the fake server in
+    app/scripts/fake_twilio_verify.py for load tests.
+    """
+
+    def __init__(self) -> None:
+        self._client: Optional[httpx.AsyncClient] = None
+        self.breaker = CircuitBreaker(
+            "twilio_verify",
+            failure_threshold=settings.TWILIO_BREAKER_FAILURES,
+            reset_timeout=settings.TWILIO_BREAKER_RESET_SECONDS,
+        )
 
-    return Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+    def _get_client(self) -> httpx.AsyncClient:
+        if not settings.TWILIO_ACCOUNT_SID or not settings.TWILIO_AUTH_TOKEN:
+            logger.error("[TWILIO_VERIFY] Missing Twilio credentials")
+            raise HTTPException(status_code=500, detail="Twilio is not configured")
+
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=settings.TWILIO_VERIFY_BASE_URL,
+                auth=(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN),
+                timeout=httpx.Timeout(settings.TWILIO_TIMEOUT_SECONDS, connect=3.0),
+                limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+            )
+        return self._client
+
+    async def post(self, path: str, data: dict) -> dict:
+        client = self._get_client()
+
+        if not self.breaker.allow():
+            logger.warning("[TWILIO_VERIFY] circuit open, refusing call")
+            raise HTTPException(
+                status_code=503,
+                detail="SMS verification is temporarily unavailable",
+            )
+
+        try:
+            r = await client.post(path, data=data)
+        except asyncio.CancelledError:
+            # client went away mid-call: no outcome, but free a half-open trial
+            self.breaker.release()
+            raise
+        except httpx.HTTPError as e:
+            self.breaker.record_failure()
+            raise TwilioVerifyError(0, None, f"transport error: {e!r}")
+
+        if r.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+        if r.status_code >= 400:
+            try:
+                body = r.json()
+            except ValueError:
+                body = {}
+            raise TwilioVerifyError(r.status_code, body.get("code"), body.get("message") or r.text)
+
+        try:
+            return r.json()
+        except ValueError:
+            logger.error(f"[TWILIO_VERIFY] non-JSON response status={r.status_code} path={path}")
+            raise TwilioVerifyError(r.status_code, None, "invalid response from Twilio")
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+twilio_verify_client = TwilioVerifyClient()
 
 
 def _get_verify_service_sid() -> str:
@@ -29,31 +110,30 @@ async def send_sms_verification(mobile_number: str) -> dict:
     Twilio expects E.164 phone format.
     """
     to_number = normalize_mobile_number(mobile_number)
-    client = _get_twilio_client()
     service_sid = _get_verify_service_sid()
 
     try:
-        verification = client.verify.v2.services(service_sid).verifications.create(
-            to=to_number,
-            channel="sms",
+        verification = await twilio_verify_client.post(
+            f"/v2/Services/{service_sid}/Verifications",
+            {"To": to_number, "Channel": "sms"},
         )
 
         logger.info(
             f"[TWILIO_VERIFY] SMS verification started mobile={to_number} "
-            f"sid={verification.sid} status={verification.status}"
+            f"sid={verification.get('sid')} status={verification.get('status')}"
         )
 
         return {
-            "sid": verification.sid,
-            "to": verification.to,
-            "channel": verification.channel,
-            "status": verification.status,
+            "sid": verification.get("sid"),
+            "to": verification.get("to"),
+            "channel": verification.get("channel"),
+            "status": verification.get("status"),
         }
 
-    except TwilioRestException as e:
+    except TwilioVerifyError as e:
         logger.error(
             f"[TWILIO_VERIFY] Failed to send verification mobile={to_number} "
-            f"code={getattr(e, 'code', None)} error={str(e)}"
+            f"code={e.code} error={str(e)}"
         )
         raise HTTPException(status_code=502, detail="Failed to send SMS verification")
 
@@ -64,31 +144,35 @@ async def check_sms_verification(mobile_number: str, code: str) -> dict:
     Approved means success.
     """
     to_number = normalize_mobile_number(mobile_number)
-    client = _get_twilio_client()
     service_sid = _get_verify_service_sid()
 
     try:
-        check = client.verify.v2.services(service_sid).verification_checks.create(
-            to=to_number,
-            code=code,
+        check = await twilio_verify_client.post(
+            f"/v2/Services/{service_sid}/VerificationCheck",
+            {"To": to_number, "Code": code},
         )
 
         logger.info(
             f"[TWILIO_VERIFY] Verification check mobile={to_number} "
-            f"sid={check.sid} status={check.status}"
+            f"sid={check.get('sid')} status={check.get('status')}"
         )
 
         return {
-            "sid": check.sid,
-            "to": check.to,
-            "status": check.status,
-            "valid": check.status == "approved",
+            "sid": check.get("sid"),
+            "to": check.get("to"),
+            "status": check.get("status"),
+            "valid": check.get("status") == "approved",
         }
 
-    except TwilioRestException as e:
+    except TwilioVerifyError as e:
+        if e.status_code == 404:
+            # no pending verification: expired, already used, or never sent
+            logger.info(f"[TWILIO_VERIFY] Verification not found mobile={to_number}")
+            return {"sid": None, "to": to_number, "status": "not_found", "valid": False}
+
         logger.error(
             f"[TWILIO_VERIFY] Failed to check verification mobile={to_number} "
-            f"code={getattr(e, 'code', None)} error={str(e)}"
+            f"code={e.code} error={str(e)}"
         )
         raise HTTPException(status_code=502, detail="Failed to verify OTP")
 
@@ -96,4 +180,4 @@ async def check_sms_verification(mobile_number: str, code: str) -> dict:
 async def verify_sms_code_or_raise(mobile_number: str, code: str) -> None:
     result = await check_sms_verification(mobile_number, code)
     if not result["valid"]:
-        raise HTTPException(status_code=400, detail="Invalid or expired OTP")
\ No newline at end of file
+        raise HTTPException(status_code=400, detail="Invalid or expired OTP")
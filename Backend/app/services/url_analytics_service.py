@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Any, Iterable, Literal, Optional
+from urllib.parse import quote, unquote, urlsplit
+
+from pymongo import UpdateOne
+
+
+Granularity = Literal["minute", "hour", "day"]
+
+GRANULARITIES: tuple[Granularity, ...] = ("minute", "hour", "day")
+
+# How long each bucket size is kept (None = forever)
+BUCKET_RETENTION: dict[str, Optional[timedelta]] = {
+    "minute": timedelta(days=2),
+    "hour": timedelta(days=90),
+    "day": timedelta(days=400),
+}
+
+# Default look-back window for /stats per granularity
+DEFAULT_WINDOW: dict[str, timedelta] = {
+    "minute": timedelta(hours=1),
+    "hour": timedelta(hours=48),
+    "day": timedelta(days=30),
+}
+
+MAX_ROLLUP_KEYS = 50
+
+# Distinct referrer hosts written per bucket; the Referer header is
+# client-controlled, so further hosts are counted under OTHER_KEY
+MAX_BUCKET_REFERRERS = 100
+OTHER_KEY = "other"
+
+
+def bucket_start(at: datetime, granularity: str) -> datetime:
+    if granularity == "minute":
+        return at.replace(second=0, microsecond=0)
+    if granularity == "hour":
+        return at.replace(minute=0, second=0, microsecond=0)
+    return at.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def referrer_host(referrer: Optional[str]) -> str:
+    if not referrer:
+        return "direct"
+    try:
+        host = urlsplit(referrer).hostname
+    except ValueError:
+        host = None
+    if not host:
+        return "unknown"
+    return host.removeprefix("www.")
+
+
+def user_agent_family(user_agent: Optional[str]) -> str:
+    ua = (user_agent or "").lower()
+    if not ua:
+        return "unknown"
+    if any(k in ua for k in ("bot", "spider", "crawler", "preview", "curl", "wget")):
+        return "bot"
+    # order matters: Edge/Opera UAs also contain "chrome", Chrome UAs contain "safari"
+    if "edg/" in ua:
+        return "edge"
+    if "opr/" in ua or "opera" in ua:
+        return "opera"
+    if "firefox" in ua or "fxios" in ua:
+        return "firefox"
+    if "chrome" in ua or "crios" in ua:
+        return "chrome"
+    if "safari" in ua:
+        return "safari"
+    return "other"
+
+
+def _encode_key(key: str) -> str:
+    # Mongo field names can't contain "." or start with "$"; quote() keeps "."
+    return quote(key, safe="").replace(".", "%2E")
+
+
+def _decode_key(key: str) -> str:
+    return unquote(key)
+
+
+def build_bucket_ops(buckets: dict[tuple, list]) -> list[UpdateOne]:
+    """
+    buckets: {(shortId, granularity, bucketStart): [clicks, {referrer: n}, {agent: n}]}
+    """
+    ops = []
+    for (short_id, granularity, start), (clicks, referrers, agents) in buckets.items():
+        inc: dict[str, int] = {"clicks": clicks}
+        for host, n in referrers.items():
+            inc[f"referrers.{_encode_key(host)}"] = n
+        for family, n in agents.items():
+            inc[f"agents.{_encode_key(family)}"] = n
+
+        on_insert: dict[str, Any] = {}
+        retention = BUCKET_RETENTION[granularity]
+        if retention is not None:
+            on_insert["expiresAt"] = start + retention
+
+        update: dict[str, Any] = {"$inc": inc}
+        if on_insert:
+            update["$setOnInsert"] = on_insert
+
+        ops.append(
+            UpdateOne(
+                {"shortId": short_id, "granularity": granularity, "bucket": start},
+                update,
+                upsert=True,
+            )
+        )
+    return ops
+
+
+def _merge_counts(total: dict[str, int], part: Optional[dict[str, Any]], prefix: str = "") -> None:
+    for key, n in (part or {}).items():
+        name = prefix + _decode_key(key)
+        if isinstance(n, dict):
+            # buckets written before "." was escaped nest dotted hosts: t -> co -> n
+            _merge_counts(total, n, f"{name}.")
+            continue
+        total[name] = total.get(name, 0) + n
+
+
+def _top(counts: dict[str, int]) -> dict[str, int]:
+    ranked = sorted(counts.items(), key=lambda kv: kv[1], reverse=True)
+    return dict(ranked[:MAX_ROLLUP_KEYS])
+
+
+def summarize_buckets(docs: Iterable[dict[str, Any]]) -> dict[str, Any]:
+    total = 0
+    series = []
+    referrers: dict[str, int] = {}
+    agents: dict[str, int] = {}
+
+    for doc in docs:
+        clicks = int(doc.get("clicks", 0))
+        total += clicks
+        series.append({"bucket": doc["bucket"], "clicks": clicks})
+        _merge_counts(referrers, doc.get("referrers"))
+        _merge_counts(agents, doc.get("agents"))
+
+    return {
+        "totalClicks": total,
+        "buckets": series,
+        "referrers": _top(referrers),
+        "agents": _top(agents),
+    }
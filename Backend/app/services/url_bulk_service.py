@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, List, Tuple
+
+from fastapi import HTTPException, Request
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+
+from app.config import settings
+from app.core.logger import logger
+from app.schemas.url_schemas import ShortenRequest
+from app.services.short_id_service import allocate_short_ids
+from app.services.url_search_service import url_search_terms
+
+
+BULK_CHUNK_SIZE = 1000
+BULK_INSERT_ATTEMPTS = 3
+DUPLICATE_KEY_CODE = 11000
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+async def _iter_ndjson(body: bytes) -> AsyncIterator[Any]:
+    for line in body.split(b"\n"):
+        if line.strip():
+            yield line
+
+
+async def _iter_list(items: list) -> AsyncIterator[Any]:
+    for item in items:
+        yield item
+
+
+async def read_bulk_items(request: Request) -> AsyncIterator[Any]:
+    """
+    Returns an async iterator of raw items from either an NDJSON stream
+    (one ShortenRequest per line) or a JSON body: a list, or {"items": [...]}.
+    NDJSON lines are yielded as bytes and decoded per item so one bad line
+    doesn't fail the whole request. Malformed JSON bodies raise 400 here,
+    before any response is streamed.
+    The body is read up front: the response stream shares the ASGI receive
+    channel, so it can't keep pulling request chunks once it has started.
+    """
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type:
+        body = await request.body()
+        if not body.strip():
+            raise HTTPException(status_code=400, detail="Expected a non-empty list of items")
+        return _iter_ndjson(body)
+
+    try:
+        body = await request.json()
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
+
+    items = body.get("items") if isinstance(body, dict) else body
+    if not isinstance(items, list) or not items:
+        raise HTTPException(status_code=400, detail="Expected a non-empty list of items")
+
+    return _iter_list(items)
+
+
+def parse_bulk_item(raw: Any) -> ShortenRequest:
+    if isinstance(raw, (bytes, str)):
+        raw = json.loads(raw)
+    return ShortenRequest.model_validate(raw)
+
+
+def _error_message(exc: Exception) -> str:
+    if isinstance(exc, ValidationError):
+        first = exc.errors()[0]
+        loc = ".".join(str(p) for p in first.get("loc", ()))
+        return f"{loc}: {first.get('msg')}" if loc else str(first.get("msg"))
+    if isinstance(exc, json.JSONDecodeError):
+        return "Invalid JSON"
+    return str(exc)
+
+
+def item_error(index: int, exc: Exception | str) -> dict:
+    message = exc if isinstance(exc, str) else _error_message(exc)
+    return {"index": index, "ok": False, "error": message}
+
+
+async def insert_short_url_batch(
+    db,
+    *,
+    user_id,
+    batch: List[Tuple[int, ShortenRequest]],
+) -> List[dict]:
+    """
+    Inserts a batch with one unordered insert_many. Generated ids that hit
+    the unique index are re-allocated and retried; alias collisions are
+    reported per item.
+    """
+    now = datetime.now(timezone.utc)
+    expires_at = now + timedelta(days=settings.URL_EXPIRY_DAYS)
+
+    generated = iter(await allocate_short_ids(db, sum(1 for _, req in batch if not req.alias)))
+
+    pending = []
+    for index, req in batch:
+        short_id = req.alias or next(generated)
+        long_url = str(req.longUrl)
+        pending.append(
+            (
+                index,
+                req,
+                {
+                    "userId": user_id,
+                    "shortId": short_id,
+                    "longUrl": long_url,
+                    "searchTerms": url_search_terms(short_id, long_url),
+                    "createdAt": now,
+                    "expiresAt": expires_at,
+                    "clicks": 0,
+                    "lastAccessed": None,
+                },
+            )
+        )
+
+    results: List[dict] = []
+
+    for attempt in range(1, BULK_INSERT_ATTEMPTS + 1):
+        if not pending:
+            break
+
+        try:
+            await db.urls.insert_many([doc for _, _, doc in pending], ordered=False)
+            failed = {}
+        except BulkWriteError as e:
+            failed = {err["index"]: err for err in e.details.get("writeErrors", [])}
+
+        retry = []
+        for pos, (index, req, doc) in enumerate(pending):
+            err = failed.get(pos)
+            if err is None:
+                results.append({"index": index, "ok": True, "shortId": doc["shortId"]})
+            elif err.get("code") != DUPLICATE_KEY_CODE:
+                results.append(item_error(index, err.get("errmsg") or "Insert failed"))
+            elif req.alias:
+                results.append(item_error(index, "Alias already in use"))
+            else:
+                doc.pop("_id", None)
+                retry.append((index, req, doc))
+
+        if retry:
+            fresh = await allocate_short_ids(db, len(retry))
+            for (_, _, doc), short_id in zip(retry, fresh):
+                doc["shortId"] = short_id
+                doc["searchTerms"] = url_search_terms(short_id, doc["longUrl"])
+            logger.warning(
+                f"[URL] bulk shorten id collisions userId={str(user_id)} retry={len(retry)} attempt={attempt}"
+            )
+        pending = retry
+
+    for index, _, _ in pending:
+        results.append(item_error(index, "Failed to generate unique id"))
+
+    return results
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from app.config import settings
+from app.core.local_cache import LocalTTLCache
+from app.core.logger import logger
+from app.core.redis import get_redis
+
+
+HOT_LINK_KEY_PREFIX = "url:hot:"
+
+
+def _hot_link_key(short_id: str) -> str:
+    return f"{HOT_LINK_KEY_PREFIX}{short_id}"
+
+
+def _ttl_until_expiry(expires_at: Optional[datetime], cap_seconds: int) -> int:
+    if expires_at is None:
+        return cap_seconds
+    remaining = (expires_at - datetime.now(timezone.utc)).total_seconds()
+    return int(min(cap_seconds, remaining))
+
+
+def _dump_entry(entry: dict[str, Any]) -> str:
+    expires_at = entry.get("expiresAt")
+    return json.dumps(
+        {
+            "longUrl": entry["longUrl"],
+            "expiresAt": expires_at.timestamp() if expires_at else None,
+        }
+    )
+
+
+def _load_entry(raw: str) -> dict[str, Any]:
+    data = json.loads(raw)
+    ts = data.get("expiresAt")
+    return {
+        "longUrl": data["longUrl"],
+        "expiresAt": datetime.fromtimestamp(ts, timezone.utc) if ts else None,
+    }
+
+
+class HotLinkCache:
+    """
+    Read-through cache for shortId -> {longUrl, expiresAt}.
+    Lookup order: in-process LRU -> Redis -> Mongo.
+    TTLs never outlive the link's expiresAt.
+    """
+
+    def __init__(self) -> None:
+        self._local = LocalTTLCache(
+            maxsize=settings.URL_CACHE_LOCAL_SIZE,
+            default_ttl=settings.URL_CACHE_LOCAL_TTL_SECONDS,
+        )
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    async def _redis_get(self, short_id: str) -> Optional[dict[str, Any]]:
+        try:
+            raw = await get_redis().get(_hot_link_key(short_id))
+        except Exception as e:
+            logger.warning(f"[URL][CACHE] redis get failed shortId={short_id}: {e}")
+            return None
+        return _load_entry(raw) if raw else None
+
+    async def _redis_set(self, short_id: str, entry: dict[str, Any], ttl: int) -> None:
+        try:
+            await get_redis().set(_hot_link_key(short_id), _dump_entry(entry), ex=ttl)
+        except Exception as e:
+            logger.warning(f"[URL][CACHE] redis set failed shortId={short_id}: {e}")
+
+    async def resolve(self, db, short_id: str) -> Optional[dict[str, Any]]:
+        entry = self._local.get(short_id)
+        if entry is not None:
+            self.local_hits += 1
+            return entry
+
+        entry = await self._redis_get(short_id)
+        if entry is not None:
+            self.redis_hits += 1
+            self._local.set(
+                short_id,
+                entry,
+                ttl=_ttl_until_expiry(entry["expiresAt"], settings.URL_CACHE_LOCAL_TTL_SECONDS),
+            )
+            return entry
+
+        self.misses += 1
+
+        doc = await db.urls.find_one(
+            {"shortId": short_id},
+            {"_id": 0, "longUrl": 1, "expiresAt": 1},
+        )
+        if not doc:
+            return None
+
+        entry = {"longUrl": doc["longUrl"], "expiresAt": doc.get("expiresAt")}
+        await self.store(short_id, entry)
+        return entry
+
+    async def store(self, short_id: str, entry: dict[str, Any]) -> None:
+        ttl = _ttl_until_expiry(entry.get("expiresAt"), settings.URL_CACHE_TTL_SECONDS)
+        if ttl <= 0:
+            return
+
+        self._local.set(short_id, entry, ttl=ttl)
+        await self._redis_set(short_id, entry, ttl)
+
+    async def invalidate(self, short_id: str) -> None:
+        self._local.pop(short_id)
+        try:
+            await get_redis().delete(_hot_link_key(short_id))
+        except Exception as e:
+            logger.warning(f"[URL][CACHE] redis delete failed shortId={short_id}: {e}")
+
+    def stats(self) -> dict[str, Any]:
+        hits = self.local_hits + self.redis_hits
+        total = hits + self.misses
+        return {
+            "localHits": self.local_hits,
+            "redisHits": self.redis_hits,
+            "misses": self.misses,
+            "hitRatio": round(hits / total, 4) if total else 0.0,
+            "localSize": len(self._local),
+        }
+
+
+hot_link_cache = HotLinkCache()
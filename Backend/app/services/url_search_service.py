@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import re
+from typing import List, Optional
+from urllib.parse import urlsplit
+
+
+# Term namespaces stored in urls.searchTerms
+SHORT_ID_PREFIX = "s:"
+HOST_PREFIX = "h:"
+PATH_PREFIX = "p:"
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+SHORT_ID_QUERY_RE = re.compile(r"^[a-z0-9_-]+$")
+
+MAX_PATH_TERMS = 24
+MAX_TERM_LEN = 40
+
+
+def url_search_terms(short_id: str, long_url: str) -> List[str]:
+    """
+    Terms indexed for /api/url/links search:
+      - every prefix of the lowercased shortId  (s:ab, s:abc, ...)
+      - the host and each of its labels         (h:docs.python.org, h:python, ...)
+      - alphanumeric tokens from path and query (p:tutorial, ...)
+    """
+    sid = short_id.lower()
+    terms = {f"{SHORT_ID_PREFIX}{sid[:i]}" for i in range(1, len(sid) + 1)}
+
+    try:
+        parts = urlsplit(long_url)
+        host = (parts.hostname or "").lower()
+    except ValueError:
+        return sorted(terms)
+
+    host = host.removeprefix("www.")
+    if host:
+        terms.add(f"{HOST_PREFIX}{host[:MAX_TERM_LEN]}")
+        for label in host.split("."):
+            if label:
+                terms.add(f"{HOST_PREFIX}{label[:MAX_TERM_LEN]}")
+
+    path_tokens = TOKEN_RE.findall(f"{parts.path} {parts.query}".lower())
+    for token in path_tokens[:MAX_PATH_TERMS]:
+        terms.add(f"{PATH_PREFIX}{token[:MAX_TERM_LEN]}")
+
+    return sorted(terms)
+
+
+def url_search_filter(q: str) -> Optional[dict]:
+    """
+    Matches links whose shortId starts with q, or whose host/path terms
+    contain every token in q. Only equality lookups on searchTerms, so the
+    (userId, searchTerms, createdAt) index serves it.
+    """
+    q = (q or "").strip().lower()
+    if not q:
+        return None
+
+    clauses = []
+
+    if SHORT_ID_QUERY_RE.fullmatch(q):
+        clauses.append({"searchTerms": f"{SHORT_ID_PREFIX}{q[:MAX_TERM_LEN]}"})
+
+    tokens = TOKEN_RE.findall(q)
+    if tokens:
+        clauses.append(
+            {
+                "$and": [
+                    {
+                        "searchTerms": {
+                            "$in": [
+                                f"{HOST_PREFIX}{t[:MAX_TERM_LEN]}",
+                                f"{PATH_PREFIX}{t[:MAX_TERM_LEN]}",
+                            ]
+                        }
+                    }
+                    for t in dict.fromkeys(tokens)
+                ]
+            }
+        )
+
+    if not clauses:
+        # nothing indexable (e.g. only punctuation) -> no matches
+        return {"searchTerms": {"$in": []}}
+
+    return {"$or": clauses} if len(clauses) > 1 else clauses[0]
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+from datetime import timezone
+from typing import Any, Optional
+
+from bson import ObjectId, json_util
+from bson.json_util import JSONOptions
+
+from app.config import settings
+from app.core.local_cache import LocalTTLCache
+from app.core.logger import logger
+from app.core.redis import get_redis
+
+
+USER_PRINCIPAL_KEY_PREFIX = "user:principal:"
+
+# Slim view of db.users used by get_current_user. Secrets and legacy blobs
+# (passwordHash, totpSecretEncrypted, avatarData) are deliberately left out;
+# routes that need them read them explicitly.
+USER_PRINCIPAL_PROJECTION = {
+    "name": 1,
+    "userEmail": 1,
+    "email": 1,
+    "emailLower": 1,
+    "mobileNumberE164": 1,
+    "isEmailVerified": 1,
+    "isMobileVerified": 1,
+    "mfaEnabled": 1,
+    "avatarHash": 1,
+    "avatarMime": 1,
+    "status": 1,
+}
+
+_JSON_OPTIONS = JSONOptions(tz_aware=True, tzinfo=timezone.utc)
+
+_local = LocalTTLCache(
+    maxsize=settings.USER_CACHE_LOCAL_SIZE,
+    default_ttl=settings.USER_CACHE_LOCAL_TTL_SECONDS,
+)
+
+
+def _principal_key(user_id: str) -> str:
+    return f"{USER_PRINCIPAL_KEY_PREFIX}{user_id}"
+
+
+async def get_user_principal(db, oid: ObjectId) -> Optional[dict[str, Any]]:
+    """
+    Read-through: in-process LRU -> Redis -> Mongo (slim projection).
+    """
+    user_id = str(oid)
+
+    cached = _local.get(user_id)
+    if cached is not None:
+        return cached
+
+    try:
+        raw = await get_redis().get(_principal_key(user_id))
+    except Exception as e:
+        logger.warning(f"[AUTH][CACHE] redis get failed userId={user_id}: {e}")
+        raw = None
+
+    if raw:
+        user = json_util.loads(raw, json_options=_JSON_OPTIONS)
+        _local.set(user_id, user)
+        return user
+
+    user = await db.users.find_one({"_id": oid}, USER_PRINCIPAL_PROJECTION)
+    if not user:
+        return None
+
+    _local.set(user_id, user)
+    try:
+        await get_redis().set(
+            _principal_key(user_id),
+            json_util.dumps(user, json_options=_JSON_OPTIONS),
+            ex=settings.USER_CACHE_TTL_SECONDS,
+        )
+    except Exception as e:
+        logger.warning(f"[AUTH][CACHE] redis set failed userId={user_id}: {e}")
+
+    return user
+
+
+async def invalidate_user_principal(user_id: str | ObjectId) -> None:
+    user_id = str(user_id)
+    _local.pop(user_id)
+    try:
+        await get_redis().delete(_principal_key(user_id))
+    except Exception as e:
+        logger.warning(f"[AUTH][CACHE] redis delete failed userId={user_id}: {e}")
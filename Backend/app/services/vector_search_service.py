@@ -0,0 +1,387 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from bson import ObjectId
+from pymongo.errors import OperationFailure
+
+from app.config import settings
+from app.core.logger import logger
+from app.core.redis import get_redis
+from app.util.vector_codec import decode_embedding
+
+
+ATLAS_INDEX_NAME = "note_chunks_embedding"
+VECTOR_VERSION_KEY_PREFIX = "vec:ver:"
+
+INT8_SCORE_BLOCK = 1024
+
+# OperationFailure codes meaning this server cannot run $vectorSearch at all
+# (as opposed to a timeout, a transient error or a bad query):
+#   40324   unrecognized pipeline stage (self-hosted mongod)
+#   31082   SearchNotEnabled
+#   6047401 stage only allowed on MongoDB Atlas
+#   27      IndexNotFound
+VECTOR_SEARCH_UNSUPPORTED_CODES = frozenset({40324, 31082, 6047401, 27})
+
+CHUNK_PROJECTION = {"_id": 0, "noteId": 1, "chunkIndex": 1, "text": 1, "embedding": 1}
+
+
+def _version_key(user_id: str) -> str:
+    return f"{VECTOR_VERSION_KEY_PREFIX}{user_id}"
+
+
+def _unit(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def quantize_int8(unit_rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-row int8: row ~= q * scale."""
+    peak = np.abs(unit_rows).max(axis=1)
+    scales = np.where(peak > 0, peak / 127.0, 1.0).astype(np.float32)
+    q = np.rint(unit_rows / scales[:, None]).astype(np.int8)
+    return q, scales
+
+
+async def atlas_vector_search(
+    db,
+    *,
+    owner_id: ObjectId,
+    query_vector: Sequence[float],
+    top_k: int,
+    num_candidates: int = 100,
+) -> List[Dict[str, Any]]:
+    pipeline = [
+        {
+            "$vectorSearch": {
+                "index": ATLAS_INDEX_NAME,
+                "path": "embedding",
+                "queryVector": np.asarray(query_vector, dtype=np.float32).tolist(),
+                "numCandidates": max(num_candidates, top_k),
+                "limit": top_k,
+                "filter": {"userId": owner_id},
+            }
+        },
+        {
+            "$project": {
+                "_id": 0,
+                "noteId": 1,
+                "chunkIndex": 1,
+                "text": 1,
+                "score": {"$meta": "vectorSearchScore"},
+            }
+        },
+    ]
+
+    cursor = db.note_chunks.aggregate(pipeline)
+    return await cursor.to_list(length=top_k)
+
+
+class _UserIndex:
+    """
+    One user's chunk vectors as a dense, unit-normalised matrix.
+    Rows are slots: deletes mark a slot free and inserts reuse free slots
+    before growing (capacity doubles), so a note edit touches only that
+    note's rows.
+    """
+
+    def __init__(self, dim: int, dtype: str) -> None:
+        self.dim = dim
+        self.dtype = dtype
+        self.vectors = np.zeros((0, dim), dtype=np.int8 if dtype == "int8" else np.float32)
+        self.scales = np.zeros(0, dtype=np.float32)
+        self.valid = np.zeros(0, dtype=bool)
+        self.meta: List[Optional[tuple]] = []
+        self.rows_by_note: dict[str, List[int]] = {}
+        self.free: List[int] = []
+        self.size = 0
+        self.version: Optional[int] = None
+
+    def __len__(self) -> int:
+        return int(self.valid[: self.size].sum())
+
+    @property
+    def nbytes(self) -> int:
+        return self.vectors.nbytes + self.scales.nbytes
+
+    def _grow(self, needed: int) -> None:
+        capacity = len(self.valid)
+        if self.size + needed <= capacity:
+            return
+        new_capacity = max(self.size + needed, capacity * 2, 64)
+        vectors = np.zeros((new_capacity, self.dim), dtype=self.vectors.dtype)
+        vectors[: self.size] = self.vectors[: self.size]
+        scales = np.ones(new_capacity, dtype=np.float32)
+        scales[: self.size] = self.scales[: self.size]
+        valid = np.zeros(new_capacity, dtype=bool)
+        valid[: self.size] = self.valid[: self.size]
+        self.vectors, self.scales, self.valid = vectors, scales, valid
+
+    def remove_note(self, note_id: str) -> None:
+        for row in self.rows_by_note.pop(note_id, []):
+            self.valid[row] = False
+            self.meta[row] = None
+            self.free.append(row)
+
+    def add(self, chunks: List[Dict[str, Any]]) -> None:
+        vectors, kept = [], []
+        for c in chunks:
+            if c.get("embedding") is None:
+                continue
+            vec = decode_embedding(c["embedding"])
+            if vec.shape[0] == self.dim:
+                vectors.append(vec)
+                kept.append(c)
+        chunks = kept
+        if not chunks:
+            return
+
+        unit = _unit(np.stack(vectors).astype(np.float32))
+        if self.dtype == "int8":
+            rows, scales = quantize_int8(unit)
+        else:
+            rows, scales = unit, np.ones(len(chunks), dtype=np.float32)
+
+        reuse = min(len(self.free), len(chunks))
+        slots = [self.free.pop() for _ in range(reuse)]
+        fresh = len(chunks) - reuse
+        if fresh:
+            self._grow(fresh)
+            slots.extend(range(self.size, self.size + fresh))
+            self.meta.extend([None] * fresh)
+            self.size += fresh
+
+        slots_arr = np.asarray(slots, dtype=np.int64)
+        self.vectors[slots_arr] = rows
+        self.scales[slots_arr] = scales
+        self.valid[slots_arr] = True
+
+        for slot, c in zip(slots, chunks):
+            self.meta[slot] = (c["noteId"], c["chunkIndex"], c["text"])
+            self.rows_by_note.setdefault(c["noteId"], []).append(slot)
+
+    def search(self, query: np.ndarray, top_k: int) -> List[Dict[str, Any]]:
+        if self.size == 0 or query.shape[0] != self.dim:
+            return []
+
+        q = (query / (np.linalg.norm(query) or 1.0)).astype(np.float32)
+        if self.dtype == "int8":
+            # upcast block by block so the float32 copy stays cache-sized
+            scores = np.empty(self.size, dtype=np.float32)
+            for start in range(0, self.size, INT8_SCORE_BLOCK):
+                end = min(start + INT8_SCORE_BLOCK, self.size)
+                scores[start:end] = self.vectors[start:end].astype(np.float32) @ q
+            scores *= self.scales[: self.size]
+        else:
+            scores = self.vectors[: self.size] @ q
+        scores[~self.valid[: self.size]] = -np.inf
+
+        k = min(top_k, len(self))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        results = []
+        for row in top:
+            note_id, chunk_index, text = self.meta[row]
+            results.append(
+                {
+                    "noteId": note_id,
+                    "chunkIndex": chunk_index,
+                    "text": text,
+                    # same 0..1 range as Atlas' cosine vectorSearchScore
+                    "score": float((scores[row] + 1.0) / 2.0),
+                }
+            )
+        return results
+
+
+class LocalVectorIndex:
+    """
+    In-process brute-force cosine search over each user's chunks (NumPy),
+    for self-hosted Mongo, dev and benchmarks.
+
+    A user's matrix is loaded from db.note_chunks on first search and kept in
+    an LRU bounded by VECTOR_INDEX_MAX_MB of vectors, stored as float32 or
+    per-row int8 (VECTOR_INDEX_DTYPE, 4x smaller). Chunk upserts/deletes update the
+    loaded rows of that note in place. A per-user version counter in Redis
+    tells other app workers their copy is stale, so they reload it on their
+    next search.
+    """
+
+    def __init__(self, max_bytes: int, dtype: str) -> None:
+        self.max_bytes = max_bytes
+        self.dtype = "int8" if dtype == "int8" else "float32"
+        self._users: OrderedDict[str, _UserIndex] = OrderedDict()
+        self.loads = 0
+        self.searches = 0
+
+    async def _remote_version(self, user_id: str) -> Optional[int]:
+        try:
+            raw = await get_redis().get(_version_key(user_id))
+        except Exception as e:
+            logger.warning(f"[AI][VECTOR] redis version read failed userId={user_id}: {e}")
+            return None
+        return int(raw) if raw else 0
+
+    async def _bump_version(self, user_id: str) -> Optional[int]:
+        try:
+            return int(await get_redis().incr(_version_key(user_id)))
+        except Exception as e:
+            logger.warning(f"[AI][VECTOR] redis version bump failed userId={user_id}: {e}")
+            return None
+
+    def _remember(self, user_id: str, index: _UserIndex) -> None:
+        self._users[user_id] = index
+        self._users.move_to_end(user_id)
+        total = sum(i.nbytes for i in self._users.values())
+        # the most recent user stays even if it alone is over budget
+        while total > self.max_bytes and len(self._users) > 1:
+            _, evicted = self._users.popitem(last=False)
+            total -= evicted.nbytes
+
+    async def _load(self, db, owner_id: ObjectId, dim: int, version: Optional[int]) -> _UserIndex:
+        index = _UserIndex(dim, self.dtype)
+        batch: List[Dict[str, Any]] = []
+        async for doc in db.note_chunks.find({"userId": owner_id}, CHUNK_PROJECTION):
+            batch.append(doc)
+            if len(batch) >= 1000:
+                index.add(batch)
+                batch = []
+        index.add(batch)
+        index.version = version
+        self.loads += 1
+        return index
+
+    async def search(
+        self,
+        db,
+        *,
+        owner_id: ObjectId,
+        query_vector: Sequence[float],
+        top_k: int,
+    ) -> List[Dict[str, Any]]:
+        user_id = str(owner_id)
+        query = np.asarray(query_vector, dtype=np.float32)
+        version = await self._remote_version(user_id)
+
+        index = self._users.get(user_id)
+        if index is None or index.dim != query.shape[0] or (version is not None and index.version != version):
+            index = await self._load(db, owner_id, query.shape[0], version)
+        self._remember(user_id, index)
+
+        self.searches += 1
+        return index.search(query, top_k)
+
+    async def note_changed(self, db, *, owner_id: ObjectId, note_id: str) -> None:
+        user_id = str(owner_id)
+        version = await self._bump_version(user_id)
+
+        index = self._users.get(user_id)
+        if index is None:
+            return
+        if version is not None and index.version is not None and index.version != version - 1:
+            # missed someone else's update; reload on next search
+            self._users.pop(user_id, None)
+            return
+
+        chunks = await db.note_chunks.find({"userId": owner_id, "noteId": note_id}, CHUNK_PROJECTION).to_list(
+            length=None
+        )
+        index.remove_note(note_id)
+        index.add(chunks)
+        index.version = version
+
+    def stats(self) -> dict:
+        return {
+            "dtype": self.dtype,
+            "users": len(self._users),
+            "chunks": sum(len(i) for i in self._users.values()),
+            "bytes": sum(i.nbytes for i in self._users.values()),
+            "loads": self.loads,
+            "searches": self.searches,
+        }
+
+
+class VectorSearch:
+    """
+    Pluggable vector-search backend for Notes Copilot (VECTOR_SEARCH_BACKEND):
+      atlas -> Atlas $vectorSearch on index note_chunks_embedding
+      local -> LocalVectorIndex
+      auto  -> Atlas, switching to local when the server cannot run
+               $vectorSearch (self-hosted Mongo, search not enabled, no
+               index); Atlas is probed again every
+               VECTOR_ATLAS_REPROBE_SECONDS. Other errors are raised.
+    """
+
+    def __init__(self, backend: str) -> None:
+        self.backend = backend
+        self.local = LocalVectorIndex(
+            max_bytes=settings.VECTOR_INDEX_MAX_MB * 1024 * 1024,
+            dtype=settings.VECTOR_INDEX_DTYPE,
+        )
+        self._atlas_available = backend != "local"
+        self._reprobe_at: Optional[float] = None
+
+    @property
+    def active_backend(self) -> str:
+        return "atlas" if self._atlas_available else "local"
+
+    def _should_try_atlas(self) -> bool:
+        if self._atlas_available:
+            return True
+        if self.backend != "auto" or self._reprobe_at is None or time.monotonic() < self._reprobe_at:
+            return False
+        self._atlas_available = True
+        return True
+
+    async def search(
+        self,
+        db,
+        *,
+        owner_id: ObjectId,
+        query_vector: Sequence[float],
+        top_k: int,
+        num_candidates: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """num_candidates only applies to Atlas (ANN); the local index is exact."""
+        if self._should_try_atlas():
+            try:
+                return await atlas_vector_search(
+                    db,
+                    owner_id=owner_id,
+                    query_vector=query_vector,
+                    top_k=top_k,
+                    num_candidates=num_candidates,
+                )
+            except OperationFailure as e:
+                if self.backend != "auto" or e.code not in VECTOR_SEARCH_UNSUPPORTED_CODES:
+                    raise
+                logger.warning(
+                    f"[AI][VECTOR] $vectorSearch unavailable code={e.code}, using local index "
+                    f"for {settings.VECTOR_ATLAS_REPROBE_SECONDS:.0f}s: {e}"
+                )
+                self._atlas_available = False
+                self._reprobe_at = time.monotonic() + settings.VECTOR_ATLAS_REPROBE_SECONDS
+
+        return await self.local.search(db, owner_id=owner_id, query_vector=query_vector, top_k=top_k)
+
+    async def note_changed(self, db, *, owner_id: ObjectId, note_id: str) -> None:
+        if self.backend == "atlas":
+            return  # Atlas indexes writes itself
+        try:
+            await self.local.note_changed(db, owner_id=owner_id, note_id=note_id)
+        except Exception as e:
+            logger.warning(f"[AI][VECTOR] local index update failed note_id={note_id}: {e}")
+
+    def stats(self) -> dict:
+        return {"backend": self.backend, "active": self.active_backend, "local": self.local.stats()}
+
+
+vector_search = VectorSearch(settings.VECTOR_SEARCH_BACKEND)
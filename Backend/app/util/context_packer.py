@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List
+
+from app.util.tokens import count_tokens, truncate_tokens
+
+# shortest suffix/prefix match treated as overlap between neighbour chunks
+MIN_OVERLAP_CHARS = 20
+# the section heading repeated at the top of a continuation chunk sits in
+# the first few lines of the chunk before it
+HEADING_LINES = 4
+# a block cut shorter than this is dropped rather than sent as a fragment
+MIN_PARTIAL_TOKENS = 40
+
+
+class PackedContext:
+    __slots__ = ("text", "tokens", "chunks_sent", "chunks_dropped", "truncated")
+
+    def __init__(self, text: str, tokens: int, chunks_sent: int, chunks_dropped: int, truncated: bool) -> None:
+        self.text = text
+        self.tokens = tokens
+        self.chunks_sent = chunks_sent
+        self.chunks_dropped = chunks_dropped
+        self.truncated = truncated
+
+    def meta(self) -> Dict[str, Any]:
+        return {
+            "contextTokens": self.tokens,
+            "chunksSent": self.chunks_sent,
+            "chunksDropped": self.chunks_dropped,
+            "contextTruncated": self.truncated,
+        }
+
+
+def strip_overlap(prev: str, nxt: str) -> str:
+    """
+    nxt without what it repeats from prev: its first line when that is the
+    section heading prev starts with (continuation chunks repeat it), then
+    the longest prefix that is a suffix of prev (chunks stored with a
+    sliding-window overlap).
+    """
+    head = prev.split("\n", HEADING_LINES)[:HEADING_LINES]
+    first, sep, rest = nxt.partition("\n")
+    if sep and rest.strip() and first.strip() and first in head:
+        nxt = rest
+
+    anchor = nxt[:MIN_OVERLAP_CHARS]
+    if len(anchor) < MIN_OVERLAP_CHARS:
+        return nxt
+    start = max(0, len(prev) - len(nxt))
+    pos = prev.find(anchor, start)
+    while pos != -1:
+        if nxt.startswith(prev[pos:]):
+            return nxt[len(prev) - pos :].lstrip()
+        pos = prev.find(anchor, pos + 1)
+    return nxt
+
+
+def _blocks(chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Runs of consecutive chunks of one note merged into a single block.
+    Blocks keep the order of their best-ranked chunk.
+    """
+    rank: Dict[tuple, int] = {}
+    by_note: Dict[str, List[Dict[str, Any]]] = {}
+    for i, c in enumerate(chunks):
+        key = (c["noteId"], c["chunkIndex"])
+        if key in rank:
+            continue
+        rank[key] = i
+        by_note.setdefault(c["noteId"], []).append(c)
+
+    blocks: List[Dict[str, Any]] = []
+    for note_id, note_chunks in by_note.items():
+        note_chunks.sort(key=lambda c: c["chunkIndex"])
+        block = None
+        for c in note_chunks:
+            if block is not None and c["chunkIndex"] == block["last"] + 1:
+                block["text"] += "\n" + strip_overlap(block["tail"], c["text"])
+                block["tail"] = c["text"]
+                block["last"] = c["chunkIndex"]
+                block["count"] += 1
+                block["rank"] = min(block["rank"], rank[(note_id, c["chunkIndex"])])
+                continue
+            block = {
+                "noteId": note_id,
+                "first": c["chunkIndex"],
+                "last": c["chunkIndex"],
+                "text": c["text"],
+                "tail": c["text"],
+                "count": 1,
+                "rank": rank[(note_id, c["chunkIndex"])],
+            }
+            blocks.append(block)
+
+    blocks.sort(key=lambda b: b["rank"])
+    return blocks
+
+
+def pack_context(chunks: List[Dict[str, Any]], *, max_tokens: int) -> PackedContext:
+    """
+    Prompt context from ranked chunks within max_tokens. Adjacent chunks of
+    a note are merged with their repeated text removed; blocks are added
+    best first and the first block that does not fit is cut to the
+    remaining budget.
+    """
+    parts: List[str] = []
+    used = sent = 0
+    truncated = False
+
+    for block in _blocks(chunks):
+        first, last = block["first"], block["last"]
+        span = str(first) if first == last else f"{first}-{last}"
+        header = f"[noteId:{block['noteId']} chunk:{span}]"
+        text = block["text"].strip()
+
+        cost = count_tokens(header) + count_tokens(text)
+        if used + cost > max_tokens:
+            room = max_tokens - used - count_tokens(header)
+            if room >= MIN_PARTIAL_TOKENS:
+                text = truncate_tokens(text, room)
+                parts.append(f"{header} {text}")
+                used += count_tokens(header) + count_tokens(text)
+                sent += block["count"]
+            truncated = True
+            break
+
+        parts.append(f"{header} {text}")
+        used += cost
+        sent += block["count"]
+
+    total = len({(c["noteId"], c["chunkIndex"]) for c in chunks})
+    return PackedContext("\n\n".join(parts), used, sent, total - sent, truncated)
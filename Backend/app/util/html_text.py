@@ -1,9 +1,199 @@
-from bs4 import BeautifulSoup
+from __future__ import annotations
+
 import re
+from html import escape
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
 
-def html_to_text(html: str) -> str:
+_WS_RE = re.compile(r"\s+")
+
+_HEADINGS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+# elements whose boundaries separate words (TipTap block nodes, plus table cells)
+_BREAKS = set(_HEADINGS) | {
+    "p", "div", "li", "ul", "ol", "blockquote", "pre", "br", "hr", "tr", "td", "th",
+}
+# never shown as text
+_SKIP = {"script", "style", "template", "noscript"}
+_SAFE_LINK_SCHEMES = ("http://", "https://", "mailto:", "/", "#")
+
+# what the editor produces (StarterKit, Underline, TextStyle/Color); any
+# other tag is dropped with its text kept, any other attribute is dropped
+_ALLOWED_TAGS = set(_HEADINGS) | {
+    "p", "div", "br", "hr", "ul", "ol", "li", "blockquote", "pre", "code",
+    "strong", "b", "em", "i", "u", "s", "strike", "del", "mark", "sub", "sup", "span", "a",
+    "table", "thead", "tbody", "tr", "td", "th",
+}
+_VOID_TAGS = {"br", "hr"}
+_CLASS_RE = re.compile(r"language-[\w+#-]{1,40}")
+_STYLE_RE = re.compile(r"\s*color\s*:\s*(#[0-9a-fA-F]{3,8}|rgba?\([\d\s.,%]{1,40}\)|[a-zA-Z]{1,20})\s*;?\s*")
+_NUMBER_RE = re.compile(r"\d{1,4}")
+
+MAX_LINKS = 100
+
+
+def _clean(s: str) -> str:
+    return _WS_RE.sub(" ", s).strip()
+
+
+def _safe_href(href: Optional[str]) -> Optional[str]:
+    href = (href or "").strip()
+    # drop javascript:, data: and other active schemes
+    return href if href.lower().startswith(_SAFE_LINK_SCHEMES) else None
+
+
+def _safe_attrs(tag: str, attrs: List[Tuple[str, Optional[str]]]) -> str:
+    out = []
+    for name, value in attrs:
+        value = value or ""
+        if tag == "a" and name == "href":
+            ok = _safe_href(value) is not None
+            value = value.strip()
+        elif tag == "a" and name in ("target", "rel"):
+            ok = True
+        elif name == "class" and tag in ("pre", "code"):
+            ok = _CLASS_RE.fullmatch(value) is not None
+        elif name == "style" and tag in ("span", "mark"):
+            ok = _STYLE_RE.fullmatch(value) is not None
+        elif (name == "start" and tag == "ol") or (name in ("colspan", "rowspan") and tag in ("td", "th")):
+            ok = _NUMBER_RE.fullmatch(value) is not None
+        else:
+            ok = False
+        if ok:
+            out.append(f' {name}="{escape(value)}"')
+    return "".join(out)
+
+
+class NoteHtml:
+    __slots__ = ("html", "text", "word_count", "outline", "links")
+
+    def __init__(self, html: str, text: str, word_count: int, outline: List[Dict], links: List[Dict]) -> None:
+        self.html = html
+        self.text = text
+        self.word_count = word_count
+        self.outline = outline
+        self.links = links
+
+
+class _Extractor(HTMLParser):
+    """
+    One pass over the tag stream (stdlib tokenizer, no tree): collects
+    visible text, headings and links as the tags go by, and writes the
+    sanitized HTML: allowlisted tags and attributes only, text re-escaped,
+    every open tag closed.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.out: List[str] = []
+        self._open: List[str] = []
+        self.parts: List[str] = []
+        self.outline: List[Dict] = []
+        self.links: List[Dict] = []
+        self._hrefs: set = set()
+        self._skip = 0
+        self._heading_level = 0
+        self._heading: List[str] = []
+        self._href = None
+        self._link: List[str] = []
+
+    def _emit_start(self, tag, attrs):
+        if self._skip or tag not in _ALLOWED_TAGS:
+            return
+        self.out.append(f"<{tag}{_safe_attrs(tag, attrs)}>")
+        if tag not in _VOID_TAGS:
+            self._open.append(tag)
+
+    def _emit_end(self, tag):
+        if tag not in self._open:
+            return
+        while self._open:
+            top = self._open.pop()
+            self.out.append(f"</{top}>")
+            if top == tag:
+                break
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP:
+            self._skip += 1
+            return
+        self._emit_start(tag, attrs)
+        if tag in _BREAKS:
+            self.parts.append(" ")
+        if tag in _HEADINGS:
+            self._heading_level = _HEADINGS[tag]
+            self._heading = []
+        elif tag == "a":
+            self._href = _safe_href(dict(attrs).get("href"))
+            self._link = []
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in _VOID_TAGS:
+            self._emit_start(tag, attrs)
+        if tag in _BREAKS:
+            self.parts.append(" ")
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP:
+            self._skip = max(0, self._skip - 1)
+            return
+        self._emit_end(tag)
+        if tag in _BREAKS:
+            self.parts.append(" ")
+        if tag in _HEADINGS and self._heading_level:
+            text = _clean("".join(self._heading))
+            if text:
+                self.outline.append({"level": self._heading_level, "text": text})
+            self._heading_level = 0
+        elif tag == "a" and self._href is not None:
+            if self._href not in self._hrefs and len(self.links) < MAX_LINKS:
+                self._hrefs.add(self._href)
+                self.links.append({"href": self._href, "text": _clean("".join(self._link))})
+            self._href = None
+
+    def close(self):
+        super().close()
+        self.out.extend(f"</{tag}>" for tag in reversed(self._open))
+        self._open = []
+
+    def handle_data(self, data):
+        if self._skip:
+            return
+        self.out.append(escape(data, quote=False))
+        self.parts.append(data)
+        if self._heading_level:
+            self._heading.append(data)
+        if self._href is not None:
+            self._link.append(data)
+
+
+def extract_note_html(html: str) -> NoteHtml:
+    """
+    Sanitized HTML, contentText, word count, heading outline and links of a
+    note's HTML. Text from adjacent inline marks is joined ("<b>he</b>llo"
+    -> "hello"); block elements and <br> separate words.
+    """
     if not html:
-        return ""
-    soup = BeautifulSoup(html, "html.parser")
-    text = soup.get_text(" ")
-    return re.sub(r"\s+", " ", text).strip()
+        return NoteHtml("", "", 0, [], [])
+
+    parser = _Extractor()
+    parser.feed(html)
+    parser.close()
+
+    text = _clean("".join(parser.parts))
+    return NoteHtml("".join(parser.out), text, len(text.split()), parser.outline, parser.links)
+
+
+def html_to_text(html: str) -> str:
+    return extract_note_html(html).text
+
+
+def note_content_fields(html: str) -> Dict:
+    """contentHtml as stored (sanitized) and the fields derived from it."""
+    extracted = extract_note_html(html)
+    return {
+        "contentHtml": extracted.html,
+        "contentText": extracted.text,
+        "wordCount": extracted.word_count,
+        "outline": extracted.outline,
+        "links": extracted.links,
+    }
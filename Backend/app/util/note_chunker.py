@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import hashlib
+import re
+from html.parser import HTMLParser
+from typing import List, Optional
+
+from app.util.tokens import count_tokens, split_tokens
+
+# TipTap StarterKit block nodes
+_HEADINGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+_BLOCKS = _HEADINGS | {"p", "li", "blockquote", "pre", "div", "tr"}
+_SKIP = {"script", "style"}
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|(?<=[。！？])")
+_WS_RE = re.compile(r"[ \t\r\f\v]+")
+# CJK/Thai characters and full-width punctuation: joined without a space
+_UNSPACED_RE = re.compile("[\u0e00-\u0e7f\u3000-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]")
+
+# a section ends a chunk on a block whose hash falls in 1/BOUNDARY_MODULUS,
+# once the chunk is at least min_tokens long (content-defined boundaries)
+BOUNDARY_MODULUS = 4
+
+
+class Block:
+    __slots__ = ("kind", "text", "tokens")
+
+    def __init__(self, kind: str, text: str) -> None:
+        self.kind = kind
+        self.text = text
+        self.tokens = count_tokens(text)
+
+    @property
+    def is_heading(self) -> bool:
+        return self.kind in _HEADINGS or self.kind == "title"
+
+
+class _BlockParser(HTMLParser):
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.blocks: List[Block] = []
+        self._stack: List[str] = []
+        self._buf: List[str] = []
+        self._skip = 0
+
+    def _kind(self) -> str:
+        for tag in reversed(self._stack):
+            if tag in _BLOCKS:
+                return tag
+        return "p"
+
+    def _flush(self) -> None:
+        raw = "".join(self._buf)
+        self._buf = []
+        kind = self._kind()
+        if kind == "pre":
+            text = raw.strip("\n")
+        else:
+            text = "\n".join(_WS_RE.sub(" ", line).strip() for line in raw.split("\n")).strip()
+        if not text:
+            return
+        if "li" in self._stack:
+            text = "- " + text
+        self.blocks.append(Block(kind, text))
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP:
+            self._skip += 1
+        elif tag == "br":
+            self._buf.append("\n")
+        elif tag in _BLOCKS:
+            self._flush()
+        if tag not in _SKIP and tag in _BLOCKS:
+            self._stack.append(tag)
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP:
+            self._skip = max(0, self._skip - 1)
+            return
+        if tag not in _BLOCKS:
+            return
+        self._flush()
+        # tolerate unbalanced markup: pop up to the matching tag
+        if tag in self._stack:
+            while self._stack and self._stack.pop() != tag:
+                pass
+
+    def handle_data(self, data):
+        if not self._skip:
+            self._buf.append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def html_blocks(html: str) -> List[Block]:
+    parser = _BlockParser()
+    parser.feed(html or "")
+    parser.close()
+    return parser.blocks
+
+
+def text_blocks(text: str) -> List[Block]:
+    """Plain-text fallback: one block per paragraph (blank-line separated)."""
+    paras = re.split(r"\n\s*\n", (text or "").strip())
+    return [Block("p", p.strip()) for p in paras if p.strip()]
+
+
+def _join(pieces: List[str]) -> str:
+    text = pieces[0]
+    for piece in pieces[1:]:
+        if _UNSPACED_RE.match(text[-1]) or _UNSPACED_RE.match(piece[0]):
+            text += piece
+        else:
+            text += " " + piece
+    return text
+
+
+def _split_long(block: Block, max_tokens: int) -> List[Block]:
+    """
+    Splits an oversized block on sentences, then on words, then (text with
+    no spaces: CJK, long URLs) anywhere between tokens.
+    """
+    pieces: List[str] = []
+    for sentence in _SENTENCE_RE.split(block.text):
+        if not sentence:
+            continue
+        if count_tokens(sentence) <= max_tokens:
+            pieces.append(sentence)
+            continue
+        words, current = sentence.split(" "), []
+        for word in words:
+            if current and count_tokens(" ".join(current + [word])) > max_tokens:
+                pieces.append(" ".join(current))
+                current = []
+            current.append(word)
+        if current:
+            pieces.append(" ".join(current))
+    pieces = [p for piece in pieces for p in split_tokens(piece, max_tokens)]
+
+    out: List[Block] = []
+    current: List[str] = []
+    used = 0
+    for piece in pieces:
+        n = count_tokens(piece)
+        if current and used + n > max_tokens:
+            out.append(Block(block.kind, _join(current)))
+            current, used = [], 0
+        current.append(piece)
+        used += n
+    if current:
+        out.append(Block(block.kind, _join(current)))
+    return out
+
+
+def _is_boundary(block: Block) -> bool:
+    digest = hashlib.blake2b(block.text.encode("utf-8"), digest_size=4).digest()
+    return int.from_bytes(digest, "big") % BOUNDARY_MODULUS == 0
+
+
+def chunk_note(
+    *,
+    title: str = "",
+    html: Optional[str] = None,
+    text: str = "",
+    max_tokens: int = 300,
+    min_tokens: int = 80,
+) -> List[str]:
+    """
+    Splits a note into embedding chunks along its structure.
+
+    Blocks (headings, paragraphs, list items, quotes, code) come from the
+    TipTap HTML, or from blank-line paragraphs when there is no HTML. Each
+    heading starts a new chunk, and a chunk stays within max_tokens; only
+    blocks longer than that are cut, on sentence and then word boundaries,
+    and inside words when there are no spaces to cut on.
+    Inside a section, a chunk is closed after a block whose content hash
+    marks it as a boundary, once the chunk holds min_tokens, and a short
+    section tail is folded into the chunk before it. Because boundaries
+    depend on block content rather than character offsets, an edit
+    re-chunks only its own neighbourhood and later chunks keep their text
+    (and embeddings). Continuation chunks of a section repeat the section
+    heading for context. There is no overlap between chunks.
+    """
+    blocks = html_blocks(html) if html else text_blocks(text)
+    title = (title or "").strip()
+    if title:
+        blocks.insert(0, Block("title", title))
+
+    # each chunk: [lines, tokens, lines repeated from the section heading]
+    chunks: List[list] = []
+    section_start = 0
+    current: List[str] = []
+    used = 0
+    repeated = 0
+    has_body = False
+    heading: Optional[Block] = None
+
+    def close() -> None:
+        nonlocal current, used, repeated, has_body
+        if current:
+            chunks.append([current, used, repeated])
+        current, used, repeated, has_body = [], 0, 0, False
+
+    def end_section() -> None:
+        # fold a short tail into the previous chunk of the same section
+        nonlocal section_start
+        close()
+        if len(chunks) - section_start >= 2 and chunks[-1][1] < min_tokens:
+            lines, size, rep = chunks[-1]
+            size -= heading.tokens if rep and heading is not None else 0
+            if chunks[-2][1] + size <= max_tokens:
+                chunks.pop()
+                chunks[-1][0].extend(lines[rep:])
+                chunks[-1][1] += size
+        section_start = len(chunks)
+
+    for block in blocks:
+        if block.is_heading and block.tokens <= max_tokens:
+            # consecutive headings (title, h1, h2 ...) share a chunk
+            if has_body or not current or used + block.tokens > max_tokens:
+                end_section()
+            current.append(block.text)
+            used += block.tokens
+            heading = block if block.kind != "title" and block.tokens < max_tokens // 2 else None
+            continue
+
+        parts = [block] if block.tokens <= max_tokens else _split_long(block, max_tokens)
+        for part in parts:
+            if current and used + part.tokens > max_tokens:
+                close()
+            if not current and heading is not None and heading.tokens + part.tokens <= max_tokens:
+                current, used, repeated = [heading.text], heading.tokens, 1
+            current.append(part.text)
+            used += part.tokens
+            has_body = True
+
+            if used >= min_tokens and _is_boundary(part):
+                close()
+
+    end_section()
+    return ["\n".join(lines) for lines, _, _ in chunks]
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import base64
+from datetime import timezone
+from typing import Any, List, Optional, Sequence, Tuple
+
+from bson import json_util
+from bson.json_util import JSONOptions
+from fastapi import HTTPException
+
+SortSpec = Sequence[Tuple[str, int]]
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+_JSON_OPTIONS = JSONOptions(tz_aware=True, tzinfo=timezone.utc)
+
+
+def encode_cursor(values: List[Any]) -> str:
+    raw = json_util.dumps(values, json_options=_JSON_OPTIONS).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, expected_len: int) -> List[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json_util.loads(
+            base64.urlsafe_b64decode(padded.encode("ascii")),
+            json_options=_JSON_OPTIONS,
+        )
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if not isinstance(values, list) or len(values) != expected_len:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def _read_path(doc: dict, path: str) -> Any:
+    value: Any = doc
+    for part in path.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def keyset_filter(sort: SortSpec, cursor: Optional[str]) -> Optional[dict]:
+    """
+    Filter matching documents strictly after the cursor position for the
+    given sort, e.g. [("createdAt", -1), ("_id", -1)] becomes
+      createdAt < c OR (createdAt == c AND _id < id)
+    The last sort key must be unique (normally _id).
+    """
+    if not cursor:
+        return None
+
+    values = decode_cursor(cursor, len(sort))
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        clause = {sort[j][0]: values[j] for j in range(i)}
+        clause[field] = {"$lt" if direction < 0 else "$gt": values[i]}
+        clauses.append(clause)
+
+    return {"$or": clauses} if len(clauses) > 1 else clauses[0]
+
+
+def apply_keyset(filt: dict, sort: SortSpec, cursor: Optional[str]) -> dict:
+    after = keyset_filter(sort, cursor)
+    if not after:
+        return filt
+    if not filt:
+        return after
+    return {"$and": [filt, after]}
+
+
+def next_cursor(docs: List[dict], sort: SortSpec, limit: int) -> Optional[str]:
+    if len(docs) < limit or not docs:
+        return None
+    last = docs[-1]
+    return encode_cursor([_read_path(last, field) for field, _ in sort])
@@ -0,0 +1,11 @@
+import json
+from typing import Any
+
+SSE_MEDIA_TYPE = "text/event-stream"
+
+# keep proxies (nginx) from buffering the stream
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
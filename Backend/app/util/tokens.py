@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import re
+from typing import List
+
+# scripts written without spaces between words (Han, kana, Hangul, Thai):
+# BPE spends about one token per character on them
+_UNSPACED = "฀-๿぀-ヿ㐀-䶿一-鿿가-힯豈-﫿"
+
+# one token per unspaced-script character, per word or number, and per
+# punctuation mark; close to BPE counts without shipping a tokenizer
+_TOKEN_RE = re.compile(rf"[{_UNSPACED}]|[^\W{_UNSPACED}]+|[^\w\s]", re.UNICODE)
+
+# BPE splits long words into several pieces
+_CHARS_PER_WORD_PIECE = 6
+
+
+def _cost(token: str) -> int:
+    return 1 + (len(token) - 1) // _CHARS_PER_WORD_PIECE
+
+
+def count_tokens(text: str) -> int:
+    """Approximate LLM token count; errs slightly high for prose."""
+    if not text:
+        return 0
+    return sum(_cost(m) for m in _TOKEN_RE.findall(text))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Longest prefix of text within max_tokens, cut between tokens."""
+    if not text or max_tokens <= 0:
+        return ""
+    used = 0
+    for m in _TOKEN_RE.finditer(text):
+        used += _cost(m.group())
+        if used > max_tokens:
+            return text[: m.start()].rstrip()
+    return text
+
+
+def split_tokens(text: str, max_tokens: int) -> List[str]:
+    """
+    Cuts text into consecutive pieces of at most max_tokens each, between
+    tokens where possible and inside a single over-long word otherwise.
+    """
+    max_tokens = max(max_tokens, 1)
+    pieces: List[str] = []
+    rest = (text or "").strip()
+    while count_tokens(rest) > max_tokens:
+        head = truncate_tokens(rest, max_tokens)
+        if not head:
+            # the first token alone is over budget (a long word or URL path)
+            head = rest[: max_tokens * _CHARS_PER_WORD_PIECE]
+        pieces.append(head)
+        rest = rest[len(head):].lstrip()
+    if rest:
+        pieces.append(rest)
+    return pieces
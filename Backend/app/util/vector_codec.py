@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from typing import Any, Sequence
+
+import numpy as np
+from bson.binary import Binary
+
+# BSON binary subtype 9 ("vector"): [dtype byte][padding byte][packed data]
+VECTOR_SUBTYPE = 9
+_FLOAT32 = 0x27
+_INT8 = 0x03
+_NUMPY_DTYPES = {_FLOAT32: np.dtype("<f4"), _INT8: np.dtype("i1")}
+
+
+def encode_embedding(vector: Sequence[float], dtype: str = "float32") -> Binary:
+    """
+    Packs an embedding as a BSON vector (BinData subtype 9), which Atlas
+    Vector Search indexes directly.
+      float32 -> 4 bytes/dim (vs ~9 for a BSON double array)
+      int8    -> 1 byte/dim, symmetric per-vector scaling; the scale is
+                 dropped because cosine similarity ignores it
+    """
+    arr = np.asarray(vector, dtype=np.float32)
+    if dtype == "int8":
+        peak = float(np.abs(arr).max()) if arr.size else 0.0
+        scaled = arr * (127.0 / peak) if peak > 0 else arr
+        return Binary(bytes((_INT8, 0)) + np.rint(scaled).astype(np.int8).tobytes(), VECTOR_SUBTYPE)
+    return Binary(bytes((_FLOAT32, 0)) + arr.astype("<f4").tobytes(), VECTOR_SUBTYPE)
+
+
+def decode_embedding(value: Any) -> np.ndarray:
+    """
+    Zero-copy view over a stored BSON vector; legacy double arrays are
+    converted. int8 vectors come back as int8 (cosine-comparable, not unit).
+    """
+    if isinstance(value, Binary) and value.subtype == VECTOR_SUBTYPE:
+        dtype = _NUMPY_DTYPES.get(value[0])
+        if dtype is None:
+            raise ValueError(f"Unsupported BSON vector dtype 0x{value[0]:02x}")
+        return np.frombuffer(value, dtype=dtype, offset=2)
+    return np.asarray(value, dtype=np.float32)
@@ -0,0 +1,44 @@
+from app.util.context_packer import pack_context, strip_overlap
+from app.util.note_chunker import chunk_note
+from app.util.tokens import count_tokens
+
+
+def chunk(note_id, index, text):
+    return {"noteId": note_id, "chunkIndex": index, "text": text}
+
+
+def test_strip_overlap_drops_repeated_heading_only():
+    prev = "Trip\nPacking\n- passport\n- charger"
+    assert strip_overlap(prev, "Packing\n- passport\n- snacks") == "- passport\n- snacks"
+
+
+def test_strip_overlap_keeps_first_line_that_is_not_a_heading():
+    assert strip_overlap("Plan\nstep one", "step two\nstep three") == "step two\nstep three"
+
+
+def test_strip_overlap_keeps_single_line_chunk():
+    assert strip_overlap("Plan\nstep one", "Plan") == "Plan"
+
+
+def test_strip_overlap_removes_sliding_window_overlap():
+    prev = "alpha beta gamma delta epsilon zeta eta theta"
+    nxt = "delta epsilon zeta eta theta iota kappa"
+    assert strip_overlap(prev, nxt) == "iota kappa"
+
+
+def test_adjacent_chunks_merge_without_repeated_heading():
+    html = "<h2>Alpha</h2>" + "".join(f"<p>{' '.join(f'w{i}x{j}' for j in range(30))}.</p>" for i in range(12))
+    chunks = chunk_note(html=html, max_tokens=120, min_tokens=40)
+    assert len(chunks) > 1
+    packed = pack_context([chunk("n1", i, c) for i, c in enumerate(chunks)], max_tokens=10000)
+    assert packed.chunks_sent == len(chunks)
+    assert packed.text.count("Alpha") == 1
+    assert packed.text.startswith(f"[noteId:n1 chunk:0-{len(chunks) - 1}]")
+
+
+def test_pack_context_respects_budget_for_cjk():
+    text = "東京の会議メモ。" * 200
+    packed = pack_context([chunk("n1", 0, text), chunk("n2", 0, "short note")], max_tokens=300)
+    assert packed.truncated
+    assert packed.tokens <= 300
+    assert count_tokens(packed.text) <= 300
@@ -0,0 +1,33 @@
+from app.util.html_text import extract_note_html, note_content_fields
+
+
+def test_script_and_event_handlers_are_removed():
+    html = '<h2 onclick="steal()">Plan</h2><p>hi<script>alert(1)</script><img src=x onerror=alert(1)></p>'
+    assert extract_note_html(html).html == "<h2>Plan</h2><p>hi</p>"
+
+
+def test_active_link_schemes_are_removed():
+    html = '<p><a href="javascript:alert(1)">bad</a> <a href="https://example.com/?a=1&amp;b=2" target="_blank">ok</a></p>'
+    out = extract_note_html(html)
+    assert out.html == '<p><a>bad</a> <a href="https://example.com/?a=1&amp;b=2" target="_blank">ok</a></p>'
+    assert out.links == [{"href": "https://example.com/?a=1&b=2", "text": "ok"}]
+
+
+def test_editor_markup_is_kept():
+    html = (
+        '<p><strong>b</strong> <u>u</u> <span style="color: #958DF1">c</span></p>'
+        '<pre><code class="language-python">x &lt; 1</code></pre><ol start="3"><li><p>a<br>b</p></li></ol><hr>'
+    )
+    assert extract_note_html(html).html == html
+
+
+def test_unsafe_style_and_unclosed_tags():
+    out = extract_note_html('<p><span style="background:url(x)">a</span> <b>bold <i>it</p><div>"q" &amp;')
+    assert out.html == '<p><span>a</span> <b>bold <i>it</i></b></p><div>"q" &amp;</div>'
+    assert out.text == 'a bold it "q" &'
+
+
+def test_sanitizing_is_idempotent():
+    html = '<p onclick="x">a &lt;b&gt; <em>c</em><br/>&nbsp;d</p><iframe src="x">e</iframe>'
+    once = note_content_fields(html)["contentHtml"]
+    assert note_content_fields(once)["contentHtml"] == once
@@ -0,0 +1,54 @@
+from app.util.note_chunker import chunk_note, html_blocks
+from app.util.tokens import count_tokens
+
+
+def paragraphs(n, words=30):
+    return "".join(f"<p>{' '.join(f'word{i}x{j}' for j in range(words))}.</p>" for i in range(n))
+
+
+def test_html_blocks_keep_structure():
+    blocks = html_blocks("<h2>Plan</h2><p>First <b>bold</b> line</p><ul><li>item</li></ul><script>x()</script>")
+    assert [(b.kind, b.text) for b in blocks] == [("h2", "Plan"), ("p", "First bold line"), ("li", "- item")]
+
+
+def test_short_note_is_one_chunk():
+    assert chunk_note(title="Trip", html="<p>bring passport</p>") == ["Trip\nbring passport"]
+
+
+def test_chunks_stay_within_max_tokens():
+    chunks = chunk_note(title="Long", html=paragraphs(60), max_tokens=120, min_tokens=40)
+    assert len(chunks) > 1
+    assert all(count_tokens(c) <= 120 for c in chunks)
+
+
+def test_headings_start_chunks_and_repeat_in_continuations():
+    html = "<h2>Alpha</h2>" + paragraphs(20) + "<h2>Beta</h2><p>short beta section</p>"
+    chunks = chunk_note(html=html, max_tokens=120, min_tokens=40)
+    alpha = [c for c in chunks if c.startswith("Alpha")]
+    assert len(alpha) > 1
+    assert chunks[-1] == "Beta\nshort beta section"
+
+
+def test_text_without_spaces_is_split():
+    cjk = "这是一个很长的句子没有空格" * 200
+    chunks = chunk_note(html=f"<p>{cjk}</p>", max_tokens=300)
+    assert len(chunks) > 1
+    assert all(count_tokens(c) <= 300 for c in chunks)
+    assert "".join(chunks) == cjk
+
+
+def test_long_url_is_split():
+    chunks = chunk_note(html=f"<p>see https://example.com/{'a' * 3000}</p>", max_tokens=300)
+    assert all(count_tokens(c) <= 300 for c in chunks)
+
+
+def test_edit_keeps_other_chunks():
+    before = chunk_note(html=paragraphs(40), max_tokens=120, min_tokens=40)
+    edited = paragraphs(40).replace("word35x3", "changed", 1)
+    after = chunk_note(html=edited, max_tokens=120, min_tokens=40)
+    assert before[0] == after[0]
+    assert len(set(before) & set(after)) >= len(before) - 2
+
+
+def test_plain_text_fallback():
+    assert chunk_note(text="one\n\ntwo") == ["one\ntwo"]
@@ -0,0 +1,41 @@
+from app.util.tokens import count_tokens, split_tokens, truncate_tokens
+
+
+def test_count_tokens_words_and_punctuation():
+    assert count_tokens("") == 0
+    assert count_tokens("Hello, world!") == 4
+    # long words count one token per started 6 characters
+    assert count_tokens("internationalization") == 4
+
+
+def test_count_tokens_counts_cjk_per_character():
+    assert count_tokens("这是一个句子") == 6
+    assert count_tokens("こんにちは") == 5
+    assert count_tokens("한국어") == 3
+    assert count_tokens("Notes 笔记") == 3
+
+
+def test_truncate_tokens_cuts_between_tokens():
+    assert truncate_tokens("one two three four", 2) == "one two"
+    assert truncate_tokens("one two", 10) == "one two"
+    assert truncate_tokens("one two", 0) == ""
+    assert truncate_tokens("这是一个句子", 3) == "这是一"
+
+
+def test_split_tokens_respects_the_limit():
+    text = "word " * 95
+    pieces = split_tokens(text, 10)
+    assert all(count_tokens(p) <= 10 for p in pieces)
+    assert " ".join(pieces) == text.strip()
+
+
+def test_split_tokens_cuts_inside_unspaced_text():
+    text = "a" * 600
+    pieces = split_tokens(text, 10)
+    assert all(count_tokens(p) <= 10 for p in pieces)
+    assert "".join(pieces) == text
+
+    cjk = "这是句子" * 50
+    pieces = split_tokens(cjk, 30)
+    assert all(count_tokens(p) <= 30 for p in pieces)
+    assert "".join(pieces) == cjk
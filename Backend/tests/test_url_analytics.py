@@ -0,0 +1,28 @@
+from datetime import datetime, timezone
+
+from app.services.url_analytics_service import build_bucket_ops, summarize_buckets
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def test_dotted_referrer_host_is_one_field():
+    (op,) = build_bucket_ops({("abc", "day", START): [3, {"t.co": 2, "news.ycombinator.com": 1}, {"chrome": 3}]})
+    inc = op._doc["$inc"]
+    assert inc["referrers.t%2Eco"] == 2
+    assert inc["referrers.news%2Eycombinator%2Ecom"] == 1
+    assert all(k.count(".") == 1 for k in inc if k != "clicks")
+
+
+def test_summary_decodes_dotted_hosts():
+    docs = [
+        {"bucket": START, "clicks": 2, "referrers": {"t%2Eco": 2}, "agents": {"chrome": 2}},
+        {"bucket": START, "clicks": 1, "referrers": {"t%2Eco": 1, "direct": 0}, "agents": {}},
+    ]
+    summary = summarize_buckets(docs)
+    assert summary["referrers"]["t.co"] == 3
+    assert summary["totalClicks"] == 3
+
+
+def test_summary_reads_buckets_with_nested_hosts():
+    docs = [{"bucket": START, "clicks": 4, "referrers": {"t": {"co": 3}, "direct": 1}, "agents": {}}]
+    assert summarize_buckets(docs)["referrers"] == {"t.co": 3, "direct": 1}